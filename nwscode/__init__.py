@@ -7,5 +7,6 @@ Created by Alexander Ross on 2006-07-15.
 Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
 """
 
-# Weather Service codes depend on time in UTC.
-import os; os.environ["TZ"] = "UTC"
+# Weather Service codes are in UTC.  All time conversions in this package
+# are plain calendar arithmetic, so nothing here depends on (or changes)
+# the process time zone.
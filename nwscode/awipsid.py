@@ -10,8 +10,7 @@ Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
 __all__ = ["AwipsIdError", "AwipsId"]
 
 import re
-from nwscode import NwsCode, NwsCodeError
-from misc import Bunch
+from nwscode import NwsCode, NwsCodeError, Field
 
 CATEGORY = r"[A-Z0-9]{3}"
 DESIGNATOR = r"[A-Z ]{3}"
@@ -478,9 +477,6 @@ class AwipsId(NwsCode):
              "WWP": "SEVERE THUNDERSTORM/TORNADO WATCH PROBABILITIES",
              "ZFP": "ZONE FORECAST PRODUCT"}
     }
-    
-    def _process_matches(self, matches):
-        self.code = Bunch(category=matches[0], designator=matches[1])
-        self.category = self._interpret("category", self.code.category)
-        self.designator = self.code.designator
+    fields = (Field("category", 0, table="category"),
+              Field("designator", 1))
     
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+An on-disk cache of decoded products.
+
+Products are stored under a hash of their normalized text, in the compact
+form `Product` uses for pickling, below a directory named after
+`DECODER_VERSION` (and the Python version, because of `marshal`).  Bumping
+`DECODER_VERSION` therefore starts a fresh cache, and the entries of other
+versions, in the sibling directories named like it, are removed when a
+cache is opened; nothing else in the directory is touched.  Once the
+entries take more than `maxsize` bytes the least recently used ones are
+evicted.
+
+Created by Alexander Ross on 2006-08-22.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+__all__ = ["ProductCache"]
+
+import os
+import re
+import sys
+import shutil
+import marshal
+import tempfile
+from collections import OrderedDict
+try:
+    from hashlib import sha1
+except ImportError:
+    from sha import new as sha1
+
+from product import Product, DECODER_VERSION, _restore_product
+
+# the directories of the entries of a decoder and Python version.
+_versiondir = re.compile(r"v\d+-py\d+$")
+
+def _normalize(text):
+    # the same normalization `Product` applies.
+    return text.strip().replace("\r\n", "\n")
+
+class ProductCache(object):
+    """
+    Content addressed cache of decoded products in `directory`.
+
+    Usage Example:
+
+        cache = ProductCache("/var/cache/nwscode", maxsize=2 ** 30)
+        for text in archive:
+            product = cache.decode(text)
+
+    Several processes may share a directory: entries are written to a
+    temporary file and renamed into place.  Each process only evicts the
+    entries it knows about, so the size limit is approximate then.
+
+    Attributes:
+
+        ``hits``, ``misses``
+            Number of lookups that did and didn't find a product.
+
+        ``size``
+            Bytes taken by the entries known to this cache.
+    """
+    def __init__(self, directory, maxsize=2 ** 30):
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        self.version = "v%d-py%d%d" % ((DECODER_VERSION,) +
+                                       tuple(sys.version_info[:2]))
+        self.directory = os.path.join(directory, self.version)
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        # entries of other decoder versions are useless.
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name != self.version and _versiondir.match(name) and \
+               os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+        self._load_index()
+
+    def _load_index(self):
+        # key -> size, least recently used first.
+        entries = []
+        for dirpath, dirnames, filenames in os.walk(self.directory):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if name.startswith("."):
+                    # an interrupted write.
+                    os.remove(path)
+                    continue
+                st = os.stat(path)
+                entries.append((st.st_mtime, name, st.st_size))
+        entries.sort()
+        self._index = OrderedDict([(key, size)
+                                   for mtime, key, size in entries])
+        self.size = sum(self._index.values())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def key(self, text):
+        """Returns the cache key of the product `text`."""
+        return sha1(_normalize(text)).hexdigest()
+
+    def get(self, text):
+        """Returns the cached product for `text`, or None."""
+        text = _normalize(text)
+        key = sha1(text).hexdigest()
+        path = self._path(key)
+        try:
+            f = open(path, "rb")
+            try:
+                state = marshal.load(f)
+            finally:
+                f.close()
+            product = _restore_product((text,) + state)
+            # the entry may be removed by another process meanwhile.
+            os.utime(path, None)
+            size = os.path.getsize(path)
+        except (IOError, OSError):
+            self.size -= self._index.pop(key, 0)
+            self.misses += 1
+            return None
+        except Exception:
+            # a damaged entry; get rid of it.
+            self._discard(key)
+            self.misses += 1
+            return None
+        if key in self._index:
+            self._index[key] = self._index.pop(key)
+        else:
+            # stored by another process.
+            self._index[key] = size
+            self.size += size
+        self.hits += 1
+        return product
+
+    def put(self, text, product):
+        """Stores the decoded `product` of `text`."""
+        key = self.key(text)
+        data = marshal.dumps(product._state()[1:])
+        path = self._path(key)
+        subdir = os.path.dirname(path)
+        if not os.path.isdir(subdir):
+            try:
+                os.makedirs(subdir)
+            except OSError:
+                # somebody else just made it.
+                pass
+        fd, tmp = tempfile.mkstemp(prefix=".", dir=subdir)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+        os.rename(tmp, path)
+        self.size -= self._index.pop(key, 0)
+        self._index[key] = len(data)
+        self.size += len(data)
+        self._evict()
+
+    def decode(self, text):
+        """
+        Returns the product for `text`, from the cache if possible;
+        otherwise it's decoded and stored.  Raises `ProductError` like
+        `Product` does.
+        """
+        product = self.get(text)
+        if product is None:
+            product = Product(text)
+            self.put(text, product)
+        return product
+
+    def _discard(self, key):
+        self.size -= self._index.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        while self.size > self.maxsize and self._index:
+            self._discard(iter(self._index).next())
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, text):
+        return os.path.exists(self._path(self.key(text)))
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+The ``nwscode`` command: decodes products to JSON Lines.
+
+    nwscode [options] [PATH ...]
+
+Each PATH is a product file, a file of NOAAPort framed products (see
+`nwscode.feed`) or a directory, which is read recursively.  Without a
+PATH, or with ``-``, products are read from standard input.  One record
+per event (see `nwscode.export`) is written to standard output or the
+``--output`` file, and a report of the throughput, the errors and the
+time spent in each decoding stage goes to standard error at the end.
+
+Products are decoded in ``--processes`` worker processes, in batches, and
+written in the order they were read.  Run it as ``python -m nwscode.cli``
+where the package is not installed.
+
+Created by Alexander Ross on 2006-08-25.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+__all__ = ["main"]
+
+import os
+import sys
+import time
+import itertools
+import multiprocessing
+from optparse import OptionParser
+from cStringIO import StringIO
+
+import instrument
+from nwscode import ErrorLog
+from product import decode_products
+from feed import SOH, iterframes
+from export import COLUMNS, records, JsonLinesWriter
+
+USAGE = "%prog [options] [PATH ...]"
+
+# set in each worker by `_init_worker`.
+_match = None
+
+class _Filter(object):
+    # tells whether a record passes the filters; a class so it pickles.
+    def __init__(self, categories=(), phenomena=(), offices=()):
+        self.tests = []
+        for column, values in [("awips_category", categories),
+                               ("pvtec_phenomena", phenomena)]:
+            if values:
+                self.tests.append((COLUMNS.index(column), frozenset(values)))
+        # 'PSR' matches KPSR, 'PAFG' only itself.
+        self.office = COLUMNS.index("pvtec_officeid")
+        self.offices = frozenset([o for o in offices if len(o) == 4])
+        self.short = frozenset([o for o in offices if len(o) != 4])
+
+    def __call__(self, row):
+        for i, values in self.tests:
+            if row[i] not in values:
+                return False
+        if self.offices or self.short:
+            office = row[self.office]
+            return office in self.offices or office[1:] in self.short
+        return True
+
+def _init_worker(match, timings):
+    global _match
+    _match = match
+    if timings:
+        instrument.enable()
+
+def _decode_batch(texts):
+    # runs in a worker: returns (JSON Lines, products, records, error
+    # counts, stage statistics) of a batch of texts.
+    errors = ErrorLog(limit=0)
+    out = StringIO()
+    writer = JsonLinesWriter(out, buffersize=sys.maxint)
+    n = 0
+    for product in decode_products(texts, errors):
+        n += 1
+        writer.writerecords([row for row in records(product) if _match(row)])
+    writer.flush()
+    snapshot = instrument.registry.snapshot()
+    instrument.registry.reset()
+    return out.getvalue(), n, writer.count, errors.counts, snapshot
+
+def _paths(paths):
+    # the files of `paths`, directories walked in sorted order.
+    for path in paths:
+        if path == "-" or not os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted([d for d in dirs if not d.startswith(".")])
+            for name in sorted(files):
+                if not name.startswith("."):
+                    yield os.path.join(root, name)
+
+def _texts(paths):
+    # the product texts of all files; framed files hold many products.
+    for path in _paths(paths):
+        if path == "-":
+            stream = sys.stdin
+        else:
+            stream = open(path, "rb")
+        try:
+            first = stream.read(1)
+            if first == SOH:
+                chunks = iter(lambda: stream.read(65536), "")
+                for text in iterframes(itertools.chain([first], chunks)):
+                    yield text
+            else:
+                yield first + stream.read()
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+def _batches(texts, size):
+    texts = iter(texts)
+    while True:
+        batch = list(itertools.islice(texts, size))
+        if not batch:
+            return
+        yield batch
+
+def _report(out, products, rows, seconds, errors, stats):
+    rate = seconds and products / seconds or 0.0
+    print >>out, "%d products, %d records in %.2f s (%.1f products/s)" % \
+                                            (products, rows, seconds, rate)
+    if errors:
+        counts = ["%s %d" % item for item in sorted(errors.items())]
+        print >>out, "errors: " + ", ".join(counts)
+    else:
+        print >>out, "errors: none"
+    stages = stats["stages"]
+    if stages:
+        print >>out, "%-14s %10s %10s %10s" % ("stage", "calls", "seconds",
+                                               "mean us")
+        for name, s in sorted(stages.items(), key=lambda i: -i[1].seconds):
+            mean = 1e6 * s.seconds / s.count
+            print >>out, "%-14s %10d %10.3f %10.1f" % (name, s.count,
+                                                       s.seconds, mean)
+
+def _options():
+    parser = OptionParser(usage=USAGE, prog="nwscode")
+    parser.add_option("-j", "--processes", type="int",
+                      default=multiprocessing.cpu_count(),
+                      help="number of worker processes, 0 to decode in this "
+                           "one [default: %default]")
+    parser.add_option("-b", "--batch", type="int", default=50,
+                      help="products per batch [default: %default]")
+    parser.add_option("-c", "--category", action="append", default=[],
+                      help="only products of this AWIPS category, e.g. TOR; "
+                           "may be repeated or comma separated")
+    parser.add_option("-p", "--phenomena", action="append", default=[],
+                      help="only events of this P-VTEC phenomena, e.g. FF")
+    parser.add_option("-O", "--office", action="append", default=[],
+                      help="only events issued by this office, e.g. KPSR "
+                           "or PSR")
+    parser.add_option("-o", "--output", metavar="FILE",
+                      help="write the records to FILE instead of stdout")
+    parser.add_option("--no-timings", dest="timings", action="store_false",
+                      default=True, help="don't time the decoding stages")
+    parser.add_option("-q", "--quiet", action="store_true", default=False,
+                      help="don't print the report")
+    return parser
+
+def _split(values):
+    return [v.strip().upper() for value in values for v in value.split(",")
+            if v.strip()]
+
+def main(argv=None):
+    parser = _options()
+    options, paths = parser.parse_args(argv)
+    for path in paths:
+        if path != "-" and not os.path.exists(path):
+            parser.error("no such file or directory: %s" % path)
+    if options.processes < 0 or options.batch < 1:
+        parser.error("--processes must be >= 0 and --batch >= 1")
+    match = _Filter(_split(options.category), _split(options.phenomena),
+                    _split(options.office))
+    if options.output:
+        out = open(options.output, "wb")
+    else:
+        out = sys.stdout
+    batches = _batches(_texts(paths or ["-"]), options.batch)
+    if options.processes:
+        pool = multiprocessing.Pool(options.processes, _init_worker,
+                                    (match, options.timings))
+        results = pool.imap(_decode_batch, batches)
+    else:
+        pool = None
+        _init_worker(match, options.timings)
+        results = itertools.imap(_decode_batch, batches)
+    start = time.time()
+    products = rows = 0
+    errors, stats = {}, instrument.Registry()
+    try:
+        for lines, n, count, counts, snapshot in results:
+            out.write(lines)
+            products += n
+            rows += count
+            for kind, k in counts.items():
+                errors[kind] = errors.get(kind, 0) + k
+            stats.merge(snapshot)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if out is not sys.stdout:
+            out.close()
+        else:
+            out.flush()
+        instrument.disable()
+    if not options.quiet:
+        _report(sys.stderr, products, rows, time.time() - start, errors,
+                stats.snapshot())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Warning statistics kept up to date as products come in.
+
+`EventCube` counts events, and adds up their durations, by the
+`DIMENSIONS` office, phenomena, significance, action, year and month.
+Every event updates each roll-up of these at once, i.e. the cells with
+any of the dimensions summed over (`ALL`), so a statistic is a dict
+lookup however much was added:
+
+    cube = EventCube()
+    for product in decode_products(texts, errors):
+        cube.add(product)
+    cube.get(officeid="KDMX", phenomena="TO", significance="W",
+             action="NEW", year=2006).count
+    cube.breakdown(["officeid", "year"], phenomena="TO",
+                   significance="W", action="NEW")
+
+The year and month are those of the event's begin time, or of its end
+time if it has none, and `UNKNOWN` if it has neither.  A VTEC code in several segments of a product is
+counted once.  To count warnings rather than the products about them,
+ask for an action: ``NEW`` counts each warning once.
+
+A cube pickles, so it can be kept between runs, and cubes of parts of an
+archive can be merged.
+
+Created by Alexander Ross on 2006-09-06.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+__all__ = ["EventCube", "Cell", "DIMENSIONS", "ALL", "UNKNOWN"]
+
+import itertools
+from operator import itemgetter
+from collections import namedtuple
+
+from misc import yearmonth
+
+DIMENSIONS = ("officeid", "phenomena", "significance", "action", "year",
+              "month")
+
+# the value of a dimension that is summed over.
+ALL = None
+
+# the year and month of an event without times.
+UNKNOWN = 0
+
+# statistics of one cell: the number of events, how many of them have
+# both a begin and an end time, and their minutes in effect.
+Cell = namedtuple("Cell", "count timed minutes")
+_empty = Cell(0, 0, 0)
+
+# a roll-up is a tuple of a flag for each dimension, True if it's summed
+# over; the getter picks a cell key from the values plus `ALL`.
+_rollups = [(rollup, itemgetter(*[(i, len(DIMENSIONS))[summed]
+                                  for i, summed in enumerate(rollup)]))
+            for rollup in itertools.product((False, True),
+                                            repeat=len(DIMENSIONS))]
+
+class EventCube(object):
+    """
+    Event counts and durations by `DIMENSIONS`; see the module
+    documentation.
+
+    Attributes:
+
+        ``products``
+            Number of products added.
+    """
+    def __init__(self):
+        self.products = 0
+        # the cells of each roll-up: {values: [count, timed, minutes]}.
+        self._cells = dict([(rollup, {}) for rollup, get in _rollups])
+
+    def add(self, product):
+        """Adds the events of `product`; returns how many there were."""
+        seen = set()
+        for seg in product.segments:
+            for event in seg.events:
+                if event.pvtec.raw not in seen:
+                    seen.add(event.pvtec.raw)
+                    self._add(event.pvtec)
+        self.products += 1
+        return len(seen)
+
+    def _add(self, pvtec):
+        # the raw codes; the attributes are their interpretations.
+        code = pvtec.code
+        begin, end = pvtec.minutes.eventbegin, pvtec.minutes.eventend
+        when = begin
+        if when is None:
+            when = end
+        if when is None:
+            year = month = UNKNOWN
+        else:
+            year, month = yearmonth(when)
+        if begin is None or end is None or end < begin:
+            timed, minutes = 0, 0
+        else:
+            timed, minutes = 1, end - begin
+        values = (code.officeid, code.phenomena, code.significance,
+                  code.action, year, month, ALL)
+        cells = self._cells
+        for rollup, get in _rollups:
+            key = get(values)
+            cell = cells[rollup].get(key)
+            if cell is None:
+                cells[rollup][key] = [1, timed, minutes]
+            else:
+                cell[0] += 1
+                cell[1] += timed
+                cell[2] += minutes
+
+    def get(self, **values):
+        """
+        Returns the `Cell` of the given dimension values, e.g.
+        ``officeid="KDMX", year=2006``; the dimensions not given are
+        summed over.
+        """
+        for name in values:
+            if name not in DIMENSIONS:
+                raise TypeError("Unknown dimension: %s" % name)
+        key = tuple([values.get(name, ALL) for name in DIMENSIONS])
+        rollup = tuple([value is ALL for value in key])
+        cell = self._cells[rollup].get(key)
+        if cell is None:
+            return _empty
+        return Cell(*cell)
+
+    def breakdown(self, by, **values):
+        """
+        Returns a dict of the `Cell`s by the values of the dimensions in
+        the sequence `by`, as tuples, for the given values of other
+        dimensions, e.g. ``breakdown(["officeid", "year"],
+        phenomena="TO")``.  Only the cells of that roll-up are read.
+        """
+        for name in list(by) + values.keys():
+            if name not in DIMENSIONS:
+                raise TypeError("Unknown dimension: %s" % name)
+        rollup = tuple([name not in by and values.get(name) is ALL
+                        for name in DIMENSIONS])
+        fixed = [(i, values[name]) for i, name in enumerate(DIMENSIONS)
+                 if values.get(name) is not ALL]
+        pick = [DIMENSIONS.index(name) for name in by]
+        result = {}
+        for key, cell in self._cells[rollup].iteritems():
+            for i, value in fixed:
+                if key[i] != value:
+                    break
+            else:
+                result[tuple([key[i] for i in pick])] = Cell(*cell)
+        return result
+
+    def merge(self, other):
+        """Adds the statistics of the `EventCube` `other`."""
+        for rollup, cells in other._cells.iteritems():
+            mine = self._cells[rollup]
+            for key, cell in cells.iteritems():
+                if key in mine:
+                    c = mine[key]
+                    c[0] += cell[0]
+                    c[1] += cell[1]
+                    c[2] += cell[2]
+                else:
+                    mine[key] = list(cell)
+        self.products += other.products
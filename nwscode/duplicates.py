@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Duplicate and retransmission filtering for product feeds.
+
+NOAAPort and the other feeds deliver the same product more than once, and
+send corrections and amendments with the same WMO heading plus a BBB
+group in `WmoHeader.addendum`:
+
+    ``RRx``
+        delayed or retransmitted product.
+
+    ``CCx``
+        correction of a previously sent product.
+
+    ``AAx``
+        amendment of a previously sent product.
+
+`DuplicateFilter` remembers a fingerprint of every product it has passed
+for a limited time and a limited number of products, so its memory use
+never grows past `capacity` entries no matter how long the feed runs.
+
+Created by Alexander Ross on 2006-08-16.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+__all__ = ["DuplicateFilter", "fingerprint", "NEW", "DUPLICATE",
+           "DELAYED", "CORRECTION", "AMENDMENT"]
+
+import time
+from collections import deque
+try:
+    from hashlib import md5
+except ImportError:
+    from md5 import new as md5
+
+from header import split_header
+
+# product status.
+NEW = "new"
+DUPLICATE = "duplicate"
+DELAYED = "delayed"
+CORRECTION = "correction"
+AMENDMENT = "amendment"
+
+_addenda = {"RR": DELAYED, "CC": CORRECTION, "AA": AMENDMENT}
+
+def fingerprint(text):
+    """
+    Returns ``(digest, status)`` for the product `text`.
+
+    The digest covers the WMO designator, station and issuance, the AWIPS
+    Identifier and the rest of the text, but not the BBB group, so a
+    retransmission of identical content gets the same digest as the
+    original.  Carriage returns and surrounding whitespace are ignored;
+    a unicode `text` is hashed as UTF-8, so it matches the same product
+    received as bytes.
+    `status` is derived from the BBB group alone and is one of `NEW`,
+    `DELAYED`, `CORRECTION` or `AMENDMENT`.
+
+    Raises `WmoError` or `AwipsIdError` for a malformed header.
+    """
+    if isinstance(text, unicode):
+        # md5 wants bytes and would encode as ASCII by itself.
+        text = text.encode('utf-8')
+    text = text.strip().replace('\r', '')
+    groups = split_header(text)
+    addendum = groups[3]
+    body = text[text.index('\n'):]
+    digest = md5(''.join(groups[:3]))
+    digest.update(body)
+    if addendum is None:
+        status = NEW
+    else:
+        status = _addenda.get(addendum[:2], NEW)
+    return digest.digest(), status
+
+class DuplicateFilter(object):
+    """
+    Drops products that were already seen and tags the rest.
+
+    Fingerprints are kept for `window` seconds and at most `capacity` of
+    them are kept at all, the oldest being forgotten first.  Each entry
+    costs a 16 byte digest plus its place in a dict and a deque.
+
+    Attributes:
+
+        ``counts``
+            Number of products checked, by status.
+
+    Usage Example:
+
+    >>> f = DuplicateFilter(capacity=1000, window=600)
+    >>> f.check('SMIN04 DEMS 171200\\nZFPAFG\\nTEXT', now=0)
+    'new'
+    >>> f.check('SMIN04 DEMS 171200 RRA\\nZFPAFG\\nTEXT', now=10)
+    'duplicate'
+    >>> f.check('SMIN04 DEMS 171200 CCA\\nZFPAFG\\nNEW TEXT', now=20)
+    'correction'
+    """
+    def __init__(self, capacity=100000, window=3600):
+        self.capacity = capacity
+        self.window = window
+        self.counts = dict.fromkeys([NEW, DUPLICATE, DELAYED,
+                                     CORRECTION, AMENDMENT], 0)
+        self._seen = {}
+        self._order = deque()
+        self._serial = 0
+
+    def _expire(self, now):
+        order, seen = self._order, self._seen
+        horizon = now - self.window
+        while order and (order[0][0] < horizon
+                         or len(order) >= self.capacity):
+            stamp, serial, digest = order.popleft()
+            # only forget a digest when this is its most recent sighting.
+            if seen.get(digest) == serial:
+                del seen[digest]
+
+    def check(self, text, now=None):
+        """
+        Returns the status of the product `text` and remembers it.
+
+        `now` is the receipt time in seconds, `time.time()` by default.
+        """
+        if now is None:
+            now = time.time()
+        digest, status = fingerprint(text)
+        self._expire(now)
+        if digest in self._seen:
+            status = DUPLICATE
+        self._serial += 1
+        self._seen[digest] = self._serial
+        self._order.append((now, self._serial, digest))
+        self.counts[status] += 1
+        return status
+
+    def filter(self, texts):
+        """
+        Yields ``(text, status)`` for each product in the iterable `texts`
+        that is not a duplicate.
+        """
+        check = self.check
+        for text in texts:
+            status = check(text)
+            if status is not DUPLICATE:
+                yield text, status
+
+    def __len__(self):
+        return len(self._seen)
@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Decoded events in fixed-width binary records.
+
+An event file holds one record of `RECORD_SIZE` bytes for each `Event`,
+so years of warnings can be scanned without decoding any text: with numpy
+`EventReader.array` memory-maps the file as a structured array of `dtype`
+and a scan is a few vectorized operations.  The record fields, little
+endian and without padding between them, are:
+
+    ``zones``, ``nzones``
+        Index of the first of the event's zones in the zone file, and how
+        many there are.
+
+    ``etn``
+        The event tracking number.
+
+    ``eventbegin``, ``eventend``
+        VTEC times as minutes since the epoch, `NOTIME` if there is none.
+
+    ``floodbegin``, ``floodcrest``, ``floodend``
+        H-VTEC times, likewise; `NOTIME` for events without H-VTEC.
+
+    ``officeid``, ``phenomena``, ``significance``, ``action``, ``fixedid``
+        The raw P-VTEC codes, e.g. ``KPSR``, ``EH``, ``W``, ``CON``, ``O``.
+
+    ``siteid``, ``floodseverity``, ``immediatecause``, ``recordstatus``
+        The raw H-VTEC codes, empty for events without H-VTEC.
+
+The zones are in a second file, the event file's path plus ``.zones``, as
+6 byte codes (``AZZ022``); the events of a segment share its zones.  The
+event file starts with a 16 byte header of `MAGIC` and the record size.
+
+Usage Example:
+
+    writer = EventWriter("events.bin")
+    writer.writeall(decode_products(texts, errors))
+    writer.close()
+
+    events = EventReader("events.bin").array()
+    heat = events[(events["phenomena"] == "EH")
+                  & (events["significance"] == "W")]
+
+Created by Alexander Ross on 2006-09-04.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+__all__ = ["EventWriter", "EventReader", "EventRecord", "FIELDS", "dtype",
+           "MAGIC", "RECORD_SIZE", "NOTIME", "ZONE_SIZE"]
+
+import os
+import struct
+from collections import namedtuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# (name, struct format) of each field of a record, in order.
+FIELDS = (("zones", "Q"), ("nzones", "I"), ("etn", "H"),
+          ("eventbegin", "i"), ("eventend", "i"),
+          ("floodbegin", "i"), ("floodcrest", "i"), ("floodend", "i"),
+          ("officeid", "4s"), ("phenomena", "2s"), ("significance", "1s"),
+          ("action", "3s"), ("fixedid", "1s"),
+          ("siteid", "5s"), ("floodseverity", "1s"),
+          ("immediatecause", "2s"), ("recordstatus", "2s"))
+
+_record = struct.Struct("<" + "".join([f for n, f in FIELDS]) + "x")
+RECORD_SIZE = _record.size
+ZONE_SIZE = 6
+MAGIC = "NWSEVT02"
+_header = struct.Struct("<8sI4x")
+HEADER_SIZE = _header.size
+
+# a missing time.
+NOTIME = -2 ** 31
+
+EventRecord = namedtuple("EventRecord", [n for n, f in FIELDS])
+
+_numpy_types = {"Q": "<u8", "I": "<u4", "H": "<u2", "i": "<i4"}
+
+def dtype():
+    """
+    Returns the numpy dtype of a record.  Requires numpy.
+    """
+    if numpy is None:
+        raise ImportError("dtype requires numpy.")
+    names, formats, offsets = [], [], []
+    offset = 0
+    for name, f in FIELDS:
+        names.append(name)
+        formats.append(_numpy_types.get(f, "S" + f[:-1]))
+        offsets.append(offset)
+        offset += struct.calcsize("<" + f)
+    return numpy.dtype({"names": names, "formats": formats,
+                        "offsets": offsets, "itemsize": RECORD_SIZE})
+
+def _minutes(value):
+    if value is None:
+        return NOTIME
+    return value
+
+def _strip(value):
+    # struct pads codes with NULs, which numpy strips.
+    if isinstance(value, str):
+        return value.rstrip("\0")
+    return value
+
+def _check(path):
+    # the number of records in the existing event file `path`.
+    size = os.path.getsize(path)
+    f = open(path, "rb")
+    try:
+        magic, recordsize = _header.unpack(f.read(HEADER_SIZE))
+    finally:
+        f.close()
+    if magic != MAGIC or recordsize != RECORD_SIZE:
+        raise ValueError("Not an event file: %s" % path)
+    return (size - HEADER_SIZE) // RECORD_SIZE
+
+class EventWriter(object):
+    """
+    Appends the events of products to the event file at `path`, which is
+    created if needed, `buffersize` products at a time.  The zones are
+    written before the records that refer to them, so the files are
+    consistent whenever a reader looks; what an interrupted write left
+    past the last complete record is dropped when a writer is opened.
+
+    Attributes:
+
+        ``count``
+            Number of events in the file, including the buffered ones.
+    """
+    def __init__(self, path, buffersize=1000):
+        self.path = path
+        self.buffersize = buffersize
+        if os.path.exists(path) and os.path.getsize(path):
+            self.count = _check(path)
+            # a partial record at the end, from an interrupted write, is
+            # dropped; the zones end where those of the last record do.
+            end = HEADER_SIZE + self.count * RECORD_SIZE
+            f = open(path, "r+b")
+            try:
+                f.truncate(end)
+                if self.count:
+                    f.seek(end - RECORD_SIZE)
+                    last = _record.unpack(f.read(RECORD_SIZE))
+                    self._nzones = last[0] + last[1]
+                else:
+                    self._nzones = 0
+            finally:
+                f.close()
+        else:
+            f = open(path, "wb")
+            f.write(_header.pack(MAGIC, RECORD_SIZE))
+            f.close()
+            self.count = self._nzones = 0
+        # zones written before an interruption kept their records from
+        # being written; they are dropped too.
+        zonepath = path + ".zones"
+        if os.path.exists(zonepath):
+            size = self._nzones * ZONE_SIZE
+            if os.path.getsize(zonepath) < size:
+                raise ValueError("Zones missing from: %s" % zonepath)
+            f = open(zonepath, "r+b")
+            try:
+                f.truncate(size)
+            finally:
+                f.close()
+        elif self._nzones:
+            raise ValueError("Zones missing from: %s" % zonepath)
+        self._records = []
+        self._zones = []
+        self._products = 0
+
+    def write(self, product):
+        """Buffers the events of `product`; returns how many there were."""
+        pack = _record.pack
+        n = 0
+        for seg in product.segments:
+            if not seg.events:
+                continue
+            first, areas = self._nzones, seg.ugc.areas
+            self._zones.extend(areas)
+            self._nzones += len(areas)
+            for event in seg.events:
+                p, times = event.pvtec._matches, event.pvtec.minutes
+                h = event.hvtec
+                if h is None:
+                    hvtec = (NOTIME, NOTIME, NOTIME)
+                    hcodes = ("", "", "", "")
+                else:
+                    hvtec = (_minutes(h.minutes.floodbegin),
+                             _minutes(h.minutes.floodcrest),
+                             _minutes(h.minutes.floodend))
+                    m = h._matches
+                    hcodes = (m[0], m[1], m[2], m[6])
+                self._records.append(pack(first, len(areas), int(p[5]),
+                        _minutes(times.eventbegin), _minutes(times.eventend),
+                        hvtec[0], hvtec[1], hvtec[2],
+                        p[2], p[3], p[4], p[1], p[0],
+                        hcodes[0], hcodes[1], hcodes[2], hcodes[3]))
+                n += 1
+        self.count += n
+        self._products += 1
+        if self._products >= self.buffersize:
+            self.flush()
+        return n
+
+    def writeall(self, products):
+        """Writes the events of each product in the iterable `products`."""
+        for product in products:
+            self.write(product)
+
+    def flush(self):
+        """Appends the buffered zones and records to the files."""
+        if self._zones:
+            f = open(self.path + ".zones", "ab")
+            try:
+                f.write("".join([z.ljust(ZONE_SIZE)[:ZONE_SIZE]
+                                 for z in self._zones]))
+            finally:
+                f.close()
+        if self._records:
+            f = open(self.path, "ab")
+            try:
+                f.write("".join(self._records))
+            finally:
+                f.close()
+        self._records = []
+        self._zones = []
+        self._products = 0
+
+    close = flush
+
+class EventReader(object):
+    """
+    Reads the event file at `path`, as written by `EventWriter`.  Records
+    appended after it was opened aren't seen.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._count = _check(path)
+        zonepath = path + ".zones"
+        if os.path.exists(zonepath):
+            self._nzones = os.path.getsize(zonepath) // ZONE_SIZE
+        else:
+            self._nzones = 0
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        """Yields an `EventRecord` for each record; no numpy needed."""
+        f = open(self.path, "rb")
+        try:
+            f.seek(HEADER_SIZE)
+            unpack, size = _record.unpack, RECORD_SIZE
+            for i in xrange(self._count):
+                yield EventRecord._make(map(_strip,
+                                            unpack(f.read(size))))
+        finally:
+            f.close()
+
+    def array(self):
+        """
+        Returns the records as a read-only numpy structured array of
+        `dtype`, memory-mapped from the file.  Requires numpy.
+        """
+        if numpy is None:
+            raise ImportError("EventReader.array requires numpy.")
+        if not self._count:
+            return numpy.zeros(0, dtype())
+        return numpy.memmap(self.path, dtype(), "r", HEADER_SIZE,
+                            (self._count,))
+
+    def zonearray(self):
+        """
+        Returns all the zones as a read-only numpy array of 6 byte
+        strings, memory-mapped; a record's zones are
+        ``zonearray()[r["zones"]:r["zones"] + r["nzones"]]``.  Requires
+        numpy.
+        """
+        if numpy is None:
+            raise ImportError("EventReader.zonearray requires numpy.")
+        if not self._nzones:
+            return numpy.zeros(0, "S%d" % ZONE_SIZE)
+        return numpy.memmap(self.path + ".zones", "S%d" % ZONE_SIZE, "r",
+                            0, (self._nzones,))
+
+    def zones(self, record):
+        """
+        Returns the list of zones of `record`, an `EventRecord` or a
+        record of the `array`.
+        """
+        # ``zones`` and ``nzones`` are the first two fields of both.
+        first, n = int(record[0]), int(record[1])
+        f = open(self.path + ".zones", "rb")
+        try:
+            f.seek(first * ZONE_SIZE)
+            data = f.read(n * ZONE_SIZE)
+        finally:
+            f.close()
+        return [data[i:i + ZONE_SIZE].rstrip()
+                for i in range(0, len(data), ZONE_SIZE)]
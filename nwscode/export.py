@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Export of decoded events as flat records, to JSON Lines or CSV.
+
+Every `Event` of a product becomes one record with the columns in
+`COLUMNS`: the product's WMO heading and AWIPS Identifier, the UGC of its
+segment and the fields of its P-VTEC and H-VTEC codes.  Codes are written
+as the raw values of the product (``NEW``, not ``New``), VTEC times and
+the UGC expiration as ``YYYY-MM-DDTHH:MMZ`` and missing values as null or an empty CSV cell.
+
+The column getters are built once from the ``fields`` of each code class
+(`WMO_GETTERS` and the like, which other flat layouts can share), and
+output is written in batches, so a writer can stream any number of
+products to a file without keeping them.
+
+Usage Example:
+
+    writer = JsonLinesWriter(open("events.jsonl", "w"))
+    writer.writeall(decode_products(texts, errors))
+    writer.flush()
+
+Created by Alexander Ross on 2006-08-25.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+__all__ = ["COLUMNS", "records", "JsonLinesWriter", "CsvWriter",
+           "WMO_GETTERS", "AWIPS_GETTERS", "PVTEC_GETTERS", "HVTEC_GETTERS",
+           "NO_HVTEC"]
+
+import csv
+import json
+from cStringIO import StringIO
+
+from nwscode import TimeField
+from misc import fromepochminutes
+from wmo import WmoHeader
+from awipsid import AwipsId
+from pvtec import Pvtec
+from hvtec import Hvtec
+
+def _getters(cls, prefix):
+    # (column, getter) for each field of `cls`, reading the raw groups the
+    # decoder kept rather than building the ``code`` Bunch.
+    getters = []
+    for field in cls.fields:
+        if isinstance(field, TimeField):
+            def get(code, name=field.name):
+                return _isotime(getattr(code.minutes, name))
+        elif field.group is not None:
+            def get(code, group=field.group):
+                return code._matches[group]
+        else:
+            def get(code, field=field):
+                return field.extract(code._matches, code.raw)
+        getters.append((prefix + field.name, get))
+    return getters
+
+def _isotime(minutes):
+    if minutes is None:
+        return None
+    return fromepochminutes(minutes).strftime("%Y-%m-%dT%H:%MZ")
+
+# (column, getter) of each field of each code; NO_HVTEC are the values
+# of the H-VTEC columns of an event without one.
+WMO_GETTERS = _getters(WmoHeader, "wmo_")
+AWIPS_GETTERS = _getters(AwipsId, "awips_")
+PVTEC_GETTERS = _getters(Pvtec, "pvtec_")
+HVTEC_GETTERS = _getters(Hvtec, "hvtec_")
+NO_HVTEC = (None,) * len(HVTEC_GETTERS)
+
+# the columns of a record, in order.
+COLUMNS = tuple([c for c, g in WMO_GETTERS + AWIPS_GETTERS] +
+                ["ugc_areas", "ugc_expiration"] +
+                [c for c, g in PVTEC_GETTERS + HVTEC_GETTERS])
+
+def records(product):
+    """
+    Yields one tuple of values, in the order of `COLUMNS`, for each event
+    in `product`.  ``ugc_areas`` is a list of area codes, and
+    ``ugc_expiration`` is resolved against `Product.issuanceminutes`.
+    """
+    wmo, awips = product.header.wmo, product.header.awipsid
+    head = tuple([get(wmo) for c, get in WMO_GETTERS] +
+                 [get(awips) for c, get in AWIPS_GETTERS])
+    issued = product.issuanceminutes()
+    for seg in product.segments:
+        if not seg.events:
+            continue
+        expiration = None
+        if issued is not None:
+            expiration = _isotime(seg.ugc.expirationminutes(issued))
+        ugc = head + (seg.ugc.areas, expiration)
+        for event in seg.events:
+            pvtec = tuple([get(event.pvtec) for c, get in PVTEC_GETTERS])
+            if event.hvtec is None:
+                yield ugc + pvtec + NO_HVTEC
+            else:
+                yield ugc + pvtec + tuple([get(event.hvtec)
+                                           for c, get in HVTEC_GETTERS])
+
+class _Writer(object):
+    """
+    Writes `records` to the file-like `stream`, `buffersize` records at a
+    time.  Subclasses define ``_format(rows)``, which returns the text of
+    the list of records `rows`.
+
+    Attributes:
+
+        ``count``
+            Number of records written so far.
+    """
+    def __init__(self, stream, buffersize=1000):
+        self.stream = stream
+        self.buffersize = buffersize
+        self.count = 0
+        self._buffer = []
+
+    def write(self, product):
+        """Buffers the records of `product`; returns how many there were."""
+        return self.writerecords(records(product))
+
+    def writerecords(self, rows):
+        """
+        Buffers the records `rows`, e.g. a filtered selection of
+        `records`; returns how many there were.
+        """
+        buf = self._buffer
+        n = len(buf)
+        buf.extend(rows)
+        added = len(buf) - n
+        self.count += added
+        if len(buf) >= self.buffersize:
+            self.flush()
+        return added
+
+    def writeall(self, products):
+        """Writes the records of each product in the iterable `products`."""
+        for product in products:
+            self.write(product)
+
+    def flush(self):
+        """Writes out the buffered records."""
+        if self._buffer:
+            self.stream.write(self._format(self._buffer))
+            self._buffer = []
+
+class JsonLinesWriter(_Writer):
+    """
+    Writes one JSON object per line, keyed by `COLUMNS`.  See `_Writer`.
+    """
+    # '"column": ' of each column, so a record needs no dict.
+    _keys = [json.dumps(c) + ": " for c in COLUMNS]
+
+    def _format(self, rows):
+        dumps, keys = json.dumps, self._keys
+        lines = []
+        for row in rows:
+            lines.append("{%s}\n" % ", ".join([k + dumps(v)
+                                               for k, v in zip(keys, row)]))
+        return "".join(lines)
+
+class CsvWriter(_Writer):
+    """
+    Writes CSV with a header line of `COLUMNS`; ``ugc_areas`` are joined
+    by spaces.  See `_Writer`.
+    """
+    _areas = COLUMNS.index("ugc_areas")
+
+    def __init__(self, stream, buffersize=1000, header=True):
+        _Writer.__init__(self, stream, buffersize)
+        if header:
+            stream.write(self._format([COLUMNS]))
+
+    def _format(self, rows):
+        out = StringIO()
+        writer = csv.writer(out, lineterminator="\n")
+        i = self._areas
+        for row in rows:
+            if not isinstance(row[i], basestring):
+                row = row[:i] + (" ".join(row[i]),) + row[i + 1:]
+            writer.writerow(row)
+        return out.getvalue()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Framing of product streams.
+
+Products on NOAAPort, and therefore in the output of LDM's ``pqact``
+PIPE action, are framed like this::
+
+    SOH \\r\\r\\n nnn \\r\\r\\n WMO heading ... text ... \\r\\r\\n ETX
+
+where SOH is '\\x01', ETX is '\\x03' and nnn a sequence number.  `frame`
+builds such a frame, `unframe` turns one back into text `Product` can
+decode and `Framer`, `iterframes` and `readframes` cut a byte stream into
+products.
+
+Created by Alexander Ross on 2006-08-23.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+__all__ = ["SOH", "ETX", "frame", "unframe", "Framer", "iterframes",
+           "readframes"]
+
+SOH = "\x01"
+ETX = "\x03"
+
+def frame(text, sequence=0):
+    """Returns `text` framed the way NOAAPort sends it."""
+    body = text.strip().replace("\r\n", "\n").replace("\n", "\r\r\n")
+    return "%s\r\r\n%03d \r\r\n%s\r\r\n%s" % (SOH, sequence % 1000,
+                                             body, ETX)
+
+def unframe(data):
+    """
+    Returns the product text of one frame, without SOH, ETX, sequence
+    number and carriage returns.
+    """
+    text = data.strip(SOH + ETX + " \r\n").replace("\r", "")
+    first, sep, rest = text.partition("\n")
+    if sep and first.strip().isdigit():
+        # the sequence number line.
+        text = rest.lstrip()
+    return text
+
+class Framer(object):
+    """
+    Cuts a byte stream fed in chunks into products: `feed` returns the
+    list of the product texts of the frames its chunk completed.  Frames
+    may be split across chunks in any way; anything outside of a frame is
+    skipped.
+    """
+    def __init__(self):
+        # the pieces of the frame that has no ETX yet, or None outside
+        # of a frame; they are only joined once the ETX is in.
+        self._pieces = None
+
+    def feed(self, chunk):
+        texts = []
+        pos = 0
+        while True:
+            if self._pieces is None:
+                soh = chunk.find(SOH, pos)
+                if soh < 0:
+                    break
+                self._pieces = []
+                pos = soh + 1
+            etx = chunk.find(ETX, pos)
+            if etx < 0:
+                self._pieces.append(chunk[pos:])
+                break
+            self._pieces.append(chunk[pos:etx])
+            texts.append(unframe("".join(self._pieces)))
+            self._pieces = None
+            pos = etx + 1
+        return texts
+
+def iterframes(chunks):
+    """
+    Yields the product text of each frame in the iterable of strings
+    `chunks`, as soon as its ETX arrives.  See `Framer`.
+    """
+    feed = Framer().feed
+    for chunk in chunks:
+        for text in feed(chunk):
+            yield text
+
+def readframes(stream, chunksize=65536):
+    """
+    Like `iterframes`, reading the chunks from the file-like `stream`.
+    """
+    return iterframes(iter(lambda: stream.read(chunksize), ""))
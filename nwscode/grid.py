@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Zone by time grids of hazards, for climatologies.
+
+A `HazardGrid` has a row for each zone and a column for each time bin of
+`binsize` minutes, and adds up events in one of two ways:
+
+    ``count``
+        The number of events in effect at some time during the bin.
+
+    ``minutes``
+        The minutes each event was in effect during the bin, summed.
+
+Events are added in chunks of arrays, so any number of them can go
+through a grid in memory proportional to the grid: from decoded `Event`s
+with `HazardGrid.addevents`, or much faster from an event file (see
+`nwscode.eventfile`) with `HazardGrid.addfile`.
+
+Each event is taken as given.  VTEC codes of the same event in later
+products (``CON``, ``EXT``, ...) are events too, so to count every
+warning once pick the actions, e.g. ``actions=["NEW"]``.  An event without
+a begin time is taken to be in effect from the start of the grid; one
+without an end time is skipped, as its length isn't known.
+
+Requires numpy.
+
+Usage Example:
+
+    grid = HazardGrid(counties, datetime(2005, 12, 1), datetime(2006, 3, 1),
+                      binsize=1440, mode="minutes")
+    grid.addfile(EventReader("events.bin"), phenomena="WS",
+                 significance="W")
+    hours = grid.grid.sum(axis=1) / 60.0
+
+Created by Alexander Ross on 2006-09-05.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+__all__ = ["HazardGrid"]
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from misc import toepochminutes, fromepochminutes
+from eventfile import NOTIME
+
+MODES = ("count", "minutes")
+
+def _accumulate(flat, index, weights=None):
+    # flat[index] += weights (1 without), repeated indices adding up; the
+    # temporaries are the size of `index`, not of `flat`.
+    if not len(index):
+        return
+    if weights is None:
+        index, n = numpy.unique(index, return_counts=True)
+        flat[index] += n
+        return
+    order = index.argsort(kind="mergesort")
+    index, weights = index[order], weights[order]
+    starts = numpy.flatnonzero(numpy.r_[True, index[1:] != index[:-1]])
+    flat[index[starts]] += numpy.add.reduceat(weights, starts)
+
+class HazardGrid(object):
+    """
+    A grid of the zones in the sequence `zones` (``AZZ022``, ...) by the
+    bins of `binsize` minutes from the datetime `start` up to `end`; a
+    last partial bin is cut off at `end`.  `mode` is ``count`` or
+    ``minutes``, see the module documentation.  Events in zones that
+    aren't in `zones` are ignored.
+
+    Attributes:
+
+        ``zones``
+            The zones, in the order of the rows.
+
+        ``edges``
+            The start of each bin in minutes since the epoch, and the end
+            of the last bin.
+    """
+    def __init__(self, zones, start, end, binsize=60, mode="count"):
+        if numpy is None:
+            raise ImportError("HazardGrid requires numpy.")
+        if mode not in MODES:
+            raise ValueError("Invalid mode: %s" % mode)
+        self.mode = mode
+        self.zones = list(zones)
+        self.binsize = binsize
+        self.start = toepochminutes(start)
+        self.end = toepochminutes(end)
+        if self.end <= self.start:
+            raise ValueError("The grid must end after it starts.")
+        nbins = -((self.start - self.end) // binsize)
+        self.edges = numpy.minimum(
+                numpy.arange(nbins + 1, dtype=numpy.int64) * binsize
+                + self.start, self.end)
+        codes = numpy.array(self.zones, dtype="S6")
+        self._order = codes.argsort(kind="mergesort")
+        self._sorted = codes[self._order]
+        # one column more than bins, for the ends in the last bin.
+        self._width = nbins + 1
+        self._diff = numpy.zeros(len(self.zones) * self._width, numpy.int64)
+        self._partial = numpy.zeros_like(self._diff)
+
+    def _rows(self, codes):
+        # the row of each zone code, -1 for those not in the grid.
+        codes = numpy.asarray(codes, dtype="S6")
+        if not len(self._sorted):
+            return numpy.zeros(len(codes), numpy.int64) - 1
+        i = numpy.minimum(self._sorted.searchsorted(codes),
+                          len(self._sorted) - 1)
+        return numpy.where(self._sorted[i] == codes, self._order[i], -1)
+
+    def add(self, zones, begin, end):
+        """
+        Adds events given as equal length arrays: the zone codes `zones`
+        and the `begin` and `end` times in minutes since the epoch, with
+        `nwscode.eventfile.NOTIME` for a missing time.
+        """
+        rows = self._rows(zones)
+        begin = numpy.asarray(begin, dtype=numpy.int64)
+        end = numpy.asarray(end, dtype=numpy.int64)
+        keep = (rows >= 0) & (end != NOTIME)
+        begin = numpy.where(begin == NOTIME, self.start, begin)
+        begin = numpy.maximum(begin, self.start)[keep]
+        end = numpy.minimum(end, self.end)[keep]
+        rows = rows[keep]
+        keep = end > begin
+        rows, begin, end = rows[keep], begin[keep], end[keep]
+        w, s = self.binsize, self.start
+        first = (begin - s) // w
+        # the last bin the event is in.
+        last = (end - 1 - s) // w
+        base = rows * self._width
+        if self.mode == "count":
+            _accumulate(self._diff, base + first)
+            _accumulate(self._diff, base + last + 1, -numpy.ones_like(last))
+            return
+        # the minutes in the first and the last bin go straight to the
+        # bins; the whole bins in between are counted as in ``count``.
+        _accumulate(self._partial, base + first,
+                    numpy.minimum(end, s + (first + 1) * w) - begin)
+        more = last > first
+        base, first, last, end = base[more], first[more], last[more], \
+                                 end[more]
+        _accumulate(self._partial, base + last, end - (s + last * w))
+        _accumulate(self._diff, base + first + 1)
+        _accumulate(self._diff, base + last, -numpy.ones_like(last))
+
+    def addevents(self, events, phenomena=None, significance=None,
+                  actions=None, chunksize=100000):
+        """
+        Adds the `Event`s of the iterable `events`, `chunksize` zones at a
+        time.  Only events of the given `phenomena` and `significance`
+        codes (``WS``, ``W``), and of an action in the list `actions`, are
+        added; None adds all.
+        """
+        zones, begin, end = [], [], []
+        for event in events:
+            # the raw codes; the attributes are their interpretations.
+            code = event.pvtec.code
+            if phenomena is not None and code.phenomena != phenomena or \
+               significance is not None and \
+               code.significance != significance or \
+               actions is not None and code.action not in actions:
+                continue
+            minutes = event.pvtec.minutes
+            b, e = minutes.eventbegin, minutes.eventend
+            if b is None:
+                b = NOTIME
+            if e is None:
+                e = NOTIME
+            areas = event.ugc.areas
+            zones.extend(areas)
+            begin.extend([b] * len(areas))
+            end.extend([e] * len(areas))
+            if len(zones) >= chunksize:
+                self.add(zones, begin, end)
+                zones, begin, end = [], [], []
+        if zones:
+            self.add(zones, begin, end)
+
+    def addfile(self, reader, phenomena=None, significance=None,
+                actions=None, chunksize=100000):
+        """
+        Adds the events of the `EventReader` `reader`, `chunksize` records
+        at a time; see `addevents`.
+        """
+        records = reader.array()
+        codes = reader.zonearray()
+        for i in xrange(0, len(records), chunksize):
+            chunk = records[i:i + chunksize]
+            keep = numpy.ones(len(chunk), bool)
+            if phenomena is not None:
+                keep &= chunk["phenomena"] == phenomena
+            if significance is not None:
+                keep &= chunk["significance"] == significance
+            if actions is not None:
+                keep &= numpy.in1d(chunk["action"], list(actions))
+            chunk = chunk[keep]
+            # one entry per zone of each record.
+            n = chunk["nzones"].astype(numpy.int64)
+            if not n.sum():
+                continue
+            starts = numpy.cumsum(n) - n
+            index = numpy.repeat(chunk["zones"].astype(numpy.int64)
+                                 - starts, n) + numpy.arange(n.sum())
+            self.add(codes[index], numpy.repeat(chunk["eventbegin"], n),
+                     numpy.repeat(chunk["eventend"], n))
+
+    def _grid(self):
+        grid = self._diff.reshape(len(self.zones), self._width).cumsum(1)
+        if self.mode == "minutes":
+            grid *= self.binsize
+            grid += self._partial.reshape(len(self.zones), self._width)
+        return grid[:, :-1]
+    grid = property(_grid, doc="""
+        The grid, a zones by bins integer array; a new array each time.""")
+
+    def times(self):
+        """Returns the start of each bin as a datetime."""
+        return [fromepochminutes(int(m)) for m in self.edges[:-1]]
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+A fast scanner for the communications header of a product: the *WMO
+Abbreviated Header* line followed by the *AWIPS Identifier* line.
+
+Both lines are fixed-width, so instead of running the `WmoHeader` and
+`AwipsId` regular expressions this module maps every character onto its
+character class with one `str.translate` call and looks the result up in
+a table of every valid layout.  Only the first few dozen bytes of the
+product are ever looked at.
+
+Created by Alexander Ross on 2006-08-14.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+__all__ = ["split_header", "HEADER_SPAN"]
+
+import string
+from wmo import WmoError
+from awipsid import AwipsIdError
+
+# Longest possible header, 'TTAAII CCCC YYGGgg BBB\r\r\nNNNXXX\r\r\n', is 35
+# characters.  Nothing past this point is ever looked at.
+HEADER_SPAN = 40
+
+# Character class table: letters become 'A', digits '9', a space stays a
+# space, line ends become 'n' and 'r', and anything else becomes '.'.
+_classes = ['.'] * 256
+for _c in string.ascii_uppercase:
+    _classes[ord(_c)] = 'A'
+for _c in string.digits:
+    _classes[ord(_c)] = '9'
+_classes[ord(' ')] = ' '
+_classes[ord('\n')] = 'n'
+_classes[ord('\r')] = 'r'
+CLASSES = ''.join(_classes)
+del _classes, _c
+
+def _signatures(*positions):
+    # every class string that can be built taking one class per position.
+    sigs = ['']
+    for choices in positions:
+        sigs = [s + c for s in sigs for c in choices]
+    return dict.fromkeys(sigs)
+
+# Class strings of every valid line.  `WmoHeader.pattern` allows digits in
+# the station, `AwipsId.pattern` allows digits in the category and spaces
+# in the designator.
+_alnum, _alsp = 'A9', 'A '
+WMO_SIGNATURES = _signatures('A', 'A', 'A', 'A', '9', '9', ' ',
+                             _alnum, _alnum, _alnum, _alnum, ' ',
+                             '9', '9', '9', '9', '9', '9')
+BBB_SIGNATURE = ' AAA'
+AWIPS_SIGNATURES = _signatures(_alnum, _alnum, _alnum, _alsp, _alsp, _alsp)
+del _alnum, _alsp
+
+def split_header(text):
+    """
+    Split the WMO heading and AWIPS Identifier off the top of `text`.
+
+    Returns a tuple of the raw code groups::
+
+        (designator, station, issuance, addendum, category, awipsdesignator)
+
+    ``addendum`` is None when the optional BBB group is missing.  Raises
+    `WmoError` or `AwipsIdError` when the respective line is malformed.
+    Apart from trailing carriage returns, the accepted lines are exactly
+    those accepted by `WmoHeader.pattern` and `AwipsId.pattern`.
+
+    >>> split_header('WWUS75 KPSR 202352\\nNPWPSR\\n\\nURGENT...')
+    ('WWUS75', 'KPSR', '202352', None, 'NPW', 'PSR')
+    """
+    head = text[:HEADER_SPAN]
+    if isinstance(head, unicode):
+        # the table is for byte strings; anything outside ASCII becomes a
+        # single '?', which is classed '.' as it should be.
+        sig = head.encode('ascii', 'replace').translate(CLASSES)
+    else:
+        sig = head.translate(CLASSES)
+    if sig[:18] not in WMO_SIGNATURES:
+        raise WmoError("Invalid code: %s" % head.split('\n', 1)[0])
+    if sig[18:22] == BBB_SIGNATURE:
+        addendum, end = head[19:22], 22
+    else:
+        addendum, end = None, 18
+    # skip the line end, allowing for '\r\r\n'.
+    start = end
+    while sig[start:start + 1] == 'r':
+        start += 1
+    if sig[start:start + 1] != 'n':
+        raise WmoError("Invalid code: %s" % head.split('\n', 1)[0])
+    start += 1
+    stop = start + 6
+    if (sig[start:stop] not in AWIPS_SIGNATURES
+            or sig[stop:stop + 1] not in ('n', 'r', '')):
+        raise AwipsIdError("Invalid code: %s" %
+                           head[start:].split('\n', 1)[0].rstrip('\r'))
+    return (head[:6], head[7:11], head[12:18], addendum,
+            head[start:start + 3], head[start + 3:stop])
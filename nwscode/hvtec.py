@@ -11,8 +11,7 @@ __all__ = ["HvtecError", "Hvtec"]
 
 import re
 
-from nwscode import NwsCode, NwsCodeError
-from misc import Bunch, parsevtectime
+from nwscode import NwsCode, NwsCodeError, Field, TimeField
 
 # Defining HVTEC grammar.
 # /nwsli.s.ic.yymmddThhnnZ.yymmddThhnnZ.yymmddThhnnZ.fr/
@@ -62,6 +61,12 @@ class Hvtec(NwsCode):
         
         ``recordstatus``
             Identifies how the flood compares to the flood of record.
+        
+        ``minutes``
+            ``floodbegin``, ``floodcrest`` and ``floodend`` as integer
+            minutes since 1970-01-01T00:00 UTC, for cheap sorting and
+            comparing.  The datetime attributes are only built when they
+            are read.
     
     Usage Example:
     
@@ -108,19 +113,11 @@ class Hvtec(NwsCode):
              'UU': 'Unknown'}
     }
     
-    def _process_matches(self, matches):
-        self.code = Bunch(siteid=matches[0],
-                        floodseverity=matches[1],
-                        immediatecause=matches[2],
-                        floodbegin=matches[3],
-                        floodcrest=matches[4],
-                        floodend=matches[5],
-                        recordstatus=matches[6])
-        self.siteid = self.code.siteid
-        self.floodseverity = self._interpret("floodseverity", matches[1])
-        self.immediatecause = self._interpret("immediatecause", matches[2])
-        self.floodbegin = parsevtectime(matches[3])
-        self.floodcrest = parsevtectime(matches[4])
-        self.floodend = parsevtectime(matches[5])
-        self.recordstatus = self._interpret("recordstatus", matches[6])
+    fields = (Field("siteid", 0),
+              Field("floodseverity", 1, table="floodseverity"),
+              Field("immediatecause", 2, table="immediatecause"),
+              TimeField("floodbegin", 3),
+              TimeField("floodcrest", 4),
+              TimeField("floodend", 5),
+              Field("recordstatus", 6, table="recordstatus"))
     
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Incremental decoding of products arriving in pieces.
+
+`IncrementalParser` does no I/O.  It is fed whatever bytes came in and
+returns the events they completed, so a consumer can act on the header
+and the first segment of a long product before the rest has arrived:
+
+    ``HeaderReceived``
+        The WMO heading and AWIPS Identifier, decoded as soon as the
+        first UGC code is complete.
+
+    ``SegmentReceived``
+        A `Segment`, as soon as its ``$$`` line is complete.
+
+    ``ProductReceived``
+        The whole `Product`, the same `Product` would have decoded from
+        the complete text, at the end of the product.
+
+The end of a product is its ETX when the input is NOAAPort framed (see
+`nwscode.feed`); otherwise call `IncrementalParser.end`.
+
+Usage Example:
+
+    parser = IncrementalParser()
+    while True:
+        data = sock.recv(4096)
+        if not data:
+            break
+        for event in parser.feed(data):
+            if isinstance(event, SegmentReceived):
+                ...
+
+Created by Alexander Ross on 2006-08-29.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+__all__ = ["IncrementalParser", "HeaderReceived", "SegmentReceived",
+           "ProductReceived"]
+
+from collections import namedtuple
+
+from ugc import Ugc
+from feed import SOH, ETX
+from product import Product, Header, Footer, Segment, ProductError, \
+                    SegmentError
+
+HeaderReceived = namedtuple("HeaderReceived", "header")
+SegmentReceived = namedtuple("SegmentReceived", "segment")
+ProductReceived = namedtuple("ProductReceived", "product")
+
+class IncrementalParser(object):
+    """
+    Decodes products from input fed in pieces of any size.
+
+    With `framed` products are NOAAPort frames and anything between the
+    frames is skipped; without it everything fed belongs to the current
+    product.  Carriage returns are dropped.
+
+    If an `ErrorLog` is given as `errors`, products that can't be decoded
+    and bad segments and codes are added to it, as `Product` would.
+    Otherwise `feed` and `end` raise `ProductError` for a bad product,
+    after taking in all of their input; the rest of that product is
+    skipped and the events completed in the call are returned by the next
+    one.
+    """
+    def __init__(self, framed=True, errors=None):
+        self.framed = framed
+        self.errors = errors
+        self._inframe = not framed
+        self._events = []
+        self._error = None
+        self._reset()
+
+    def _reset(self):
+        # the complete lines of the product, and the pieces of the line
+        # that isn't complete yet; only new complete lines are searched.
+        self._parts = []
+        self._size = 0
+        self._line = []
+        # before the header, the trailing lines that could be the first
+        # lines of a UGC code, which end with a dash.
+        self._carry = ""
+        # offset where the product text starts, once the header is known.
+        self._start = None
+        self._header = None
+        self._segments = []
+        # the text of the current segment, in pieces.
+        self._seg = []
+        self._skip = False
+
+    def feed(self, data):
+        """Adds `data`; returns the list of events it completed."""
+        if not self.framed:
+            self._append(data)
+        while data and self.framed:
+            if not self._inframe:
+                soh = data.find(SOH)
+                if soh < 0:
+                    break
+                self._inframe = True
+                data = data[soh + 1:]
+                continue
+            etx = data.find(ETX)
+            if etx < 0:
+                self._append(data)
+                break
+            self._inframe = False
+            self._append(data[:etx])
+            data = data[etx + 1:]
+            self._end()
+        return self._take()
+
+    def end(self):
+        """
+        Ends the current product; returns the list of events that
+        completed.  A framed product that lacks its ETX is ended too.
+        """
+        self._inframe = not self.framed
+        self._end()
+        return self._take()
+
+    def _take(self):
+        if self._error is not None:
+            err, self._error = self._error, None
+            raise err
+        events = self._events
+        self._events = []
+        return events
+
+    def _append(self, data):
+        if self._skip:
+            return
+        data = data.replace("\r", "")
+        nl = data.rfind("\n") + 1
+        if not nl:
+            self._line.append(data)
+            return
+        self._line.append(data[:nl])
+        lines = "".join(self._line)
+        self._line = [data[nl:]]
+        self._parts.append(lines)
+        self._size += len(lines)
+        self._scan(lines)
+
+    def _scan(self, lines):
+        # searches the complete `lines` just added.
+        if self._header is None:
+            lines = self._carry + lines
+            m = Ugc.pattern.search(lines)
+            if m is None:
+                pos = len(lines)
+                while pos > 0:
+                    start = lines.rfind("\n", 0, pos - 1) + 1
+                    if not lines[start:pos - 1].endswith("-"):
+                        break
+                    pos = start
+                self._carry = lines[pos:]
+                return
+            self._carry = ""
+            self._header_at(self._size - len(lines) + m.start())
+            if self._skip:
+                return
+            lines = lines[m.start():]
+        pos = 0
+        while True:
+            m = Segment.pattern.search(lines, pos)
+            if m is None:
+                break
+            self._seg.append(lines[pos:m.start()])
+            self._segment("".join(self._seg))
+            self._seg = []
+            pos = m.end()
+        self._seg.append(lines[pos:])
+
+    def _header_at(self, ugc):
+        # the product text starts after whitespace and, in a frame, the
+        # sequence number line.
+        buf = "".join(self._parts)
+        self._parts = [buf]
+        start = len(buf) - len(buf.lstrip())
+        if self.framed:
+            nl = buf.find("\n", start)
+            if nl >= 0 and nl < ugc and buf[start:nl].strip().isdigit():
+                start = nl + 1
+        try:
+            self._header = Header(buf[start:ugc].strip())
+        except ProductError, err:
+            self._fail(err)
+            return
+        self._start = start
+        self._events.append(HeaderReceived(self._header))
+
+    def _segment(self, text):
+        text = text.strip()
+        if not text:
+            return
+        try:
+            seg = Segment(text, self.errors)
+        except SegmentError, err:
+            if self.errors is not None:
+                self.errors.add("Segment", text, str(err))
+            return
+        self._segments.append(seg)
+        self._events.append(SegmentReceived(seg))
+
+    def _fail(self, err):
+        self._skip = True
+        if self.errors is None:
+            # raised by `_take`; only the first of a call.
+            if self._error is None:
+                self._error = err
+            return
+        lines = "".join(self._parts + self._line).strip().split("\n", 2)
+        if self.framed and len(lines) > 1 and lines[0].strip().isdigit():
+            # the sequence number line.
+            del lines[0]
+        self.errors.add("Product", lines[0], str(err))
+
+    def _end(self):
+        try:
+            if self._skip or not "".join(self._parts + self._line).strip():
+                return
+            if "".join(self._line):
+                self._append("\n")
+            if self._skip:
+                return
+            if self._header is None:
+                self._fail(ProductError("Product does not contain a UGC "
+                                        "code."))
+                return
+            prod = Product.__new__(Product)
+            prod.text = "".join(self._parts)[self._start:].strip()
+            prod.header = self._header
+            prod.segments = self._segments
+            prod.footer = Footer("".join(self._seg))
+            self._events.append(ProductReceived(prod))
+        finally:
+            self._reset()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Opt-in timing of the decoding stages.
+
+`enable` puts a timer around each stage and `disable` takes it away
+again, so while instrumentation is off the decoders run exactly the code
+they run without this module: it costs nothing at all.  The timers are
+put in the decoders themselves, so they time every thread of the
+process; `timing` scopes them to a block, and holds off other threads
+that would turn them on or off meanwhile.  The stages are:
+
+    ``framing``
+        `feed.unframe`, once per frame.
+
+    ``header``
+        Decoding the WMO heading and AWIPS Identifier of a product.
+
+    ``ugc``
+        Locating the first UGC code, where a product's header ends.
+
+    ``segment``
+        Parsing one segment, including its codes.
+
+    ``Pvtec``, ``Hvtec``, ``Ugc``, ...
+        The decoder (``_process_matches``) of each `NwsCode` class, named
+        after the class.
+
+    ``vtecminutes``
+        Parsing a VTEC time, which `parsevtectime` does too.
+
+Each stage records its number of calls, the cumulative time and a latency
+histogram in a `Registry`.  Stages nest, so the time of ``segment``
+includes that of its ``Pvtec`` codes.
+
+Usage Example:
+
+    import instrument
+    with instrument.timing():
+        ... decode products ...
+    print instrument.registry.prometheus()
+
+Created by Alexander Ross on 2006-08-24.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+__all__ = ["Registry", "StageStats", "BUCKETS", "registry", "enable",
+           "disable", "enabled", "timing"]
+
+import re
+import sys
+import time
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+from contextlib import contextmanager
+
+# upper bounds of the histogram buckets, in seconds: 1us to 10s.
+BUCKETS = tuple([m * 10.0 ** e for e in range(-6, 1)
+                 for m in (1, 2.5, 5)] + [10.0])
+
+# statistics of one stage: number of calls, cumulative seconds and the
+# number of calls that fell in each bucket; the last one is past all of
+# `BUCKETS`.
+StageStats = namedtuple("StageStats", "count seconds histogram")
+
+class Registry(object):
+    """
+    Statistics of the stages, and plain counters.
+
+    Usage Example:
+
+    >>> r = Registry()
+    >>> r.observe("header", 0.00002)
+    >>> r.increment("products")
+    >>> r.snapshot()["stages"]["header"].count
+    1
+    """
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forgets everything recorded so far."""
+        self._stages = {}
+        self._counters = {}
+
+    def observe(self, stage, seconds):
+        """Records one call of `stage` that took `seconds`."""
+        self._lock.acquire()
+        try:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = [0, 0.0,
+                                               [0] * (len(self.buckets) + 1)]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2][bisect_left(self.buckets, seconds)] += 1
+        finally:
+            self._lock.release()
+
+    def increment(self, name, n=1):
+        """Adds `n` to the counter `name`."""
+        self._lock.acquire()
+        try:
+            self._counters[name] = self._counters.get(name, 0) + n
+        finally:
+            self._lock.release()
+
+    def timed(self, func, stage):
+        """Returns `func` wrapped so each call is observed as `stage`."""
+        timer, observe = time.time, self.observe
+        def timed(*args, **kw):
+            start = timer()
+            try:
+                return func(*args, **kw)
+            finally:
+                observe(stage, timer() - start)
+        timed.__name__ = func.__name__
+        timed.__doc__ = func.__doc__
+        timed._instrumented = func
+        return timed
+
+    def snapshot(self):
+        """
+        Returns a copy of the statistics: a dict with a `StageStats` by
+        stage name under ``"stages"`` and the counters under
+        ``"counters"``.  It can be pickled, and `merge`d into another
+        registry, e.g. to sum up worker processes.
+        """
+        self._lock.acquire()
+        try:
+            stages = dict([(name, StageStats(s[0], s[1], tuple(s[2])))
+                           for name, s in self._stages.items()])
+            return {"stages": stages, "counters": dict(self._counters)}
+        finally:
+            self._lock.release()
+
+    def merge(self, snapshot):
+        """Adds the statistics of a `snapshot` to this registry."""
+        self._lock.acquire()
+        try:
+            for name, s in snapshot["stages"].items():
+                if len(s.histogram) != len(self.buckets) + 1:
+                    raise ValueError("Snapshot has different buckets.")
+                stats = self._stages.get(name)
+                if stats is None:
+                    stats = self._stages[name] = \
+                                    [0, 0.0, [0] * (len(self.buckets) + 1)]
+                stats[0] += s.count
+                stats[1] += s.seconds
+                for i, n in enumerate(s.histogram):
+                    stats[2][i] += n
+            for name, n in snapshot["counters"].items():
+                self._counters[name] = self._counters.get(name, 0) + n
+        finally:
+            self._lock.release()
+
+    def prometheus(self, prefix="nwscode", metric="stage_seconds",
+                   label="stage", help="Time spent in each decoding stage."):
+        """
+        Returns the statistics in the Prometheus text exposition format:
+        a ``<prefix>_<metric>`` histogram labelled by stage and a
+        ``<prefix>_<name>_total`` counter for each counter.  Registries
+        that time something other than stages pass their own `metric`,
+        `label` and `help`.
+        """
+        snapshot = self.snapshot()
+        metric = "%s_%s" % (prefix, metric)
+        lines = ["# HELP %s %s" % (metric, help),
+                 "# TYPE %s histogram" % metric]
+        bounds = ["%g" % b for b in self.buckets] + ["+Inf"]
+        for name, s in sorted(snapshot["stages"].items()):
+            value = _escape(name)
+            total = 0
+            for bound, n in zip(bounds, s.histogram):
+                total += n
+                lines.append('%s_bucket{%s="%s",le="%s"} %d'
+                             % (metric, label, value, bound, total))
+            lines.append('%s_sum{%s="%s"} %r'
+                         % (metric, label, value, s.seconds))
+            lines.append('%s_count{%s="%s"} %d'
+                         % (metric, label, value, s.count))
+        for name, n in sorted(snapshot["counters"].items()):
+            counter = "%s_%s_total" % (prefix, re.sub(r"\W", "_", name))
+            lines.append("# TYPE %s counter" % counter)
+            lines.append("%s %d" % (counter, n))
+        return "\n".join(lines) + "\n"
+
+def _escape(label):
+    return label.replace("\\", r"\\").replace('"', r'\"') \
+                .replace("\n", r"\n")
+
+registry = Registry()
+
+# (owner, name, original) of everything `enable` replaced; owner is a
+# class or a namespace dict.  Changed only under `_lock`, along with the
+# registry being timed into.
+_patched = []
+_lock = threading.RLock()
+_current = None
+
+def _set(owner, name, value):
+    if isinstance(owner, dict):
+        owner[name] = value
+    else:
+        setattr(owner, name, value)
+
+def _codeclasses(cls):
+    for sub in cls.__subclasses__():
+        yield sub
+        for subsub in _codeclasses(sub):
+            yield subsub
+
+def _stages():
+    # (stage, owner, name) of every stage; importing `product` imports all
+    # the code modules.
+    import misc, feed, product
+    from nwscode import NwsCode
+    yield "framing", feed, "unframe"
+    yield "header", product.Header, "__init__"
+    yield "ugc", product, "_locate_ugc"
+    yield "segment", product.Segment, "__init__"
+    yield "vtecminutes", misc, "vtecminutes"
+    for cls in _codeclasses(NwsCode):
+        if "_process_matches" in cls.__dict__:
+            yield cls.__name__, cls, "_process_matches"
+
+def _namespaces():
+    # every namespace a stage function may have been bound in: the package
+    # modules, and those `_build_decoder` generated the decoders in.
+    from nwscode import NwsCode
+    spaces = [m.__dict__ for name, m in sys.modules.items()
+              if m is not None and (name == "nwscode"
+                                    or name.startswith("nwscode."))]
+    for cls in _codeclasses(NwsCode):
+        func = cls.__dict__.get("_process_matches")
+        if func is not None and not [s for s in spaces
+                                     if s is func.func_globals]:
+            spaces.append(func.func_globals)
+    return spaces
+
+def enable(registry=registry):
+    """
+    Starts timing the stages into `registry`, the module's `registry` by
+    default.  Only calls made through the package are timed; a stage
+    function imported elsewhere before `enable` keeps running untimed.
+    """
+    global _current
+    _lock.acquire()
+    try:
+        _disable()
+        spaces = _namespaces()
+        for stage, owner, name in _stages():
+            if isinstance(owner, type):
+                original = owner.__dict__[name]
+                _patched.append((owner, name, original))
+                _set(owner, name, registry.timed(original, stage))
+                continue
+            original = getattr(owner, name)
+            timed = registry.timed(original, stage)
+            for space in spaces:
+                for key, value in space.items():
+                    if value is original:
+                        _patched.append((space, key, original))
+                        space[key] = timed
+        _current = registry
+    finally:
+        _lock.release()
+
+def disable():
+    """Stops timing; the stages run their original code again."""
+    _lock.acquire()
+    try:
+        _disable()
+    finally:
+        _lock.release()
+
+def _disable():
+    global _current
+    while _patched:
+        owner, name, original = _patched.pop()
+        _set(owner, name, original)
+    _current = None
+
+def enabled():
+    """True while the stages are timed."""
+    return bool(_patched)
+
+@contextmanager
+def timing(registry=registry):
+    """
+    Times the stages into `registry` for the block of a ``with``
+    statement, after which timing is back the way it was, whatever
+    happens.  Other threads can't turn timing on or off meanwhile, but it
+    times them too.
+    """
+    _lock.acquire()
+    try:
+        previous = _current
+        enable(registry)
+        try:
+            yield registry
+        finally:
+            if previous is None:
+                disable()
+            else:
+                enable(previous)
+    finally:
+        _lock.release()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Finding many keywords in a text at once.
+
+`KeywordMatcher` compiles a list of keywords into an Aho-Corasick
+automaton once; `KeywordMatcher.find` then finds every one of them in a
+single pass over a text, however many keywords there are, where looking
+for each keyword in turn takes as many passes as there are keywords.
+The automaton steps through the words of the text rather than its
+characters, which are split off by a regular expression, so there are
+only a few steps per line.
+
+Texts may be byte strings or unicode.  Matching ignores case and takes
+any run of white space, line breaks included, for a space, so a keyword
+of several words is found when the text wraps between them, even with
+trailing spaces or an indented next line.  Keywords only match whole
+words: ``HEAT`` isn't found in ``HEATH``.
+
+Usage Example:
+
+>>> m = KeywordMatcher(["flood", "flash flood", "hail"])
+>>> [(hit.keyword, hit.start) for hit in m.find("FLASH\\nFLOOD WARNING")]
+[('FLASH FLOOD', 0), ('FLOOD', 6)]
+
+Created by Alexander Ross on 2006-09-07.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+__all__ = ["KeywordMatcher", "Hit"]
+
+import re
+import string
+from collections import namedtuple
+
+# a keyword found in a text, at text[start:end].
+Hit = namedtuple("Hit", "keyword start end")
+
+# upper case, and white space as a space, keeping the offsets.
+_normal = string.maketrans(string.ascii_lowercase + "\n\r\t",
+                           string.ascii_uppercase + "   ")
+# the same for unicode text.
+_unormal = dict([(ord(a), unicode(b)) for a, b in
+                 zip(string.ascii_lowercase + "\n\r\t",
+                     string.ascii_uppercase + "   ")])
+
+def _translate(text):
+    if isinstance(text, unicode):
+        return text.translate(_unormal)
+    return text.translate(_normal)
+_word = re.compile("[A-Z0-9]+")
+
+def _normalize(keyword):
+    return " ".join(_translate(keyword).split())
+
+class KeywordMatcher(object):
+    """
+    Finds the keywords of the sequence `keywords` in texts; see the
+    module documentation.
+
+    Attributes:
+
+        ``keywords``
+            The keywords, normalized to upper case with single spaces,
+            from their first to their last letter or digit.
+    """
+    def __init__(self, keywords):
+        self.keywords = []
+        for keyword in keywords:
+            words = list(_word.finditer(_normalize(keyword)))
+            if not words:
+                continue
+            # from the first to the last word.
+            keyword = words[0].string[words[0].start():words[-1].end()]
+            if keyword not in self.keywords:
+                self.keywords.append(keyword)
+        # the trie, over words rather than characters: the transitions and
+        # the (keyword, number of words) ending in each state.
+        goto = [{}]
+        out = [()]
+        for keyword in self.keywords:
+            words = _word.findall(keyword)
+            state = 0
+            for word in words:
+                if word not in goto[state]:
+                    goto.append({})
+                    out.append(())
+                    goto[state][word] = len(goto) - 1
+                state = goto[state][word]
+            out[state] = out[state] + ((keyword, len(words)),)
+        # the failure links, breadth first.
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for word, child in goto[state].items():
+                f = fail[state]
+                while f and word not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(word, 0)
+                out[child] = out[child] + out[fail[child]]
+                queue.append(child)
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def find(self, text):
+        """
+        Returns a list of a `Hit` for every keyword in `text`, in order
+        of their start, longer ones first.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        normal = _translate(text)
+        hits = []
+        starts = []
+        state = 0
+        for m in _word.finditer(normal):
+            word = m.group()
+            starts.append(m.start())
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            for keyword, n in out[state]:
+                start, end = starts[-n], m.end()
+                # the words matched; what is between them must too, but
+                # for the amount of white space.
+                if n == 1 or " ".join(normal[start:end].split()) == keyword:
+                    hits.append((start, -end, keyword))
+        hits.sort()
+        return [Hit(keyword, start, -end) for start, end, keyword in hits]
@@ -8,11 +8,63 @@ Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
 """
 
 try:
-    from datetime import datetime as dt
+    from datetime import datetime as dt, timedelta
 except ImportError:
-    from pydatetime import datetime as dt
+    from pydatetime import datetime as dt, timedelta
 
-from time import strptime, mktime
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+EPOCH = dt(1970, 1, 1)
+_days_before_month = (0, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+_days_in_month = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+def _isleap(year):
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+def _monthlength(year, month):
+    if month == 2 and _isleap(year):
+        return 29
+    return _days_in_month[month]
+
+def _epochdays(year, month, day):
+    # days since 1970-01-01 of a valid proleptic Gregorian date.
+    y = year - 1
+    days = y * 365 + y // 4 - y // 100 + y // 400 + \
+           _days_before_month[month] + day - 719163
+    if month > 2 and _isleap(year):
+        days += 1
+    return days
+
+def _yearmonth(days):
+    # (year, month) of the date `days` days after 1970-01-01.
+    year = 1970 + days // 365 - 1
+    while _epochdays(year + 1, 1, 1) <= days:
+        year += 1
+    month = 12
+    while _epochdays(year, month, 1) > days:
+        month -= 1
+    return year, month
+
+def yearmonth(minutes):
+    """Returns (year, month) of `minutes` since 1970-01-01T00:00."""
+    return _yearmonth(minutes // 1440)
+
+def toepochminutes(when):
+    """Returns minutes since 1970-01-01T00:00 of the datetime `when`."""
+    return (_epochdays(when.year, when.month, when.day) * 1440 +
+            when.hour * 60 + when.minute)
+
+def fromepochminutes(minutes):
+    """
+    Returns a (naive, UTC) datetime for `minutes` since 1970-01-01T00:00,
+    or None if `minutes` is None.
+    """
+    if minutes is None:
+        return None
+    return EPOCH + timedelta(minutes=minutes)
 
 class Bunch(dict):
     def __init__(self, **kw):
@@ -27,12 +79,38 @@ class RelativeTime(object):
         self.minute = int(minute)
 
     def offsetfrom(self, root):
-        'Returns time relative to root where root is a datetime-like object.'
-        if self.day < root.day:
-            month = root.month%12 + 1
-        if month < root.month:
-            year = root.year + 1
-        return dt(year, month, self.day, self.hour, self.minute)
+        """
+        Returns time relative to root where root is a datetime-like object.
+
+        The day of month is looked up in the month before, the month of and
+        the month after `root`, and the candidate nearest to `root` wins.
+        That resolves UGC expirations (which follow the issuance) as well
+        as WMO issuances (which precede the time a product was received)
+        across month and year boundaries.
+        """
+        return fromepochminutes(self.offsetminutes(toepochminutes(root)))
+
+    def offsetminutes(self, root):
+        """
+        Like `offsetfrom`, but `root` and the result are integer minutes
+        since 1970-01-01T00:00.
+        """
+        year, month = _yearmonth(root // 1440)
+        clock = self.hour * 60 + self.minute
+        best = distance = None
+        for offset in (-1, 0, 1):
+            y, m = divmod(year * 12 + month - 1 + offset, 12)
+            m += 1
+            if not 1 <= self.day <= _monthlength(y, m):
+                # e.g. day 31 of a 30 day month.
+                continue
+            candidate = _epochdays(y, m, self.day) * 1440 + clock
+            if best is None or abs(candidate - root) < distance:
+                best, distance = candidate, abs(candidate - root)
+        if best is None:
+            raise ValueError('%r is not valid near %s.' %
+                             (self, fromepochminutes(root)))
+        return best
 
     def __cmp__(self, other):
         raise ValueError('It makes no sense to compare RelativeTime objects. '\
@@ -42,9 +120,111 @@ class RelativeTime(object):
         return self.__class__.__name__ + '(%s, %s, %s)' %\
                                               (self.day, self.hour, self.minute)
 
-def parsevtectime(time_string):
-    time_pat = '%y%m%dT%H%MZ' # VTEC time code pattern
+def parserelativetime(time_string):
+    """Returns a `RelativeTime` for a 'ddhhnn' time code."""
+    return RelativeTime(time_string[:2], time_string[2:4], time_string[4:6])
+
+def resolve_relative(day, hour, minute, root):
+    """
+    Vectorized `RelativeTime.offsetfrom`.
+
+    `day`, `hour` and `minute` are integer arrays (or anything
+    ``numpy.asarray`` accepts) and `root` an array of reference times as
+    ``datetime64`` values or datetime objects; all of them broadcast
+    against each other.  Returns a ``datetime64[m]`` array holding, for
+    each element, the time nearest to `root` with the given day of month,
+    hour and minute.  Elements whose day does not exist in any of the
+    three candidate months come back as ``NaT``.
+
+    Requires numpy.
+    """
+    if numpy is None:
+        raise ImportError("resolve_relative requires numpy.")
+    day = numpy.asarray(day, dtype=numpy.int64)
+    clock = (numpy.asarray(hour, dtype=numpy.int64) * 60
+             + numpy.asarray(minute, dtype=numpy.int64))
+    root = numpy.asarray(root, dtype='datetime64[m]')
+    day, clock, root = numpy.broadcast_arrays(day, clock, root)
+    this_month = root.astype('datetime64[M]')
+    rootmin = root.astype(numpy.int64)
+    best = numpy.zeros(root.shape, dtype=numpy.int64)
+    distance = numpy.empty(root.shape, dtype=numpy.int64)
+    distance.fill(numpy.iinfo(numpy.int64).max)
+    for offset in (-1, 0, 1):
+        month = this_month + offset
+        first = month.astype('datetime64[D]')
+        length = (month + 1).astype('datetime64[D]') - first
+        length = length.astype(numpy.int64)
+        candidate = (first.astype(numpy.int64) + day - 1) * 1440 + clock
+        dist = numpy.abs(candidate - rootmin)
+        better = (day >= 1) & (day <= length) & (dist < distance)
+        best = numpy.where(better, candidate, best)
+        distance = numpy.where(better, dist, distance)
+    result = best.astype('datetime64[m]')
+    result[distance == numpy.iinfo(numpy.int64).max] = numpy.datetime64('NaT')
+    return result
+
+# (first day as days since the epoch, days in month) by yymm, filled as
+# they are needed.
+_vtecmonths = {}
+
+def _vtecmonth(yymm):
+    year, month = divmod(yymm, 100)
+    if year < 69:
+        year += 2000
+    else:
+        year += 1900
+    if not 1 <= month <= 12:
+        raise ValueError("Invalid VTEC month: %s" % month)
+    _vtecmonths[yymm] = (_epochdays(year, month, 1),
+                         _monthlength(year, month))
+    return _vtecmonths[yymm]
+
+def vtecminutes(time_string):
+    """
+    Returns minutes since 1970-01-01T00:00 (UTC) for a VTEC time code,
+    'yymmddThhnnZ', or None for the all zero code.
+
+    The two digit year follows `time.strptime`: 69 through 99 are in the
+    1900s, everything else in the 2000s.  Raises ValueError for an
+    impossible date.
+    """
     if time_string == '000000T0000Z':
         return None
-    else:
-        return dt.utcfromtimestamp(mktime(strptime(time_string, time_pat)))
\ No newline at end of file
+    yymm = int(time_string[:4])
+    try:
+        first, length = _vtecmonths[yymm]
+    except KeyError:
+        first, length = _vtecmonth(yymm)
+    day = int(time_string[4:6])
+    hour, minute = divmod(int(time_string[7:11]), 100)
+    if not (1 <= day <= length and hour < 24 and minute < 60):
+        raise ValueError("Invalid VTEC time: %s" % time_string)
+    return (first + day - 1) * 1440 + hour * 60 + minute
+
+def parsevtectime(time_string):
+    """
+    Returns a datetime (in UTC) for a VTEC time code, 'yymmddThhnnZ', or
+    None for the all zero code.  See `vtecminutes`.
+    """
+    return fromepochminutes(vtecminutes(time_string))
+
+class epochtime(object):
+    """
+    A lazily built datetime attribute.
+
+    The decoders keep their times as integer minutes since the epoch in a
+    ``minutes`` Bunch, which is all that sorting and comparing needs.
+    ``epochtime('eventbegin')`` on a class makes ``obj.eventbegin`` build
+    the datetime from ``obj.minutes.eventbegin`` on first read and cache
+    it on the instance.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, obj, cls=None):
+        if obj is None:
+            return self
+        value = fromepochminutes(obj.minutes[self.name])
+        obj.__dict__[self.name] = value
+        return value
\ No newline at end of file
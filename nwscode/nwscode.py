@@ -3,25 +3,200 @@
 """
 A basic code class.  Don't use it, extend it.
 
+Most codes need nothing but a `pattern` and a `fields` specification::
+
+    class Example(NwsCode):
+        pattern = re.compile(r"^([A-Z]{2})\.([0-9]{4})\.(.{12})$")
+        interpreted = {"kind": {"AB": "Alpha Bravo"}}
+        fields = (Field("kind", 0, table="kind"),
+                  Field("number", 1, convert=int),
+                  TimeField("time", 2))
+
+From `fields` the class builds its own `_process_matches` when it is
+created, with the tables and converters bound into it, so decoding a code
+costs one regex match and a handful of assignments.  The raw groups are
+kept and the ``code`` Bunch is only built when somebody reads it.
+
 Created by Alexander Ross on 2006-07-20.
 Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
 """
 
-__all__ = ["NwsCodeError", "NwsCode"]
+__all__ = ["NwsCodeError", "NwsCode", "Field", "TimeField", "ErrorLog",
+           "ErrorRecord"]
 
 import re
+from collections import namedtuple
+from misc import Bunch, vtecminutes, epochtime
 
 class NwsCodeError(Exception):
     pass
 
+# one decoding problem: the type of thing that failed to decode (a class
+# name such as 'Pvtec' or 'Segment'), the raw text and the reason.
+ErrorRecord = namedtuple("ErrorRecord", "kind raw reason")
+
+class ErrorLog(object):
+    """
+    Collects decoding problems in the lenient decode mode, instead of
+    raising them.  Pass one to `NwsCode.decode`, `Segment` or `Product`.
+
+    Attributes:
+
+        ``records``
+            `ErrorRecord`s, in the order they happened.  Only the first
+            `limit` are kept, if `limit` is given.
+
+        ``counts``
+            Number of problems by kind, including those past `limit`.
+    """
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.records = []
+        self.counts = {}
+
+    def add(self, kind, raw, reason):
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        if self.limit is None or len(self.records) < self.limit:
+            self.records.append(ErrorRecord(kind, raw, reason))
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def __iter__(self):
+        return iter(self.records)
+
+# what the lenient decoding reports instead of raising: bad codes, and
+# converters failing on them in any way.
+_lenient = (NwsCodeError, ValueError, TypeError, IndexError)
+
+class Field(object):
+    """
+    Specification of one field of a code.
+
+    ``name``
+        Attribute the decoded value is stored in.  The raw string is
+        available as ``code.<name>``.
+
+    ``group``
+        Index of the regex group holding the field.  Alternatively give
+        ``offset`` and ``width`` to slice the field out of the raw string.
+
+    ``table``
+        Key of `NwsCode.interpreted`; the value is looked up there and an
+        unknown value makes the code invalid.
+
+    ``convert``
+        Callable applied to the raw string, e.g. `int`.
+    """
+    def __init__(self, name, group=None, table=None, convert=None,
+                 offset=None, width=None):
+        if (group is None) == (offset is None):
+            raise ValueError("Field `%s` needs either a group or an offset."
+                             % name)
+        self.name = name
+        self.group = group
+        self.table = table
+        self.convert = convert
+        self.offset = offset
+        self.width = width
+
+    def extract(self, matches, raw):
+        """Returns the raw string of this field."""
+        if self.group is not None:
+            return matches[self.group]
+        if self.width is None:
+            return raw[self.offset:]
+        return raw[self.offset:self.offset + self.width]
+
+    def source(self):
+        # expression for the raw string of this field.
+        if self.group is not None:
+            return "matches[%d]" % self.group
+        if self.width is None:
+            return "raw[%d:]" % self.offset
+        return "raw[%d:%d]" % (self.offset, self.offset + self.width)
+
+class TimeField(Field):
+    """
+    A VTEC time field.  The value is stored as minutes since the epoch in
+    ``minutes.<name>``, and ``<name>`` builds the datetime when read.
+    """
+    def __init__(self, name, group=None, convert=vtecminutes, **kw):
+        Field.__init__(self, name, group, convert=convert, **kw)
+
+def _build_decoder(cls):
+    # Generates the `_process_matches` method for the `fields` of `cls`.
+    namespace = {"Bunch": Bunch}
+    lines = ["def _process_matches(self, matches):",
+             "    self._matches = matches"]
+    for field in cls.fields:
+        if field.group is None:
+            lines.append("    raw = self.raw")
+            break
+    lookups, assigns, times = [], [], []
+    for i, field in enumerate(cls.fields):
+        value = field.source()
+        if field.table is not None:
+            namespace["table%d" % i] = cls.interpreted[field.table]
+            lookups.append("        self.%s = table%d[%s]"
+                           % (field.name, i, value))
+            continue
+        if field.convert is not None:
+            namespace["convert%d" % i] = field.convert
+            value = "convert%d(%s)" % (i, value)
+        if isinstance(field, TimeField):
+            times.append("%s=%s" % (field.name, value))
+        else:
+            assigns.append("    self.%s = %s" % (field.name, value))
+    if lookups:
+        lines.append("    try:")
+        lines.extend(lookups)
+        lines.append("    except KeyError:")
+        lines.append("        self._reject(matches)")
+    lines.extend(assigns)
+    if times:
+        lines.append("    self.minutes = Bunch(%s)" % ", ".join(times))
+    exec "\n".join(lines) + "\n" in namespace
+    return namespace["_process_matches"]
+
+class _CodeType(type):
+    """
+    Metaclass of `NwsCode`.  Builds `_process_matches` for classes that
+    specify `fields` but don't write their own.
+    """
+    def __init__(cls, name, bases, attrs):
+        type.__init__(cls, name, bases, attrs)
+        if attrs.get("fields") and "_process_matches" not in attrs:
+            cls._process_matches = _build_decoder(cls)
+            for field in cls.fields:
+                if isinstance(field, TimeField):
+                    setattr(cls, field.name, epochtime(field.name))
+
+class _codebunch(object):
+    # builds the `code` Bunch of raw strings the first time it is read.
+    def __get__(self, obj, cls=None):
+        if obj is None:
+            return self
+        if not cls.fields:
+            raise AttributeError("code")
+        matches, raw = obj._matches, obj.raw
+        code = Bunch(**dict([(f.name, f.extract(matches, raw))
+                             for f in cls.fields]))
+        obj.__dict__["code"] = code
+        return code
+
 class NwsCode(object):
     """
     Base `NwsCode` class, represents a generic code string.
     """
+    __metaclass__ = _CodeType
     # regular expression matching a code.
     pattern = re.compile(r"^.*$")
     error = NwsCodeError
     interpreted = {}
+    # a sequence of `Field`s, see the module documentation.
+    fields = ()
+    code = _codebunch()
     def __init__(self, code_string=''):
         """
         Create an instance of the NwsCode class.
@@ -43,15 +218,108 @@ class NwsCode(object):
         else:
             raise self.error("Invalid code '%s' for `%s`." % (code, element))
 
+    def _reject(self, matches):
+        # a table lookup of a generated decoder failed; find the culprit
+        # and raise the same error `_interpret` would.
+        for field in self.fields:
+            if field.table is not None:
+                self._interpret(field.table, field.extract(matches, self.raw))
+        raise self.error("Invalid code: %s" % self.raw)
+
     def _process_matches(self, matches):
-        # subclasses need to override this method.
+        # subclasses need to override this method, or specify `fields`.
         pass
 
+    def _from_matches(cls, code_string, matches):
+        """
+        Build an instance from groups that were already validated elsewhere,
+        e.g. by the fixed-width scanner in `nwscode.header`, skipping
+        `pattern`.
+        """
+        obj = cls.__new__(cls)
+        obj.raw = code_string
+        obj._process_matches(matches)
+        return obj
+    _from_matches = classmethod(_from_matches)
+
+    def decode(cls, code_string, errors):
+        """
+        Lenient constructor: returns an instance, or None after adding the
+        reason `code_string` is invalid to the `ErrorLog` `errors`.
+        """
+        if not isinstance(code_string, basestring):
+            errors.add(cls.__name__, code_string,
+                       "Invalid code: %r" % (code_string,))
+            return None
+        match = cls.pattern.match(code_string)
+        if match is None:
+            errors.add(cls.__name__, code_string,
+                       "Invalid code: %s" % code_string)
+            return None
+        try:
+            return cls._from_matches(code_string, match.groups())
+        except _lenient, err:
+            errors.add(cls.__name__, code_string, str(err))
+            return None
+    decode = classmethod(decode)
+
     def valid(cls, code_string):
-        """True if `code_string` is matched by `self.pattern`."""
-        return bool(self.pattern.match(code_string))
+        """True if `code_string` is matched by `cls.pattern`."""
+        return bool(cls.pattern.match(code_string))
     valid = classmethod(valid)
 
+    def validate_many(cls, code_strings):
+        """
+        Check many code strings without building instances or raising.
+
+        Returns ``(mask, reasons)``: a list of booleans, True for each
+        valid string, and a list holding None for each valid string and
+        the first reason the string is invalid otherwise; anything but a
+        string is invalid.  The reasons are
+        the messages decoding would raise.  Besides `pattern`, codes with
+        `fields` have their table lookups and converters checked.
+        """
+        match = cls.pattern.match
+        tables, converters = [], []
+        for field in cls.fields:
+            if field.table is not None:
+                tables.append((field, cls.interpreted[field.table]))
+            elif field.convert is not None:
+                converters.append(field)
+        mask, reasons = [], []
+        for code_string in code_strings:
+            if not isinstance(code_string, basestring):
+                mask.append(False)
+                reasons.append("Invalid code: %r" % (code_string,))
+                continue
+            m = match(code_string)
+            if m is None:
+                reason = "Invalid code: %s" % code_string
+            else:
+                reason = None
+                groups = m.groups()
+                for field, table in tables:
+                    value = field.extract(groups, code_string)
+                    if value not in table:
+                        reason = "Invalid code '%s' for `%s`." % \
+                                                        (value, field.table)
+                        break
+                else:
+                    for field in converters:
+                        try:
+                            field.convert(field.extract(groups, code_string))
+                        except _lenient, err:
+                            reason = str(err)
+                            break
+            mask.append(reason is None)
+            reasons.append(reason)
+        return mask, reasons
+    validate_many = classmethod(validate_many)
+
+    def __reduce__(self):
+        # only the raw string is pickled; everything else is decoded again.
+        return (self.__class__, (self.raw,))
+
     def __str__(self):
         return self.raw
 
@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Decoding in stages connected by bounded queues.
+
+A `Pipeline` pulls items from a source iterable through a chain of
+`Stage`s, e.g.::
+
+    reader -> framer -> header triage -> segment decode -> indexer -> sink
+
+Each stage has its own workers, threads or processes, and takes its input
+from a bounded queue.  When a stage falls behind, its queue fills up and
+the stage before it blocks, and so on up to the source: a slow sink (a
+database, say) slows the reading down instead of filling the memory, and
+the other stages keep working at its pace.
+
+A stage calls its function on each item and passes on everything the
+function returns, which is an iterable of any number of items or None.
+So a stage may split items (the framer), drop them (a filter) or consume
+them (the sink).  What the function of the last stage returns is
+ignored.  With more than one worker a stage may reorder items.
+
+Per stage the pipeline keeps the number of items received and emitted,
+the time the function took and the depth of the input queue; see
+`Pipeline.stats` and `Pipeline.prometheus`.
+
+Usage Example:
+
+    def decode(text):
+        try:
+            return [Product(text)]
+        except ProductError:
+            return None
+
+    pipeline = Pipeline(iter(lambda: stream.read(65536), ""),
+                        [Stage("framer", Framer().feed),
+                         Stage("decode", decode, processes=4),
+                         Stage("sink", store.add, maxsize=1000)])
+    pipeline.run()
+
+Created by Alexander Ross on 2006-09-01.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+__all__ = ["Pipeline", "Stage", "PipelineStats"]
+
+import sys
+import time
+import threading
+import multiprocessing
+from Queue import Queue
+from collections import namedtuple
+
+from instrument import Registry
+
+# statistics of one stage: items received and emitted, seconds spent in
+# its function, the current and the largest depth of its input queue, and
+# items received per second of running time.
+PipelineStats = namedtuple("PipelineStats", "received emitted seconds "
+                                            "depth maxdepth throughput")
+
+# put in a queue once for each worker of the stage, after the last item.
+_END = object()
+
+def _call(func, item, last=False):
+    # runs in a worker process too.
+    if last:
+        func(item)
+        return ()
+    return list(func(item) or ())
+
+class Stage(object):
+    """
+    A step of a `Pipeline`, named `name`, calling `func` on each item.
+
+    `workers` threads take items from an input queue of at most `maxsize`
+    items.  With `processes` the calls are made in a pool of that many
+    processes, so `func` and the items must be picklable; `workers`
+    defaults to twice `processes` then, which keeps the processes busy.
+    A stateful function, like `Framer.feed`, needs a single thread.
+    """
+    def __init__(self, name, func, workers=None, maxsize=100, processes=0):
+        self.name = name
+        self.func = func
+        if workers is None:
+            workers = processes * 2 or 1
+        self.workers = workers
+        self.maxsize = maxsize
+        self.processes = processes
+
+class Pipeline(object):
+    """
+    Runs the items of the iterable `source` through the list of
+    `stages`.  See the module documentation.
+
+    Attributes:
+
+        ``registry``
+            A `Registry` of the time each call of a stage's function took,
+            by stage name.
+    """
+    def __init__(self, source, stages):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage.")
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise ValueError("Stage names must be unique.")
+        self.source = source
+        self.stages = list(stages)
+        self.registry = Registry()
+        self._lock = threading.Lock()
+        self._queues = [Queue(stage.maxsize) for stage in self.stages]
+        self._emitted = [0] * len(self.stages)
+        self._maxdepth = [0] * len(self.stages)
+        self._live = [0] * len(self.stages)
+        self._started = self._finished = None
+        self._error = None
+
+    def run(self):
+        """
+        Runs until every item went through all stages.  If a stage's
+        function raises, the rest of the items are skipped and the
+        exception is raised here.
+        """
+        # the pools are made before any thread is started, as forking a
+        # process with threads running is asking for trouble.
+        pools = [None] * len(self.stages)
+        for i, stage in enumerate(self.stages):
+            if stage.processes:
+                pools[i] = multiprocessing.Pool(stage.processes)
+        self._started = time.time()
+        try:
+            threads = [threading.Thread(target=self._read)]
+            for i, stage in enumerate(self.stages):
+                self._live[i] = stage.workers
+                for n in range(stage.workers):
+                    threads.append(threading.Thread(target=self._work,
+                                                    args=(i, pools[i])))
+            for thread in threads:
+                thread.setDaemon(True)
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            self._finished = time.time()
+            for pool in pools:
+                if pool is not None:
+                    pool.close()
+                    pool.join()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error[0], error[1], error[2]
+
+    def _put(self, i, item):
+        queue = self._queues[i]
+        queue.put(item)
+        depth = queue.qsize()
+        self._lock.acquire()
+        try:
+            if depth > self._maxdepth[i]:
+                self._maxdepth[i] = depth
+        finally:
+            self._lock.release()
+
+    def _end(self, i):
+        # the stage before `i` is done.
+        for n in range(self.stages[i].workers):
+            self._queues[i].put(_END)
+
+    def _read(self):
+        try:
+            try:
+                for item in self.source:
+                    if self._error is not None:
+                        break
+                    self._put(0, item)
+            except Exception:
+                self._fail(sys.exc_info())
+        finally:
+            self._end(0)
+
+    def _work(self, i, pool):
+        stage = self.stages[i]
+        get = self._queues[i].get
+        func, observe = stage.func, self.registry.observe
+        last = i + 1 == len(self.stages)
+        while True:
+            item = get()
+            if item is _END:
+                break
+            if self._error is not None:
+                # failed: drain the queue so no stage blocks.
+                continue
+            start = time.time()
+            try:
+                if pool is None:
+                    results = _call(func, item, last)
+                else:
+                    results = pool.apply(_call, (func, item, last))
+            except Exception:
+                self._fail(sys.exc_info())
+                continue
+            observe(stage.name, time.time() - start)
+            self._lock.acquire()
+            self._emitted[i] += len(results)
+            self._lock.release()
+            if not last:
+                for result in results:
+                    self._put(i + 1, result)
+        self._lock.acquire()
+        try:
+            self._live[i] -= 1
+            done = self._live[i] == 0
+        finally:
+            self._lock.release()
+        if done and not last:
+            self._end(i + 1)
+
+    def _fail(self, error):
+        self._lock.acquire()
+        try:
+            if self._error is None:
+                self._error = error
+        finally:
+            self._lock.release()
+
+    def stats(self):
+        """
+        Returns a dict of `PipelineStats` by stage name, also while the
+        pipeline runs.
+        """
+        stages = self.registry.snapshot()["stages"]
+        if self._started is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self._finished or time.time()) - self._started
+        stats = {}
+        for i, stage in enumerate(self.stages):
+            s = stages.get(stage.name)
+            received, seconds = s and s.count or 0, s and s.seconds or 0.0
+            stats[stage.name] = PipelineStats(received, self._emitted[i],
+                seconds, self._queues[i].qsize(), self._maxdepth[i],
+                elapsed and received / elapsed)
+        return stats
+
+    def prometheus(self, prefix="nwscode"):
+        """
+        Returns the statistics in the Prometheus text exposition format:
+        the time histogram of each stage, counters of the items it
+        received and emitted and its queue depth.
+        """
+        lines = []
+        stats = sorted(self.stats().items())
+        for metric, kind, help, field in [
+                ("pipeline_received_total", "counter",
+                 "Items received by each stage.", "received"),
+                ("pipeline_emitted_total", "counter",
+                 "Items emitted by each stage.", "emitted"),
+                ("pipeline_queue_depth", "gauge",
+                 "Items waiting for each stage.", "depth")]:
+            metric = "%s_%s" % (prefix, metric)
+            lines.append("# HELP %s %s" % (metric, help))
+            lines.append("# TYPE %s %s" % (metric, kind))
+            for name, s in stats:
+                lines.append('%s{stage="%s"} %d'
+                             % (metric, name, getattr(s, field)))
+        return self.registry.prometheus(prefix, "pipeline_stage_seconds",
+                    help="Time each stage took per item.") \
+               + "\n".join(lines) + "\n"
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Decoding short-fuse warnings first.
+
+During a backlog the products waiting to be decoded aren't equally
+urgent: a Tornado Warning shouldn't wait behind a pile of Zone Forecasts.
+`DecodeQueue` orders them by priority class, taken from the category of
+the AWIPS Identifier, which `split_header` finds without decoding the
+product:
+
+    ``short-fuse``
+        Warnings for the next hour or so, and their statements: TOR, SVR,
+        FFW, SMW, EWW, SVS, FFS and MWS.
+
+    ``hazard``
+        The other watches, warnings and advisories, e.g. WSW, NPW, FFA,
+        FLW and FLS.
+
+    ``routine``
+        Everything else, e.g. ZFP, AFD and RWR, and products whose header
+        can't be read (decoding them will tell why).
+
+Within a class products are taken first in, first out.  The time each
+product waited is recorded by class in a `Registry`.
+
+Usage Example:
+
+    queue = DecodeQueue(100)
+    queue.put(text)
+    ...
+    product = Product(queue.get())
+    print queue.prometheus()
+
+Created by Alexander Ross on 2006-08-31.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+__all__ = ["DecodeQueue", "CLASSES", "PRIORITIES", "classify"]
+
+import time
+import heapq
+import itertools
+import Queue
+
+from header import split_header, WmoError, AwipsIdError
+from instrument import Registry
+
+CLASSES = ("short-fuse", "hazard", "routine")
+
+# the class, an index into `CLASSES`, of each AWIPS category that isn't
+# routine.
+PRIORITIES = dict([(c, 0) for c in "TOR SVR FFW SMW EWW SVS FFS MWS".split()]
+                  + [(c, 1) for c in "WSW NPW FFA FLW FLS CFW RFW HLS WCN "
+                                     "SPS SEL".split()])
+
+def classify(text, priorities=PRIORITIES):
+    """
+    Returns the priority class of the product `text`, an index into
+    `CLASSES`.
+
+    >>> CLASSES[classify('WFUS53 KDMX 202352\\nTORDMX\\n')]
+    'short-fuse'
+    """
+    try:
+        category = split_header(text.lstrip())[4]
+    except (WmoError, AwipsIdError):
+        return len(CLASSES) - 1
+    return priorities.get(category, len(CLASSES) - 1)
+
+class DecodeQueue(Queue.Queue):
+    """
+    A `Queue.Queue` of product texts, which `get` returns most urgent
+    class first.  `maxsize` limits the products waiting, as in any
+    `Queue.Queue`; `priorities` maps AWIPS categories to classes.
+
+    Attributes:
+
+        ``waits``
+            A `Registry` of the time products waited in the queue, by
+            class name.
+    """
+    def __init__(self, maxsize=0, priorities=PRIORITIES):
+        # Queue.Queue calls `_init`, so these have to be set first.
+        self.priorities = priorities
+        self.waits = Registry()
+        self._serial = itertools.count()
+        Queue.Queue.__init__(self, maxsize)
+
+    def _init(self, maxsize):
+        self.queue = []
+        self._depths = [0] * len(CLASSES)
+
+    def _qsize(self, len=len):
+        return len(self.queue)
+
+    def _put(self, text):
+        cls = classify(text, self.priorities)
+        # the serial number keeps a class first in, first out.
+        heapq.heappush(self.queue,
+                       (cls, self._serial.next(), time.time(), text))
+        self._depths[cls] += 1
+
+    def _get(self):
+        cls, serial, stamp, text = heapq.heappop(self.queue)
+        self._depths[cls] -= 1
+        self.waits.observe(CLASSES[cls], time.time() - stamp)
+        return text
+
+    def depths(self):
+        """Returns a dict of the number of products waiting by class."""
+        self.mutex.acquire()
+        try:
+            return dict(zip(CLASSES, self._depths))
+        finally:
+            self.mutex.release()
+
+    def prometheus(self, prefix="nwscode"):
+        """
+        Returns the queue wait histogram by class and the number of
+        products waiting by class in the Prometheus text exposition
+        format.
+        """
+        metric = "%s_queue_depth" % prefix
+        lines = ["# HELP %s Products waiting to be decoded." % metric,
+                 "# TYPE %s gauge" % metric]
+        for name, n in sorted(self.depths().items()):
+            lines.append('%s{class="%s"} %d' % (metric, name, n))
+        return self.waits.prometheus(prefix, "queue_wait_seconds", "class",
+                        "Time products waited to be decoded.") \
+               + "\n".join(lines) + "\n"
@@ -8,39 +8,92 @@ Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
 """
 
 import re
+import marshal
+from collections import namedtuple
 
-from nwscode import NwsCode
+from nwscode import NwsCode, NwsCodeError
 from wmo import WmoHeader
 from awipsid import AwipsId
 from ugc import Ugc
 from pvtec import Pvtec
 from hvtec import Hvtec
+from header import split_header
+from keywords import KeywordMatcher
+
+# Bump whenever a change to the decoders changes what a decoded product
+# looks like.  Caches of decoded products are keyed on it.
+DECODER_VERSION = 2
 
 class ProductError(Exception):
     pass
 
+def _locate_ugc(text):
+    # offset of the first UGC code, where the header ends.
+    m = Ugc.pattern.search(text)
+    if not m:
+        raise ProductError("Product does not contain a UGC code.")
+    return m.start()
+
 class Product (object):
-    def __init__(self, text):
+    """
+    A decoded product.
+
+    If an `ErrorLog` is given as `errors`, segments that fail to decode
+    and bad VTEC codes are added to it; otherwise they are dropped
+    (segments) or raised (codes).  A product without a UGC code or a valid
+    header always raises `ProductError`; see `decode_products` to collect
+    those too.
+    """
+    def __init__(self, text, errors=None):
         self.text = text.strip().replace("\r\n", "\n")
-        m = Ugc.pattern.search(text)
-        if not m:
-            raise ProductError("Product does not contain a UGC code.")
-        self.header = Header(self.text[:m.start()].strip())
-        body = self.text[m.start():].strip()
+        start = _locate_ugc(self.text)
+        self.header = Header(self.text[:start].strip())
+        body = self.text[start:].strip()
         self.segments = []
         segment_texts = Segment.pattern.split(body)
         self.footer = Footer(segment_texts.pop())
         for seg_text in segment_texts:
-            events = []
             seg_text = seg_text.strip()
             if not seg_text:
                 continue
             try:
-                seg = Segment(seg_text)
-            except SegmentError:
-                pass
+                seg = Segment(seg_text, errors)
+            except SegmentError, err:
+                if errors is not None:
+                    errors.add("Segment", seg_text, str(err))
             else:
                 self.segments.append(seg)
+
+    def _state(self):
+        # The product text plus offsets and raw codes; everything else is
+        # rebuilt from those by `_restore_product`.  Only tuples, strings,
+        # ints and None, so `marshal` can handle it.
+        text = self.text
+        segments = []
+        pos = 0
+        for seg in self.segments:
+            start = text.find(seg.text, pos)
+            pos = start + len(seg.text)
+            segments.append(seg._state(start))
+        return (text, len(self.header.text), text.rfind(self.footer.text),
+                tuple(segments))
+
+    def issuanceminutes(self):
+        """
+        Returns the WMO issuance as integer minutes since 1970-01-01T00:00
+        UTC, or None.  The heading only has its day, hour and minute, so
+        it is resolved against the earliest VTEC time of the product; a
+        product without one has no issuance.
+        """
+        times = [t for seg in self.segments for event in seg.events
+                 for t in (event.pvtec.minutes.eventbegin,
+                           event.pvtec.minutes.eventend) if t is not None]
+        if not times:
+            return None
+        return self.header.wmo.issuance.offsetminutes(min(times))
+
+    def __reduce__(self):
+        return (_restore_product, (self._state(),))
     
     def __str__(self):
         lines = [str(self.header)]
@@ -56,12 +109,17 @@ class Header(object):
     """
     def __init__(self, text):
         self.text = text.strip()
-        text = text.split("\n")
         try:
-            self.wmo = WmoHeader(text[0])
-            self.awipsid = AwipsId(text[1])
-        except:
-            raise ProductError()
+            groups = split_header(self.text)
+            wmo = ' '.join([g for g in groups[:4] if g is not None])
+            self.wmo = WmoHeader._from_matches(wmo, groups[:4])
+            self.awipsid = AwipsId._from_matches(''.join(groups[4:]),
+                                                 groups[4:])
+        except NwsCodeError, err:
+            raise ProductError("Invalid product header: %s" % err)
+
+    def __reduce__(self):
+        return (Header, (self.text,))
     
     def __str__(self):
         return self.text
@@ -70,6 +128,8 @@ class Header(object):
 class Footer(object):
     def __init__(self, text):
         self.text = text.strip()
+    def __reduce__(self):
+        return (Footer, (self.text,))
     def __str__(self):
         return self.text
     
@@ -78,6 +138,109 @@ class SegmentError(ProductError):
     pass
 
 SEGMENT = r"^\$\$$"
+
+# Forecasts and headlines are found in a single pass over the text of a
+# segment.  None of these patterns nests or overlaps repeats, so a failed
+# match backtracks over one line or one headline at most: the time is
+# linear in the length of the segment.
+_forecast_start = re.compile(r"^\.[A-Z ]+\.\.\.", re.M)
+_not_continued = re.compile(r"\n[^A-Z0-9\n]")
+# the repeat stops at the first dot, so it can't be tried twice.
+_headline = re.compile(r"^\.\.\.[A-Z0-9 \n]*\.\.\.$", re.M)
+
+def _forecasts(text):
+    # A forecast starts at a line like '.TONIGHT...' -- a dot, capitals or
+    # spaces, three dots -- and takes the following lines that are empty
+    # or start with a capital or a digit.
+    forecasts = []
+    m = _forecast_start.search(text)
+    while m is not None:
+        end = _not_continued.search(text, m.start())
+        if end is None:
+            forecasts.append(text[m.start():].replace('\n', ' ').strip())
+            break
+        forecasts.append(text[m.start():end.start()]
+                         .replace('\n', ' ').strip())
+        m = _forecast_start.search(text, end.start() + 1)
+    return forecasts
+
+def _headlines(text):
+    # A headline is '...' at the start of a line, capitals, digits, spaces
+    # and line breaks, and '...' at the end of a line.
+    return [m.group(0).replace('\n', ' ').strip()
+            for m in _headline.finditer(text)]
+
+_short_fuse = re.compile(r"(?m)^\* (?:SEVERE THUNDERSTORM|TORNADO|"
+                         r"(?:FLASH )?FLOOD) (?:WARNING|WATCH|ADVISORY) "
+                         r"FOR[\.]*(?:\n[A-Z0-9 .]+)$")
+_spaces = re.compile("  +")
+
+def _vtec_lines(text):
+    # the lines starting with a slash, which can hold a VTEC code; found
+    # with `str.find`, much faster than a multiline regular expression.
+    if text.startswith('/'):
+        pos = 0
+    else:
+        pos = text.find('\n/') + 1
+        if not pos:
+            return
+    while True:
+        end = text.find('\n', pos)
+        if end < 0:
+            yield text[pos:]
+            return
+        yield text[pos:end]
+        pos = text.find('\n/', end) + 1
+        if not pos:
+            return
+
+def _codes(text, errors):
+    # The VTEC codes of a segment: a list of [pvtec, hvtec] pairs, hvtec
+    # None unless an H-VTEC code follows the P-VTEC code.
+    codes = []
+    for line in _vtec_lines(text):
+        m = Pvtec.pattern.match(line)
+        if m:
+            pvtec = _decode(Pvtec, line, m.groups(), errors)
+            if pvtec is not None:
+                codes.append([pvtec, None])
+            continue
+        m = Hvtec.pattern.match(line)
+        if m:
+            if not codes:
+                reason = "H-VTEC code without a P-VTEC code."
+                if errors is None:
+                    raise SegmentError(reason)
+                errors.add("Hvtec", line, reason)
+                continue
+            hvtec = _decode(Hvtec, line, m.groups(), errors)
+            if hvtec is not None:
+                codes[-1][1] = hvtec
+    return codes
+
+# what `Segment.hazard_keywords` finds besides the names of the VTEC
+# phenomena; see `set_hazard_keywords`.
+HAZARD_KEYWORDS = ("THUNDERSTORM", "HAIL", "DAMAGING WIND", "DAMAGING WINDS",
+                   "HEAVY RAIN", "FUNNEL CLOUD", "WATERSPOUT", "LIGHTNING",
+                   "LANDSLIDE", "MUDSLIDE", "DEBRIS FLOW", "AVALANCHE",
+                   "WILDFIRE", "RED FLAG", "STORM SURGE", "RIP CURRENT",
+                   "EVACUATION", "TAKE COVER")
+
+def set_hazard_keywords(keywords=HAZARD_KEYWORDS):
+    """
+    Sets the keywords `Segment.hazard_keywords` finds: the names of the
+    VTEC phenomena (``Excessive Heat``, ...) and the sequence `keywords`.
+    They are compiled into one `KeywordMatcher`, so hundreds of keywords
+    cost no more than a few.
+    """
+    global _hazard_matcher
+    names = sorted(Pvtec.interpreted["phenomena"].values())
+    # replaced in one assignment, so a reader sees the old matcher or the
+    # new one.
+    _hazard_matcher = KeywordMatcher(names + list(keywords))
+
+set_hazard_keywords()
+
 class Segment(object):
     """ Segment wraps a text segment.
         
@@ -99,49 +262,155 @@ class Segment(object):
             ``headlines``
                 list of headlines in the segment.
         
+            ``hazard_keywords``
+                list of a `Hit` for every hazard keyword in the segment
+                text, with its offsets; see `set_hazard_keywords`.  Found
+                when first read, and again after the keywords change.
+        
+        If an `ErrorLog` is given as `errors`, VTEC codes that fail to
+        decode are added to it and skipped instead of raised.
     """
     pattern = re.compile(SEGMENT, re.MULTILINE|re.DOTALL)
-    def __init__(self, text):
+    def __init__(self, text, errors=None):
         self.text = text
         # parse events.
-        self.events = []
         m = Ugc.pattern.search(self.text)
         if not m:
             raise SegmentError("Segment does not have a UGC code.")
         self.ugc = Ugc(self.text[m.start():m.end()])
-        for line in self.text.split('\n'):
-            if Pvtec.pattern.match(line):
-                self.events.append(Event(self.ugc, Pvtec(line)))
-            elif Hvtec.pattern.match(line):
-                self.events[-1].hvtec = Hvtec(line)
-        # parse forecasts.
-        self.forecasts = []
-        fcst_pat = re.compile(r"(?m)^\.[A-Z ]+?[\.]{3}.*(?:\n(?:[A-Z0-9].*)*)*")
-        for m in fcst_pat.finditer(self.text):
-            fcst = m.group(0).replace("\n", " ").strip()
-            self.forecasts.append(fcst)
-        # parse headlines.
-        self.headlines = []
-        headline_pat = re.compile(r"(?ms)^[\.]{3}[A-Z0-9 \n]*[\.]{3}$")
-        for m in headline_pat.finditer(self.text):
-            headline = m.group(0).replace("\n", " ").strip()
-            self.headlines.append(headline)
+        self.events = [Event(self.ugc, pvtec, hvtec)
+                       for pvtec, hvtec in _codes(self.text, errors)]
+        self.forecasts = _forecasts(self.text)
+        self.headlines = _headlines(self.text)
         # we've got to handle short-fuse products seperately.  These don't
         # even have a headline in them so we have to generate them.
-        short_fuse = re.compile(r"(?m)^\* (?:SEVERE THUNDERSTORM|TORNADO|(?:FLASH )?FLOOD) (?:WARNING|WATCH|ADVISORY) FOR[\.]*(?:\n[A-Z0-9 .]+)$")
-        for m in short_fuse.finditer(self.text):
+        for m in _short_fuse.finditer(self.text):
             headline = m.group(0)
             headline = headline.replace('\n', ' ')
             headline = headline.lstrip("* ")
             headline = headline.replace("...", "")
-            headline = re.compile("  +").sub(' ', headline)
+            headline = _spaces.sub(' ', headline)
             headline = "..." + headline + "..."
             self.headlines.append(headline)
     
+    def _hazard_keywords(self):
+        # found once for each matcher.
+        matcher = _hazard_matcher
+        cached = self.__dict__.get("_hazards")
+        if cached is None or cached[0] is not matcher:
+            cached = self._hazards = (matcher, matcher.find(self.text))
+        return list(cached[1])
+    hazard_keywords = property(_hazard_keywords)
+
+    def _state(self, start):
+        # See `Product._state`; `start` is the offset of the segment text.
+        events = []
+        for event in self.events:
+            if event.hvtec is None:
+                events.append((event.pvtec.raw, None))
+            else:
+                events.append((event.pvtec.raw, event.hvtec.raw))
+        return (start, start + len(self.text), self.ugc.raw, tuple(events),
+                tuple(self.forecasts), tuple(self.headlines))
+
+    def __reduce__(self):
+        return (_restore_segment, (self.text, self._state(0)))
+
     def __str__(self):
         return self.text
     
 
+def _restore_segment(text, state):
+    start, end, ugc, events, forecasts, headlines = state
+    seg = Segment.__new__(Segment)
+    seg.text = text[start:end]
+    seg.ugc = Ugc(ugc)
+    seg.events = []
+    for pvtec, hvtec in events:
+        if hvtec is not None:
+            hvtec = Hvtec(hvtec)
+        seg.events.append(Event(seg.ugc, Pvtec(pvtec), hvtec))
+    seg.forecasts = list(forecasts)
+    seg.headlines = list(headlines)
+    return seg
+
+def _restore_product(state):
+    text, header_end, footer_start, segments = state
+    prod = Product.__new__(Product)
+    prod.text = text
+    prod.header = Header(text[:header_end])
+    prod.footer = Footer(text[footer_start:])
+    prod.segments = [_restore_segment(text, seg) for seg in segments]
+    return prod
+
+def dump_products(products):
+    """
+    Serializes a list of products into a compact string for sending to
+    another process.  Only the texts, offsets and raw codes are written,
+    with `marshal`, so both ends must run the same Python version.
+    """
+    return marshal.dumps([prod._state() for prod in products])
+
+def load_products(data):
+    """Returns the list of products serialized by `dump_products`."""
+    return [_restore_product(state) for state in marshal.loads(data)]
+
+def _decode(cls, line, groups, errors):
+    # decodes a code whose `pattern` already matched; in the lenient mode
+    # a code with bad values is logged and None returned.
+    if errors is None:
+        return cls._from_matches(line, groups)
+    try:
+        return cls._from_matches(line, groups)
+    except (NwsCodeError, ValueError), err:
+        errors.add(cls.__name__, line, str(err))
+        return None
+
+def decode_products(texts, errors):
+    """
+    Lenient bulk decoding: yields a `Product` for each text in `texts`,
+    adding the problems of the ones that can't be decoded at all, along
+    with everything `Product` itself logs, to the `ErrorLog` `errors`.
+    """
+    for text in texts:
+        try:
+            yield Product(text, errors)
+        except ProductError, err:
+            errors.add("Product", text.strip().split("\n", 1)[0], str(err))
+
+Triage = namedtuple("Triage", "wmo awipsid segments")
+
+def triage(text, errors=None):
+    """
+    A quick decoding of the product `text` for alerting: only the header
+    and the codes of each segment are decoded.  Forecasts and headlines
+    are skipped and no `Segment` is built, so it takes a fraction of the
+    time of `Product`, which can decode the product fully later.
+
+    Returns a `Triage` tuple of the `WmoHeader`, the `AwipsId` and a list
+    with, for each segment, a list of ``(ugc, pvtec, hvtec)`` tuples, one
+    for each P-VTEC code; ``hvtec`` is None if there's no H-VTEC code.  A
+    segment without VTEC codes has an empty list.  Bad products, segments
+    and codes are raised or logged to `errors` as by `Product`.
+    """
+    text = text.strip().replace("\r\n", "\n")
+    start = _locate_ugc(text)
+    header = Header(text[:start].strip())
+    segments = []
+    for seg_text in Segment.pattern.split(text[start:])[:-1]:
+        try:
+            m = Ugc.pattern.search(seg_text)
+            if not m:
+                raise SegmentError("Segment does not have a UGC code.")
+            ugc = Ugc._from_matches(m.group(0), m.groups())
+            codes = _codes(seg_text, errors)
+        except SegmentError, err:
+            if errors is not None and seg_text.strip():
+                errors.add("Segment", seg_text.strip(), str(err))
+            continue
+        segments.append([(ugc, pvtec, hvtec) for pvtec, hvtec in codes])
+    return Triage(header.wmo, header.awipsid, segments)
+
 class Event(object):
     """
     ``Event`` wraps instances of a UGC, a PVTEC, and (optionally) an HVTEC
@@ -156,13 +425,19 @@ class Event(object):
         self.hvtec = hvtec
     
     def __getattr__(self, name):
+        if name.startswith('__') or name in ('ugc', 'pvtec', 'hvtec'):
+            # not delegated, and not set yet while unpickling.
+            raise AttributeError(name)
         if hasattr(self.ugc, name):
             return getattr(self.ugc, name)
         elif hasattr(self.pvtec, name):
             return getattr(self.pvtec, name)
         if self.hvtec and hasattr(self.hvtec, name):
             return getattr(self.hvtec, name)
-        raise AttributeError
+        raise AttributeError(name)
+
+    def __reduce__(self):
+        return (Event, (self.ugc, self.pvtec, self.hvtec))
     
     def __str__(self):
         s = [str(self.ugc), str(self.pvtec)]
@@ -175,6 +450,7 @@ class Event(object):
     
 
 if __name__ == "__main__":
+    # a quick look at one product; see `nwscode.cli` for bulk decoding.
     import sys
     prod = Product(file(sys.argv[1], 'r').read())
     print prod.segments[-1].forecasts
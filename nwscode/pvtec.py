@@ -10,8 +10,7 @@ Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
 __all__ = ["PvtecError", "Pvtec"]
 
 import re
-from nwscode import NwsCode, NwsCodeError
-from misc import Bunch, parsevtectime
+from nwscode import NwsCode, NwsCodeError, Field, TimeField
 
 # PVTEC Grammar.
 FIXEDIDENT = r"[OTEX]"
@@ -70,6 +69,11 @@ class Pvtec(NwsCode):
         
         ``eventend``
             End of the valid time span for the event.
+        
+        ``minutes``
+            ``eventbegin`` and ``eventend`` as integer minutes since
+            1970-01-01T00:00 UTC, for cheap sorting and comparing.  The
+            datetime attributes are only built when they are read.
     
     Usage Example:
     
@@ -169,20 +173,11 @@ class Pvtec(NwsCode):
              'N': 'Synopsis'}
     }
 
-    def _process_matches(self, matches):
-        self.code = Bunch(fixedid=matches[0],
-                        action=matches[1],
-                        officeid=matches[2],
-                        phenomena=matches[3],
-                        significance=matches[4],
-                        etn=matches[5],
-                        eventbegin=matches[6],
-                        eventend=matches[7])
-        self.fixedid = self._interpret("fixedid", matches[0])
-        self.action = self._interpret("action", matches[1])
-        self.officeid = matches[2]
-        self.phenomena = self._interpret("phenomena", matches[3])
-        self.significance = self._interpret("significance", matches[4])
-        self.etn = int(matches[5])
-        self.eventbegin = parsevtectime(matches[6])
-        self.eventend = parsevtectime(matches[7])
\ No newline at end of file
+    fields = (Field("fixedid", 0, table="fixedid"),
+              Field("action", 1, table="action"),
+              Field("officeid", 2),
+              Field("phenomena", 3, table="phenomena"),
+              Field("significance", 4, table="significance"),
+              Field("etn", 5, convert=int),
+              TimeField("eventbegin", 6),
+              TimeField("eventend", 7))
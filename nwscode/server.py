@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+A server decoding a live product feed.
+
+`FeedServer` accepts NOAAPort framed products (see `nwscode.feed`) on a
+TCP or Unix socket, for instance from an LDM ``pqact`` PIPE action
+through ``socat`` or ``nc``.  Products are decoded in a pool of worker
+processes and every decoded `Product` is handed to the subscribers.
+Products waiting to be decoded are taken short-fuse warnings first (see
+`nwscode.priority`), so a backlog of routine products doesn't delay them.
+
+There are two limits, so a burst can't eat all the memory:
+
+    ``pending``
+        Products received but not handed to a decoding process yet.  When
+        it is reached the server stops reading from its clients, which
+        pushes back on them through TCP.
+
+    ``maxsize`` of a `Subscription`
+        Decoded products waiting for the subscriber.  A subscription that
+        is full drops the product and counts it.  A blocking one first
+        waits up to its ``timeout`` for room, holding up decoding for
+        every subscriber (and so, in turn, reading) meanwhile, so a slow
+        or abandoned subscriber can't stall the server for good.
+
+Usage Example:
+
+    server = FeedServer(("", 8000), processes=4)
+    server.start()
+    for product in server.subscribe():
+        ...
+
+Created by Alexander Ross on 2006-08-23.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+__all__ = ["FeedServer", "Subscription", "replay"]
+
+import socket
+import cPickle as pickle
+import threading
+import SocketServer
+import multiprocessing
+from Queue import Queue, Full, Empty
+
+from nwscode import ErrorLog, ErrorRecord
+from product import decode_products
+from feed import frame, iterframes
+from priority import DecodeQueue
+
+def _failed(text, err):
+    # the error record of a product that raised `err`.
+    return ErrorRecord("Product", text.strip().split("\n", 1)[0],
+                       "%s: %s" % (err.__class__.__name__, err))
+
+def _decode_text(text):
+    # returns (product or None, error records); nothing may escape, or the
+    # dispatcher would die with it.
+    errors = ErrorLog()
+    try:
+        products = list(decode_products([text], errors))
+        if products:
+            return products[0], errors.records
+    except Exception, err:
+        errors.records.append(_failed(text, err))
+    return None, errors.records
+
+def _decode_pickled(text):
+    # runs in a worker process; as `_decode_text`, with the product
+    # pickled here.  A pool never calls back for a job that raised, or
+    # whose result doesn't pickle, and its slot would be lost.
+    product, records = _decode_text(text)
+    if product is None:
+        return text, None, records
+    try:
+        return text, pickle.dumps(product, 2), records
+    except Exception, err:
+        return text, None, records + [_failed(text, err)]
+
+class Subscription(object):
+    """
+    A queue of decoded products.  Iterating over it blocks for the next
+    product.
+
+    Attributes:
+
+        ``dropped``
+            Products dropped because the subscription was full, for a
+            blocking one after waiting `timeout` seconds.
+    """
+    def __init__(self, maxsize=1000, block=False, timeout=10):
+        self.queue = Queue(maxsize)
+        self.block = block
+        self.timeout = timeout
+        self.dropped = 0
+
+    def _publish(self, product):
+        try:
+            self.queue.put(product, self.block, self.timeout)
+        except Full:
+            self.dropped += 1
+
+    def get(self, timeout=None):
+        """Returns the next product; raises `Queue.Empty` on a timeout."""
+        return self.queue.get(True, timeout)
+
+    def __iter__(self):
+        while True:
+            yield self.queue.get()
+
+class _Handler(SocketServer.BaseRequestHandler):
+    def handle(self):
+        submit = self.server.feed.submit
+        recv = self.request.recv
+        # recv returns whatever has arrived, so a frame is decoded as soon
+        # as its ETX is in.
+        for text in iterframes(iter(lambda: recv(65536), "")):
+            submit(text)
+
+class _TCPServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class _UnixServer(SocketServer.ThreadingMixIn,
+                  SocketServer.UnixStreamServer):
+    daemon_threads = True
+
+class FeedServer(object):
+    """
+    Decodes framed products arriving on `address`, a (host, port) tuple
+    or the path of a Unix socket.
+
+    `processes` is the number of decoding processes; with 0 products are
+    decoded by the thread reading them.  See the module documentation for
+    `pending`.
+
+    Attributes:
+
+        ``address``
+            The address the server is bound to.
+
+        ``received``, ``decoded``
+            Number of products received and successfully decoded.
+
+        ``errors``
+            An `ErrorLog` of everything that failed to decode.
+
+        ``queue``
+            The `DecodeQueue` of products waiting; its ``prometheus``
+            method reports how long they waited, by priority class.
+    """
+    def __init__(self, address, processes=2, pending=100):
+        self.received = self.decoded = 0
+        self.errors = ErrorLog(limit=1000)
+        self._lock = threading.Lock()
+        self.queue = DecodeQueue(pending)
+        self._subscribers = []
+        # bound first, so a taken address doesn't leave a pool behind.
+        if isinstance(address, basestring):
+            self._server = _UnixServer(address, _Handler)
+        else:
+            self._server = _TCPServer(address, _Handler)
+        self._server.feed = self
+        self.address = self._server.server_address
+        self._thread = None
+        if processes:
+            self._pool = multiprocessing.Pool(processes)
+            # products handed to the pool; a few per process keep them
+            # busy while the rest wait in priority order.
+            self._slots = threading.BoundedSemaphore(processes * 2)
+        else:
+            self._pool = None
+        self._closing = False
+        self._dispatcher = threading.Thread(target=self._dispatch)
+        self._dispatcher.setDaemon(True)
+        self._dispatcher.start()
+
+    def subscribe(self, maxsize=1000, block=False, timeout=10):
+        """
+        Returns a new `Subscription` to the decoded products; see the
+        module documentation for `block` and `timeout`.
+        """
+        sub = Subscription(maxsize, block, timeout)
+        self._lock.acquire()
+        try:
+            self._subscribers = self._subscribers + [sub]
+        finally:
+            self._lock.release()
+        return sub
+
+    def unsubscribe(self, sub):
+        self._lock.acquire()
+        try:
+            self._subscribers = [s for s in self._subscribers if s is not sub]
+        finally:
+            self._lock.release()
+
+    def submit(self, text):
+        """Queues the product `text`; blocks while `pending` are waiting."""
+        self._lock.acquire()
+        self.received += 1
+        self._lock.release()
+        self.queue.put(text)
+
+    def _dispatch(self):
+        # hands the queued products to the pool, or decodes them, most
+        # urgent first; once closing, until the queue is empty.
+        while True:
+            try:
+                text = self.queue.get(True, 0.1)
+            except Empty:
+                if self._closing:
+                    return
+                continue
+            if self._pool is None:
+                self._done(_decode_text(text))
+            else:
+                self._slots.acquire()
+                try:
+                    self._pool.apply_async(_decode_pickled, (text,),
+                                           callback=self._unpickle)
+                except Exception:
+                    self._slots.release()
+                    raise
+
+    def _unpickle(self, result):
+        text, data, records = result
+        product = None
+        if data is not None:
+            try:
+                product = pickle.loads(data)
+            except Exception, err:
+                records = records + [_failed(text, err)]
+        self._done((product, records))
+
+    def _done(self, result):
+        product, records = result
+        try:
+            self._lock.acquire()
+            try:
+                for record in records:
+                    self.errors.add(*record)
+                if product is not None:
+                    self.decoded += 1
+            finally:
+                self._lock.release()
+            if product is not None:
+                for sub in self._subscribers:
+                    sub._publish(product)
+        finally:
+            if self._pool is not None:
+                self._slots.release()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def start(self):
+        """Serves in a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.setDaemon(True)
+        self._thread.start()
+
+    def shutdown(self):
+        """Stops serving and waits for the products being decoded."""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+        self._server.server_close()
+        self._closing = True
+        self._dispatcher.join()
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+
+def replay(address, texts, sequence=0):
+    """
+    Sends the products `texts`, framed, to the server at `address`.  A
+    local stand-in for an LDM feed.
+    """
+    if isinstance(address, basestring):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.connect(address)
+    try:
+        for text in texts:
+            sock.sendall(frame(text, sequence))
+            sequence += 1
+    finally:
+        sock.close()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+A local store of decoded products in SQLite.
+
+`EventStore` keeps products, their segments, the zones of each segment
+and the events in a SQLite database, queryable with SQL by anything that
+reads SQLite.  The tables are:
+
+    ``products``
+        ``id``, the WMO heading and AWIPS Identifier columns of
+        `nwscode.export.COLUMNS` and the ``text`` of the product.
+
+    ``segments``
+        ``id``, ``product``, the ``ugc`` code and ``ugc_expiration``,
+        resolved against `Product.issuanceminutes` and null without it.
+
+    ``zones``
+        ``segment`` and ``zone``, one row for each area of its UGC code.
+
+    ``events``
+        ``id``, ``segment`` and the P-VTEC and H-VTEC columns of
+        `nwscode.export.COLUMNS`, with VTEC times as ``YYYY-MM-DDTHH:MMZ``
+        so they sort in time order.
+
+Events are indexed by event key (office, phenomena, significance and
+event tracking number), by begin and by end time, and zones by zone.
+
+Writes are buffered and inserted with ``executemany``, `buffersize`
+products in one transaction, and the database is in WAL mode, so readers
+don't block the ingest and the ingest doesn't block them.
+
+Usage Example:
+
+    store = EventStore("events.db")
+    store.writeall(decode_products(texts, errors))
+    store.flush()
+    for row in store.zone_events("AZZ023", start=datetime(2006, 7, 21)):
+        ...
+
+Created by Alexander Ross on 2006-09-02.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+__all__ = ["EventStore"]
+
+import sqlite3
+
+from misc import fromepochminutes
+from export import WMO_GETTERS, AWIPS_GETTERS, PVTEC_GETTERS, \
+                   HVTEC_GETTERS, NO_HVTEC
+
+_PRODUCT = [c for c, get in WMO_GETTERS + AWIPS_GETTERS]
+_EVENT = [c for c, get in PVTEC_GETTERS + HVTEC_GETTERS]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    %s,
+    text TEXT
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    product INTEGER NOT NULL REFERENCES products,
+    ugc TEXT,
+    ugc_expiration TEXT
+);
+CREATE TABLE IF NOT EXISTS zones (
+    segment INTEGER NOT NULL REFERENCES segments,
+    zone TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    segment INTEGER NOT NULL REFERENCES segments,
+    %s
+);
+CREATE INDEX IF NOT EXISTS events_key ON events (pvtec_officeid,
+    pvtec_phenomena, pvtec_significance, pvtec_etn);
+CREATE INDEX IF NOT EXISTS events_begin ON events (pvtec_eventbegin);
+CREATE INDEX IF NOT EXISTS events_end ON events (pvtec_eventend);
+CREATE INDEX IF NOT EXISTS zones_zone ON zones (zone, segment);
+CREATE INDEX IF NOT EXISTS segments_product ON segments (product);
+CREATE INDEX IF NOT EXISTS events_segment ON events (segment);
+""" % (",\n    ".join([c + " TEXT" for c in _PRODUCT]),
+       ",\n    ".join([c + " TEXT" for c in _EVENT]))
+
+def _insert(table, columns):
+    return "INSERT INTO %s (%s) VALUES (%s)" % (table, ", ".join(columns),
+                                              ", ".join(["?"] * len(columns)))
+
+_products = _insert("products", ["id"] + _PRODUCT + ["text"])
+_segments = _insert("segments", ["id", "product", "ugc", "ugc_expiration"])
+_zones = _insert("zones", ["segment", "zone"])
+_events = _insert("events", ["id", "segment"] + _EVENT)
+
+class EventStore(object):
+    """
+    The SQLite database at `path`, created if needed; ``":memory:"``
+    works too.  Written products are inserted `buffersize` at a time; see
+    the module documentation.  Only one `EventStore` should write to a
+    database at a time, as it numbers the rows itself.
+
+    Attributes:
+
+        ``connection``
+            The `sqlite3.Connection`, for queries; rows are
+            `sqlite3.Row`s.
+
+        ``count``
+            Number of products written so far.
+    """
+    def __init__(self, path, buffersize=1000):
+        self.buffersize = buffersize
+        self.count = 0
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        # with WAL a commit survives a crash of the process, only an OS
+        # crash may lose the last transactions.
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(SCHEMA)
+        self._ids = {}
+        for table in ["products", "segments", "events"]:
+            self._ids[table] = self.connection.execute(
+                        "SELECT max(id) FROM %s" % table).fetchone()[0] or 0
+        self._reset()
+
+    def _reset(self):
+        self._products = []
+        self._segments = []
+        self._zones = []
+        self._events = []
+
+    def write(self, product):
+        """Buffers `product`; inserts the buffer once it's full."""
+        ids = self._ids
+        ids["products"] += 1
+        pid = ids["products"]
+        wmo, awips = product.header.wmo, product.header.awipsid
+        issued = product.issuanceminutes()
+        self._products.append(tuple([pid] +
+                                    [get(wmo) for c, get in WMO_GETTERS] +
+                                    [get(awips) for c, get in AWIPS_GETTERS] +
+                                    [product.text]))
+        for seg in product.segments:
+            ids["segments"] += 1
+            sid = ids["segments"]
+            expiration = None
+            if issued is not None:
+                expiration = fromepochminutes(seg.ugc.expirationminutes(
+                                    issued)).strftime("%Y-%m-%dT%H:%MZ")
+            self._segments.append((sid, pid, seg.ugc.raw, expiration))
+            self._zones.extend([(sid, zone) for zone in seg.ugc.areas])
+            for event in seg.events:
+                ids["events"] += 1
+                row = [ids["events"], sid]
+                row.extend([get(event.pvtec) for c, get in PVTEC_GETTERS])
+                if event.hvtec is None:
+                    row.extend(NO_HVTEC)
+                else:
+                    row.extend([get(event.hvtec) for c, get in HVTEC_GETTERS])
+                self._events.append(row)
+        self.count += 1
+        if len(self._products) >= self.buffersize:
+            self.flush()
+
+    def writeall(self, products):
+        """Writes each product in the iterable `products`."""
+        for product in products:
+            self.write(product)
+
+    def flush(self):
+        """Inserts the buffered products in one transaction."""
+        if not self._products:
+            return
+        conn = self.connection
+        try:
+            conn.executemany(_products, self._products)
+            conn.executemany(_segments, self._segments)
+            conn.executemany(_zones, self._zones)
+            conn.executemany(_events, self._events)
+            conn.commit()
+        except:
+            # the rows stay buffered, with their ids, for another try.
+            conn.rollback()
+            raise
+        self._reset()
+
+    def zone_events(self, zone, start=None, end=None):
+        """
+        Returns the events for `zone` in effect some time between the
+        datetimes `start` and `end`, either of which may be None, in order
+        of their begin time.  An event without a begin or end time is
+        taken to be in effect from the start or until the end of time.
+        Each row has the product and segment ids and the event columns.
+        """
+        sql = ["SELECT segments.product, events.* FROM zones "
+               "JOIN segments ON segments.id = zones.segment "
+               "JOIN events ON events.segment = zones.segment "
+               "WHERE zones.zone = ?"]
+        params = [zone]
+        if start is not None:
+            sql.append("AND (pvtec_eventend IS NULL OR pvtec_eventend > ?)")
+            params.append(start.strftime("%Y-%m-%dT%H:%MZ"))
+        if end is not None:
+            sql.append("AND (pvtec_eventbegin IS NULL "
+                       "OR pvtec_eventbegin < ?)")
+            params.append(end.strftime("%Y-%m-%dT%H:%MZ"))
+        sql.append("ORDER BY pvtec_eventbegin, events.id")
+        return self.connection.execute(" ".join(sql), params).fetchall()
+
+    def close(self):
+        """Inserts the buffered products and closes the database."""
+        self.flush()
+        self.connection.close()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Synthetic products for load testing.
+
+`CorpusGenerator` writes made-up but well-formed products: a WMO heading,
+an AWIPS Identifier, segments with UGC codes (area ranges included),
+P-VTEC codes, H-VTEC codes for the hydrologic phenomena, headlines and
+text, each ended by ``$$``.  Phenomena, significance, actions, flood
+severity, causes and record status are drawn from the tables of `Pvtec`,
+`Hvtec` and `AwipsId`, so every product decodes.
+
+The output depends only on the seed and the options, so a corpus of any
+size can be regenerated instead of stored:
+
+    python -m nwscode.synthetic --seed 7 --size 2000000000 > corpus.ldm
+
+Created by Alexander Ross on 2006-08-28.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+__all__ = ["CorpusGenerator", "CATEGORIES", "OFFICES"]
+
+import sys
+import random
+try:
+    from datetime import datetime, timedelta
+except ImportError:
+    from pydatetime import datetime, timedelta
+
+from pvtec import Pvtec
+from hvtec import Hvtec
+from awipsid import AwipsId
+from feed import frame
+
+# AWIPS category: (WMO designator, phenomena, significance) of products
+# carrying VTEC.
+CATEGORIES = {
+    "NPW": ("WWUS7", "EH HT HW WI FG FR FZ HZ DU", "WAY"),
+    "WSW": ("WWUS4", "WS WW BZ HS IS LE SN ZR WC", "WAY"),
+    "FFA": ("WGUS6", "FF FA FL", "A"),
+    "FFW": ("WGUS5", "FF", "W"),
+    "FLW": ("WGUS4", "FL", "W"),
+    "FLS": ("WGUS8", "FL FA", "WY"),
+    "SVR": ("WUUS5", "SV", "W"),
+    "TOR": ("WFUS5", "TO", "W"),
+    "SVS": ("WWUS5", "SV TO", "W"),
+    "SMW": ("WHUS5", "MA", "W"),
+    "CFW": ("WHUS4", "CF LS SU", "WAY"),
+    "RFW": ("WWUS8", "FW", "WA"),
+}
+
+OFFICES = ("KPSR", "KREV", "KBOU", "KOUN", "KLWX", "KMFL", "KSEW", "KBOX",
+           "KFWD", "KDMX", "PAFG", "PAFC")
+
+# phenomena that get an H-VTEC code.
+HYDROLOGIC = ("FF", "FA", "FL", "HY")
+
+STATES = {"KPSR": "AZ CA", "KREV": "NV CA", "KBOU": "CO", "KOUN": "OK TX",
+          "KLWX": "VA MD DC WV", "KMFL": "FL", "KSEW": "WA", "KBOX": "MA RI",
+          "KFWD": "TX", "KDMX": "IA", "PAFG": "AK", "PAFC": "AK"}
+
+WORDS = ("THE", "HEAT", "WIND", "RAIN", "OVER", "AREA", "THIS", "EVENING",
+         "THROUGH", "AFTERNOON", "STORMS", "WITH", "HEAVY", "LOCALLY",
+         "EXPECTED", "ALONG", "NEAR", "COUNTY", "RESIDENTS", "SHOULD",
+         "PRECAUTIONS", "TEMPERATURES", "WILL", "REACH", "DEGREES", "AND",
+         "VALLEYS", "MOUNTAINS", "FLOODING", "OF", "SMALL", "STREAMS",
+         "POSSIBLE", "VISIBILITY", "BELOW", "MILE", "AT", "TIMES", "IN")
+
+VERBS = {"NEW": "IN EFFECT", "CON": "REMAINS IN EFFECT",
+         "EXT": "NOW IN EFFECT", "EXA": "EXPANDED", "UPG": "IN EFFECT",
+         "CAN": "IS CANCELLED", "EXP": "HAS EXPIRED", "COR": "IN EFFECT",
+         "ROU": "IN EFFECT"}
+
+NOTIME = "000000T0000Z"
+
+class CorpusGenerator(object):
+    """
+    Generates products deterministically from `seed`.
+
+    ``segments``
+        (least, most) segments per product.
+
+    ``vtec``
+        Mean number of P-VTEC codes per segment; 0 makes products without
+        VTEC.
+
+    ``areas``
+        (least, most) areas per UGC code.
+
+    ``lines``
+        (least, most) lines of text per segment, which sets the size; at
+        most 1000.
+
+    ``start``
+        Issuance of the first product, a datetime; the others follow a
+        few minutes apart.
+
+    ``offices``
+        Issuing offices, four letter identifiers.
+
+    ``categories``
+        AWIPS categories to issue, from `CATEGORIES`; all of them by
+        default.
+
+    Usage Example:
+
+    >>> g = CorpusGenerator(seed=1)
+    >>> text = g.product()
+    >>> from nwscode.product import Product
+    >>> len(Product(text).segments) > 0
+    True
+    """
+    def __init__(self, seed=0, segments=(1, 6), vtec=1.5, areas=(1, 12),
+                 lines=(2, 10), start=datetime(2006, 7, 20),
+                 offices=OFFICES, categories=None):
+        self.random = random.Random(seed)
+        self.segments = segments
+        self.vtec = vtec
+        self.areas = areas
+        self.lines = lines
+        self.time = start
+        self.offices = tuple(offices)
+        known = AwipsId.interpreted["category"]
+        phenomena = Pvtec.interpreted["phenomena"]
+        significance = Pvtec.interpreted["significance"]
+        # (category, designator, phenomena, significance), table entries
+        # only, in a fixed order.
+        if categories is None:
+            categories = CATEGORIES
+        self.categories = []
+        for category in sorted(categories):
+            if category not in CATEGORIES:
+                continue
+            designator, codes, sigs = CATEGORIES[category]
+            codes = [p for p in codes.split() if p in phenomena]
+            sigs = [s for s in sigs if s in significance]
+            if category in known and codes and sigs:
+                self.categories.append((category, designator, codes, sigs))
+        if not self.categories:
+            raise ValueError("No usable AWIPS category.")
+        self.actions = sorted(Pvtec.interpreted["action"])
+        self.severities = sorted(Hvtec.interpreted["floodseverity"])
+        self.causes = sorted(Hvtec.interpreted["immediatecause"])
+        self.statuses = sorted(Hvtec.interpreted["recordstatus"])
+        self._etns = {}
+        # segments take their text from this pool, a lot faster than
+        # drawing every word.
+        self._text = self._wrap(self._words(11 * 1000))
+
+    def _words(self, count):
+        choice = self.random.choice
+        return [choice(WORDS) for i in xrange(count)]
+
+    def _wrap(self, words, width=66):
+        lines, line = [], []
+        length = 0
+        for word in words:
+            if line and length + len(word) + 1 > width:
+                lines.append(" ".join(line))
+                line, length = [], 0
+            line.append(word)
+            length += len(word) + 1
+        if line:
+            lines.append(" ".join(line))
+        return lines
+
+    def _ugc(self, office, expiration):
+        # a UGC code with ranges, wrapped like the real thing.
+        r = self.random
+        state = r.choice(STATES.get(office, "XX").split())
+        kind = r.choice("ZC")
+        numbers = sorted(r.sample(xrange(1, 200), r.randint(*self.areas)))
+        groups = []
+        i = 0
+        while i < len(numbers):
+            j = i
+            while j + 1 < len(numbers) and numbers[j + 1] == numbers[j] + 1:
+                j += 1
+            if j - i >= 2:
+                groups.append("%03d>%03d" % (numbers[i], numbers[j]))
+            else:
+                groups.extend(["%03d" % n for n in numbers[i:j + 1]])
+            i = j + 1
+        groups[0] = state + kind + groups[0]
+        groups.append(expiration.strftime("%d%H%M"))
+        lines, line = [], ""
+        for group in groups:
+            if line and len(line) + len(group) + 1 > 66:
+                lines.append(line)
+                line = ""
+            line += group + "-"
+        lines.append(line)
+        return "\n".join(lines)
+
+    def _vtec(self, office, phenomena, significance, issued):
+        # one P-VTEC code and, for a hydrologic phenomenon, an H-VTEC code.
+        r = self.random
+        action = r.choice(self.actions)
+        key = (office, phenomena, significance)
+        if action == "NEW" or key not in self._etns:
+            self._etns[key] = self._etns.get(key, 0) % 9999 + 1
+        etn = self._etns[key]
+        start = issued
+        begin = NOTIME
+        if action == "NEW" or r.random() < 0.5:
+            start = issued + timedelta(minutes=r.randint(0, 720))
+            begin = start.strftime("%y%m%dT%H%MZ")
+        end = start + timedelta(minutes=r.randint(60, 2880))
+        codes = ["/O.%s.%s.%s.%s.%04d.%s-%s/"
+                 % (action, office, phenomena, significance, etn, begin,
+                    end.strftime("%y%m%dT%H%MZ"))]
+        if phenomena in HYDROLOGIC:
+            if phenomena == "FF":
+                site = "00000"
+            else:
+                site = "".join([r.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+                                for i in range(4)]) + str(r.randint(1, 9))
+            times = [NOTIME] * 3
+            if r.random() < 0.5:
+                crest = start + (end - start) / 2
+                times = [begin, crest.strftime("%y%m%dT%H%MZ"),
+                         end.strftime("%y%m%dT%H%MZ")]
+            codes.append("/%s.%s.%s.%s.%s.%s.%s/"
+                         % (site, r.choice(self.severities),
+                            r.choice(self.causes), times[0], times[1],
+                            times[2], r.choice(self.statuses)))
+        headline = "...%s %s %s..." % (
+                        Pvtec.interpreted["phenomena"][phenomena].upper(),
+                        Pvtec.interpreted["significance"][significance]
+                                                                    .upper(),
+                        VERBS.get(action, "IN EFFECT"))
+        return codes, headline
+
+    def product(self):
+        """Returns the text of the next product."""
+        r = self.random
+        self.time += timedelta(minutes=r.randint(1, 15))
+        issued = self.time
+        office = r.choice(self.offices)
+        category, designator, phenomena, sigs = r.choice(self.categories)
+        lines = ["%s%d %s %s" % (designator, r.randint(0, 9), office,
+                                 issued.strftime("%d%H%M")),
+                 category + office[1:], ""]
+        lines.extend(self._wrap(self._words(r.randint(3, 8))))
+        lines.append("NATIONAL WEATHER SERVICE " + office)
+        lines.append(issued.strftime("%H%M UTC %a %b %d %Y").upper())
+        lines.append("")
+        expiration = issued + timedelta(minutes=r.randint(60, 720))
+        for i in xrange(r.randint(*self.segments)):
+            lines.append(self._ugc(office, expiration))
+            count = int(self.vtec)
+            if r.random() < self.vtec - count:
+                count += 1
+            headlines = []
+            for j in xrange(count):
+                codes, headline = self._vtec(office, r.choice(phenomena),
+                                             r.choice(sigs), issued)
+                lines.extend(codes)
+                headlines.append(headline)
+            lines.extend(self._wrap(self._words(r.randint(2, 6))))
+            lines.append("")
+            for headline in headlines:
+                lines.append(headline)
+                lines.append("")
+            count = r.randint(*self.lines)
+            first = r.randint(0, len(self._text) - count)
+            lines.extend(self._text[first:first + count])
+            lines.extend(["", "$$", ""])
+        return "\n".join(lines)
+
+    def products(self, count):
+        """Yields the texts of the next `count` products."""
+        for i in xrange(count):
+            yield self.product()
+
+    def write(self, stream, size, framed=True, buffersize=1 << 20):
+        """
+        Writes products to the file-like `stream` until at least `size`
+        bytes are written, NOAAPort framed (see `nwscode.feed`) unless
+        `framed` is false.  Returns the number of products.
+        """
+        written = count = 0
+        buf, buffered = [], 0
+        while written < size:
+            text = self.product()
+            if framed:
+                text = frame(text, count)
+            else:
+                text += "\n"
+            buf.append(text)
+            buffered += len(text)
+            written += len(text)
+            count += 1
+            if buffered >= buffersize:
+                stream.write("".join(buf))
+                buf, buffered = [], 0
+        stream.write("".join(buf))
+        return count
+
+if __name__ == "__main__":
+    from optparse import OptionParser
+    parser = OptionParser(usage="%prog [options] > corpus")
+    parser.add_option("-s", "--seed", type="int", default=0)
+    parser.add_option("-n", "--size", type="int", default=1 << 20,
+                      help="bytes to write [default: %default]")
+    parser.add_option("--vtec", type="float", default=1.5,
+                      help="mean P-VTEC codes per segment [default: %default]")
+    parser.add_option("--segments", type="int", default=6,
+                      help="most segments per product [default: %default]")
+    parser.add_option("--plain", action="store_true", default=False,
+                      help="write products without NOAAPort framing")
+    options, args = parser.parse_args()
+    generator = CorpusGenerator(options.seed, segments=(1, options.segments),
+                                vtec=options.vtec)
+    generator.write(sys.stdout, options.size, not options.plain)
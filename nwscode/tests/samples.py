@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Sample products shared by the tests.
+
+`NAMES` lists the product files kept next to the tests, and ``sample(name)``
+returns the text of one of them.
+
+Created by Alexander Ross on 2006-09-04.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+__all__ = ["NAMES", "sample"]
+
+import os
+
+NAMES = ['WWUS75_KPSR_202352.text', 'WGUS65_KREV_210005.text',
+         'FPAK53_PAFG_192345.text']
+
+def sample(name):
+    """Returns the text of the sample product file `name`."""
+    return open(os.path.join(os.path.dirname(__file__), name)).read()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for ``ProductCache`` in ``nwscode.cache``.
+
+Created by Alexander Ross on 2006-08-22.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+import os
+from py.test import raises
+from nwscode import cache
+from nwscode.cache import ProductCache
+from nwscode.product import Product, ProductError
+from nwscode.tests.samples import NAMES, sample
+
+def test_cache(tmpdir):
+    c = ProductCache(str(tmpdir))
+    text = sample(NAMES[0])
+    assert c.get(text) is None
+    p = c.decode(text)
+    assert (c.hits, c.misses) == (0, 2)
+    # line ends and surrounding whitespace don't make a new entry.
+    q = c.decode("\r\n" + text.replace("\n", "\r\n"))
+    assert (c.hits, c.misses) == (1, 2)
+    assert str(p) == str(q)
+    assert [str(e) for e in q.segments[0].events] == \
+                                    [str(e) for e in p.segments[0].events]
+    assert len(c) == 1
+    # a second cache on the same directory sees the entry.
+    c = ProductCache(str(tmpdir))
+    assert len(c) == 1
+    assert c.size > 0
+    assert str(c.get(text)) == str(p)
+    raises(ProductError, c.decode, 'NOT A PRODUCT')
+
+def test_evict(tmpdir):
+    c = ProductCache(str(tmpdir), maxsize=0)
+    c.decode(sample(NAMES[0]))
+    assert len(c) == 0
+    c = ProductCache(str(tmpdir))
+    for name in NAMES:
+        c.decode(sample(name))
+    sizes = c.size
+    c.get(sample(NAMES[0]))
+    c.maxsize = sizes - 1
+    c._evict()
+    # the least recently used one went first.
+    assert sample(NAMES[1]) not in c
+    assert sample(NAMES[0]) in c
+    assert sample(NAMES[2]) in c
+
+def test_version(tmpdir):
+    # other things in the directory are left alone.
+    tmpdir.mkdir("data").join("keep").write("x")
+    tmpdir.mkdir("v1-notes")
+    c = ProductCache(str(tmpdir))
+    c.decode(sample(NAMES[0]))
+    saved = cache.DECODER_VERSION
+    cache.DECODER_VERSION = saved + 1
+    try:
+        c = ProductCache(str(tmpdir))
+        assert len(c) == 0
+        assert sorted(os.listdir(str(tmpdir))) == \
+               sorted([c.version, "data", "v1-notes"])
+        assert tmpdir.join("data", "keep").read() == "x"
+    finally:
+        cache.DECODER_VERSION = saved
+
+def test_damaged(tmpdir):
+    c = ProductCache(str(tmpdir))
+    text = sample(NAMES[1])
+    c.decode(text)
+    open(c._path(c.key(text)), "wb").write("garbage")
+    assert c.get(text) is None
+    assert len(c) == 0
+    assert c.decode(text).header.wmo.designator == 'WGUS65'
+
+def test_missing(tmpdir):
+    c = ProductCache(str(tmpdir))
+    for name in NAMES:
+        c.decode(sample(name))
+    size = c.size
+    path = c._path(c.key(sample(NAMES[0])))
+    removed = os.path.getsize(path)
+    os.remove(path)
+    assert c.get(sample(NAMES[0])) is None
+    assert len(c) == 2
+    assert c.size == size - removed
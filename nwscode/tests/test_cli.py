@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for the ``nwscode`` command in ``nwscode.cli``.
+
+Created by Alexander Ross on 2006-08-25.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+import os
+import json
+from nwscode.cli import main
+from nwscode.feed import frame
+from nwscode.tests.samples import NAMES, sample
+
+def run(tmpdir, *args):
+    out = str(tmpdir.join("out.jsonl"))
+    assert main(["-o", out] + list(args)) == 0
+    return [json.loads(line) for line in open(out)]
+
+def test_files(tmpdir, capsys):
+    paths = [os.path.join(os.path.dirname(__file__), n) for n in NAMES]
+    rows = run(tmpdir, "-j", "0", *paths)
+    assert [r["awips_category"] for r in rows] == ["NPW"] * 4 + ["FFA"] * 2
+    report = capsys.readouterr()[1]
+    assert report.startswith("3 products, 6 records in ")
+    assert "errors: none" in report
+    assert "\nheader " in report and "\nPvtec " in report
+
+def test_filters(tmpdir, capsys):
+    paths = [os.path.join(os.path.dirname(__file__), n) for n in NAMES]
+    rows = run(tmpdir, "-q", "-j", "0", "-p", "ff,eh", *paths)
+    assert len(rows) == 4
+    rows = run(tmpdir, "-q", "-j", "0", "-p", "EH", "-O", "PSR", *paths)
+    assert [r["pvtec_etn"] for r in rows] == ["0007", "0008"]
+    rows = run(tmpdir, "-q", "-j", "0", "-O", "KREV", "-c", "NPW", *paths)
+    assert rows == []
+    assert capsys.readouterr()[1] == ""
+
+def test_pool(tmpdir, capsys):
+    # a directory with a framed feed file and something that is no product.
+    feed = tmpdir.mkdir("feed")
+    feed.join("a.ldm").write("".join([frame(sample(n), i)
+                                      for i, n in enumerate(NAMES)]))
+    feed.join("b.text").write("NOT A PRODUCT")
+    rows = run(tmpdir, "-j", "2", "-b", "1", "--no-timings", str(feed))
+    assert len(rows) == 6
+    report = capsys.readouterr()[1]
+    assert report.startswith("3 products, 6 records in ")
+    assert "errors: Product 1" in report
+    assert "stage" not in report
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for ``EventCube`` in ``nwscode.cube``.
+
+Created by Alexander Ross on 2006-09-06.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+import pickle
+from py.test import raises
+from nwscode.cube import EventCube, Cell, DIMENSIONS, UNKNOWN
+from nwscode.misc import fromepochminutes
+from nwscode.product import Product
+from nwscode.synthetic import CorpusGenerator
+
+def rows(products):
+    # (office, phenomena, significance, action, year, month, minutes) of
+    # each distinct code of each product.
+    result = []
+    for p in products:
+        seen = set()
+        for s in p.segments:
+            for e in s.events:
+                if e.pvtec.raw in seen:
+                    continue
+                seen.add(e.pvtec.raw)
+                c, m = e.pvtec.code, e.pvtec.minutes
+                when = fromepochminutes(m.eventbegin or m.eventend)
+                minutes = None
+                if m.eventbegin is not None and m.eventend is not None:
+                    minutes = m.eventend - m.eventbegin
+                result.append((c.officeid, c.phenomena, c.significance,
+                               c.action, when.year, when.month, minutes))
+    return result
+
+def test_cube():
+    products = [Product(t) for t in CorpusGenerator(seed=12).products(400)]
+    cube = EventCube()
+    for p in products:
+        cube.add(p)
+    assert cube.products == 400
+    expected = rows(products)
+    assert cube.get().count == len(expected)
+    office = expected[0][0]
+    for query, match in [
+            ({}, lambda r: True),
+            ({"officeid": office}, lambda r: r[0] == office),
+            ({"phenomena": "FF", "significance": "W", "action": "NEW"},
+             lambda r: r[1:4] == ("FF", "W", "NEW")),
+            ({"officeid": office, "year": 2006, "month": 7},
+             lambda r: r[0] == office and r[4:6] == (2006, 7))]:
+        selected = [r for r in expected if match(r)]
+        timed = [r[6] for r in selected if r[6] is not None]
+        assert cube.get(**query) == Cell(len(selected), len(timed),
+                                         sum(timed))
+    by = cube.breakdown(["officeid", "year"], significance="W",
+                        action="NEW")
+    for (o, y), cell in by.items():
+        assert cell.count == len([r for r in expected if r[0] == o and
+                                  r[4] == y and r[2:4] == ("W", "NEW")])
+    assert sum([c.count for c in by.values()]) == \
+           cube.get(significance="W", action="NEW").count
+    assert cube.get(officeid="XXXX") == Cell(0, 0, 0)
+    raises(TypeError, cube.get, office="KPSR")
+    raises(TypeError, cube.breakdown, ["wfo"])
+
+def test_merge():
+    texts = list(CorpusGenerator(seed=13).products(100))
+    whole, a, b = EventCube(), EventCube(), EventCube()
+    for i, text in enumerate(texts):
+        p = Product(text)
+        whole.add(p)
+        [a, b][i % 2].add(p)
+    a.merge(pickle.loads(pickle.dumps(b, 2)))
+    assert a.products == whole.products
+    assert a.breakdown(DIMENSIONS) == whole.breakdown(DIMENSIONS)
+    assert a.get(year=2006) == whole.get(year=2006)
+
+TWO = """WWUS75 KPSR 202352
+NPWPSR
+
+AZZ022-210300-
+/O.CON.KPSR.EH.W.0007.060721T1700Z-060722T0300Z/
+TEXT
+
+$$
+
+AZZ023-210300-
+/O.CON.KPSR.EH.W.0007.060721T1700Z-060722T0300Z/
+/O.CON.KPSR.HT.Y.0008.060721T1700Z-060722T0300Z/
+TEXT
+
+$$
+"""
+
+NOTIMES = """WWUS75 KPSR 202352
+NPWPSR
+
+AZZ022-210300-
+/O.CAN.KPSR.EH.W.0007.000000T0000Z-000000T0000Z/
+TEXT
+
+$$
+"""
+
+def test_unknown():
+    cube = EventCube()
+    cube.add(Product(NOTIMES))
+    assert cube.get(year=UNKNOWN, month=UNKNOWN) == Cell(1, 0, 0)
+    assert cube.breakdown(["year"]) == {(UNKNOWN,): Cell(1, 0, 0)}
+    assert cube.get(year=2006) == Cell(0, 0, 0)
+
+def test_segments():
+    # a code in several segments counts once.
+    cube = EventCube()
+    assert cube.add(Product(TWO)) == 2
+    assert cube.get(phenomena="EH") == Cell(1, 1, 600)
+    assert cube.get(year=2006, month=7).count == 2
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for ``DuplicateFilter`` in ``nwscode.duplicates``.
+
+Created by Alexander Ross on 2006-08-16.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+from py.test import raises
+from nwscode.wmo import WmoError
+from nwscode.duplicates import DuplicateFilter, fingerprint, NEW, \
+                               DUPLICATE, DELAYED, CORRECTION, AMENDMENT
+from nwscode.tests.samples import sample
+
+PRODUCT = sample('WWUS75_KPSR_202352.text')
+
+def with_addendum(text, bbb):
+    first, rest = text.split('\n', 1)
+    return first + ' ' + bbb + '\n' + rest
+
+def test_fingerprint():
+    digest, status = fingerprint(PRODUCT)
+    assert status == NEW
+    # line ends and surrounding whitespace don't matter, the BBB neither.
+    assert fingerprint('\n' + PRODUCT.replace('\n', '\r\r\n'))[0] == digest
+    assert fingerprint(with_addendum(PRODUCT, 'RRA')) == (digest, DELAYED)
+    assert fingerprint(with_addendum(PRODUCT, 'CCA'))[1] == CORRECTION
+    assert fingerprint(with_addendum(PRODUCT, 'AAB'))[1] == AMENDMENT
+    assert fingerprint(PRODUCT + 'MORE TEXT')[0] != digest
+    raises(WmoError, fingerprint, 'NOT A PRODUCT\nZFPAFG\n')
+
+def test_unicode():
+    digest = fingerprint(PRODUCT)[0]
+    assert fingerprint(PRODUCT.decode('ascii')) == (digest, NEW)
+    accented = PRODUCT.decode('ascii') + u'M\xc9XICO'
+    assert fingerprint(accented)[0] == \
+        fingerprint(accented.encode('utf-8'))[0]
+    assert fingerprint(accented)[0] != digest
+
+def test_filter():
+    f = DuplicateFilter()
+    amended = with_addendum(PRODUCT, 'AAA').replace('CANCELLED', 'EXTENDED')
+    texts = [PRODUCT, PRODUCT, with_addendum(PRODUCT, 'RRA'), amended,
+             amended]
+    assert list(f.filter(texts)) == [(PRODUCT, NEW), (amended, AMENDMENT)]
+    assert f.counts[DUPLICATE] == 3
+    assert f.counts[NEW] == 1
+    assert f.counts[AMENDMENT] == 1
+    assert len(f) == 2
+
+def test_window():
+    f = DuplicateFilter(window=60)
+    assert f.check(PRODUCT, now=0) == NEW
+    assert f.check(PRODUCT, now=30) == DUPLICATE
+    # seen again at 30, so still remembered at 80.
+    assert f.check(PRODUCT, now=80) == DUPLICATE
+    assert f.check(PRODUCT, now=200) == NEW
+
+def test_capacity():
+    f = DuplicateFilter(capacity=3)
+    texts = [PRODUCT + str(i) for i in range(5)]
+    for i, text in enumerate(texts):
+        assert f.check(text, now=i) == NEW
+        assert len(f) <= 3
+    assert f.check(texts[4], now=5) == DUPLICATE
+    assert f.check(texts[0], now=6) == NEW
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for the event files of ``nwscode.eventfile``.
+
+Created by Alexander Ross on 2006-09-04.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+import os
+import py
+from py.test import raises
+from nwscode.eventfile import EventWriter, EventReader, NOTIME, \
+                              RECORD_SIZE, HEADER_SIZE
+from nwscode.product import Product
+from nwscode.synthetic import CorpusGenerator
+from nwscode.tests.samples import NAMES, sample
+
+def events(products):
+    return [e for p in products for s in p.segments for e in s.events]
+
+def test_roundtrip(tmpdir):
+    path = str(tmpdir.join("events.bin"))
+    products = [Product(sample(name)) for name in NAMES]
+    writer = EventWriter(path, buffersize=2)
+    writer.writeall(products)
+    writer.close()
+    expected = events(products)
+    assert os.path.getsize(path) == HEADER_SIZE + \
+                                    len(expected) * RECORD_SIZE
+    reader = EventReader(path)
+    records = list(reader)
+    assert len(reader) == len(records) == len(expected)
+    for r, e in zip(records, expected):
+        assert r.phenomena == e.pvtec.code.phenomena
+        assert r.officeid == e.pvtec.code.officeid
+        assert r.etn == int(e.pvtec.code.etn)
+        assert reader.zones(r) == e.ugc.areas
+        if e.pvtec.minutes.eventbegin is None:
+            assert r.eventbegin == NOTIME
+        else:
+            assert r.eventbegin == e.pvtec.minutes.eventbegin
+        if e.hvtec is None:
+            assert r.siteid == "" and r.floodcrest == NOTIME
+        else:
+            assert r.siteid == e.hvtec.siteid
+            assert r.floodcrest == (e.hvtec.minutes.floodcrest or NOTIME)
+    # appending.
+    writer = EventWriter(path)
+    writer.write(products[0])
+    writer.close()
+    assert len(EventReader(path)) == len(expected) + 4
+    open(path, "wb").write("NOT EVENTS" * 10)
+    raises(ValueError, EventReader, path)
+    raises(ValueError, EventWriter, path)
+
+def test_array(tmpdir):
+    numpy = py.test.importorskip("numpy")
+    path = str(tmpdir.join("events.bin"))
+    products = [Product(t) for t in CorpusGenerator(seed=8).products(300)]
+    writer = EventWriter(path)
+    writer.writeall(products)
+    writer.close()
+    reader = EventReader(path)
+    a = reader.array()
+    expected = events(products)
+    assert len(a) == len(expected)
+    warnings = a[a["significance"] == "W"]
+    assert len(warnings) == len([e for e in expected
+                                 if e.pvtec.code.significance == "W"])
+    assert list(a["etn"]) == [int(e.pvtec.code.etn) for e in expected]
+    assert [tuple(r) for r in a] == [tuple(r) for r in reader]
+    zones = reader.zonearray()
+    r = a[-1]
+    assert list(zones[r["zones"]:r["zones"] + r["nzones"]]) == \
+           expected[-1].ugc.areas == reader.zones(r)
+    empty = str(tmpdir.join("empty.bin"))
+    EventWriter(empty).close()
+    assert len(EventReader(empty).array()) == 0
+
+def test_many_zones(tmpdir):
+    path = str(tmpdir.join("events.bin"))
+    zones = ["AZZ%03d" % (i % 1000) for i in range(70000)]
+    text = "WWUS75 KPSR 202352\nNPWPSR\n\n%s-210300-\n" \
+           "/O.CON.KPSR.EH.W.0007.060721T1700Z-060722T0300Z/\nTEXT\n$$\n" \
+           % "-".join(zones)
+    writer = EventWriter(path)
+    writer.write(Product(text))
+    writer.close()
+    reader = EventReader(path)
+    assert [r.nzones for r in reader] == [70000]
+    assert reader.zones(list(reader)[0]) == zones
+
+def test_interrupted(tmpdir):
+    path = str(tmpdir.join("events.bin"))
+    products = [Product(sample(name)) for name in NAMES]
+    writer = EventWriter(path)
+    writer.writeall(products[:2])
+    writer.close()
+    expected = list(EventReader(path))
+    # zones without their records and half a record, as a crash between
+    # or during the writes leaves them.
+    open(path + ".zones", "ab").write("AZZ999" * 3)
+    open(path, "ab").write("\1" * (RECORD_SIZE // 2))
+    writer = EventWriter(path)
+    assert writer.count == len(expected)
+    writer.write(products[2])
+    writer.close()
+    reader = EventReader(path)
+    records = list(reader)
+    assert records[:len(expected)] == expected
+    assert len(records) == len(events(products))
+    for r, e in zip(records, events(products)):
+        assert reader.zones(r) == e.ugc.areas
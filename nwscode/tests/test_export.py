@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for ``nwscode.export``.
+
+Created by Alexander Ross on 2006-08-25.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+import csv
+import json
+from StringIO import StringIO
+from nwscode.product import Product
+from nwscode.export import COLUMNS, records, JsonLinesWriter, CsvWriter
+from nwscode.tests.samples import NAMES, sample
+
+def products():
+    return [Product(sample(name)) for name in NAMES]
+
+def test_records():
+    npw, ffa, zfp = products()
+    rows = [dict(zip(COLUMNS, row)) for row in records(npw)]
+    assert len(rows) == 4
+    row = rows[1]
+    assert row["wmo_designator"] == "WWUS75"
+    assert row["wmo_issuance"] == "202352"
+    assert row["awips_category"] == "NPW"
+    assert row["ugc_areas"] == ["AZZ022", "AZZ023", "AZZ027", "AZZ028"]
+    assert row["ugc_expiration"] == "2006-07-21T03:00Z"
+    assert row["pvtec_action"] == "CON"
+    assert row["pvtec_phenomena"] == "EH"
+    assert row["pvtec_eventbegin"] == "2006-07-21T17:00Z"
+    assert row["hvtec_siteid"] is None
+    assert rows[0]["pvtec_eventbegin"] is None
+    row = dict(zip(COLUMNS, list(records(ffa))[0]))
+    assert row["hvtec_immediatecause"] == "ER"
+    assert row["hvtec_recordstatus"] == "OO"
+    # no VTEC, no events.
+    assert list(records(zfp)) == []
+
+def test_jsonlines():
+    out = StringIO()
+    writer = JsonLinesWriter(out, buffersize=3)
+    writer.writeall(products())
+    # the first product filled the buffer, the second waits for `flush`.
+    assert len(out.getvalue().splitlines()) == 4
+    writer.flush()
+    lines = out.getvalue().splitlines()
+    assert writer.count == len(lines) == 6
+    row = json.loads(lines[5])
+    assert sorted(row) == sorted(COLUMNS)
+    assert row["pvtec_officeid"] == "KREV"
+    assert row["ugc_areas"] == ["NVZ003"]
+
+def test_csv():
+    out = StringIO()
+    writer = CsvWriter(out)
+    writer.writeall(products())
+    writer.flush()
+    rows = list(csv.reader(StringIO(out.getvalue())))
+    assert tuple(rows[0]) == COLUMNS
+    assert len(rows) == 7
+    row = dict(zip(COLUMNS, rows[4]))
+    assert row["ugc_areas"] == "AZZ020 AZZ021 AZZ025 AZZ026 CAZ031 CAZ032 " \
+                               "CAZ033"
+    assert row["pvtec_etn"] == "0008"
+    assert row["hvtec_siteid"] == ""
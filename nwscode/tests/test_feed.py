@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for the framing in ``nwscode.feed``.
+
+Created by Alexander Ross on 2006-08-23.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+import time
+from StringIO import StringIO
+from nwscode.feed import frame, unframe, iterframes, readframes, SOH, ETX
+from nwscode.tests.samples import sample
+
+def test_frame():
+    text = sample('WWUS75_KPSR_202352.text')
+    framed = frame(text, 1234)
+    assert framed.startswith(SOH + "\r\r\n234 \r\r\nWWUS75 KPSR 202352\r\r\n")
+    assert framed.endswith("\r\r\n" + ETX)
+    assert unframe(framed) == text.strip()
+    assert unframe(framed[1:-1]) == text.strip()
+    # no sequence number.
+    assert unframe("\r\r\nWWUS75 KPSR 202352\r\r\nNPWPSR\r\r\n") == \
+                                                "WWUS75 KPSR 202352\nNPWPSR"
+
+def test_iterframes():
+    texts = [sample(name).strip() for name in
+             ['WWUS75_KPSR_202352.text', 'WGUS65_KREV_210005.text',
+              'FPAK53_PAFG_192345.text']]
+    stream = "noise" + "".join([frame(t, i) for i, t in enumerate(texts)])
+    assert list(readframes(StringIO(stream))) == texts
+    # any chunking works.
+    for size in [1, 7, 100, 5000]:
+        chunks = [stream[i:i + size] for i in range(0, len(stream), size)]
+        assert list(iterframes(chunks)) == texts
+    # an unfinished frame yields nothing.
+    assert list(iterframes([frame(texts[0])[:-1]])) == []
+
+def test_small_chunks_timing():
+    # a long frame fed in small pieces takes time in proportion to its
+    # length, as with `IncrementalParser`.
+    timings = []
+    for n in (1 << 16, 1 << 20):
+        text = "WWUS75 KPSR 202352\nNPWPSR\n" + ("A" * 69 + "\n") * (n // 70)
+        data = frame(text)
+        best = None
+        for i in range(3):
+            start = time.time()
+            texts = list(iterframes([data[j:j + 16]
+                                     for j in xrange(0, len(data), 16)]))
+            elapsed = time.time() - start
+            best = min(best or elapsed, elapsed)
+        assert texts == [text.strip()]
+        timings.append(best)
+    assert timings[1] < 40 * timings[0] + 0.05
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for ``HazardGrid`` in ``nwscode.grid``.
+
+Created by Alexander Ross on 2006-09-05.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+import random
+try:
+    from datetime import datetime
+except ImportError:
+    from nwscode.pydatetime import datetime
+import py
+from py.test import raises
+from nwscode.grid import HazardGrid
+from nwscode.eventfile import EventWriter, EventReader, NOTIME
+from nwscode.misc import toepochminutes
+from nwscode.product import Product
+from nwscode.synthetic import CorpusGenerator
+
+numpy = py.test.importorskip("numpy")
+
+def brute(grid, zones, begin, end):
+    # the grid a nested loop over the events and bins fills.
+    expected = numpy.zeros((len(grid.zones), len(grid.edges) - 1), int)
+    for z, b, e in zip(zones, begin, end):
+        if z not in grid.zones or e == NOTIME:
+            continue
+        if b == NOTIME:
+            b = grid.start
+        row = grid.zones.index(z)
+        for i in range(len(grid.edges) - 1):
+            overlap = min(e, grid.edges[i + 1]) - max(b, grid.edges[i])
+            if overlap > 0:
+                if grid.mode == "count":
+                    expected[row, i] += 1
+                else:
+                    expected[row, i] += overlap
+    return expected
+
+def test_add():
+    r = random.Random(3)
+    zones = ["AZZ%03d" % i for i in range(20)]
+    start, end = datetime(2006, 7, 1), datetime(2006, 7, 3, 5)
+    s = toepochminutes(start)
+    events = []
+    for i in range(500):
+        b = s + r.randint(-300, 3300)
+        events.append((r.choice(zones + ["CAZ001"]),
+                       r.choice([b, b, b, NOTIME]),
+                       r.choice([b + r.randint(-10, 600), NOTIME])))
+    z, b, e = zip(*events)
+    for mode in ["count", "minutes"]:
+        for binsize in [1, 45, 60, 1440]:
+            grid = HazardGrid(zones, start, end, binsize, mode)
+            # in chunks, in any order.
+            grid.add(z[:123], b[:123], e[:123])
+            grid.add(z[123:], b[123:], e[123:])
+            assert (grid.grid == brute(grid, z, b, e)).all()
+    grid = HazardGrid(zones, start, end, 60, "minutes")
+    grid.add(["AZZ001"], [s - 100], [s + 150])
+    assert list(grid.grid[1, :4]) == [60, 60, 30, 0]
+    assert grid.times()[1] == datetime(2006, 7, 1, 1)
+    assert len(grid.times()) == 53
+    raises(ValueError, HazardGrid, zones, start, end, mode="hours")
+    raises(ValueError, HazardGrid, zones, end, start)
+
+def test_events(tmpdir):
+    products = [Product(t) for t in CorpusGenerator(seed=11).products(300)]
+    events = [e for p in products for s in p.segments for e in s.events]
+    zones = sorted(set([a for e in events for a in e.ugc.areas]))[::2]
+    start, end = datetime(2006, 7, 15), datetime(2006, 8, 15)
+    path = str(tmpdir.join("events.bin"))
+    writer = EventWriter(path)
+    writer.writeall(products)
+    writer.close()
+    for mode in ["count", "minutes"]:
+        a = HazardGrid(zones, start, end, 360, mode)
+        a.addevents(events, significance="W", chunksize=50)
+        b = HazardGrid(zones, start, end, 360, mode)
+        b.addfile(EventReader(path), significance="W", chunksize=64)
+        assert (a.grid == b.grid).all()
+        assert a.grid.sum() > 0
+        c = HazardGrid(zones, start, end, 360, mode)
+        c.addfile(EventReader(path), significance="W", actions=["NEW"])
+        assert 0 < c.grid.sum() < a.grid.sum()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for ``split_header`` in ``nwscode.header``.
+
+Created by Alexander Ross on 2006-08-14.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+from py.test import raises
+from nwscode.header import split_header
+from nwscode.wmo import WmoHeader, WmoError
+from nwscode.awipsid import AwipsId, AwipsIdError
+
+def test_split_header():
+    h = split_header('WWUS75 KPSR 202352\nNPWPSR\n\nURGENT - WEATHER MESSAGE')
+    assert h == ('WWUS75', 'KPSR', '202352', None, 'NPW', 'PSR')
+    h = split_header('FZAK52 PAFG 271242 AAA\r\r\nNPWPS \r\r\n')
+    assert h == ('FZAK52', 'PAFG', '271242', 'AAA', 'NPW', 'PS ')
+
+def test_good():
+    # every line the regular expressions accept must be accepted here too.
+    for wmo in ['SMIN04 DEMS 171200 RRA', 'SMIN04 DEMS 171200',
+                'FPJM20 MKJP 171200', 'FPJM20 MKJP 171200 AAA']:
+        for awips in ['ZFPAFG', 'FFAREV', 'NPWPSR', 'NPWPS ']:
+            h = split_header(wmo + '\n' + awips)
+            w, a = WmoHeader(wmo), AwipsId(awips)
+            assert h[:3] == (w.designator, w.station, wmo[12:18])
+            assert h[3] == w.addendum
+            assert h[4:] == (a.code.category, a.code.designator)
+
+def test_bad():
+    for wmo in ['SMIN0 DEMS 171200 RRA', 'SMIN04 DDEMS 171200',
+                'SMIE01 EDB 1711200', 'SMIN04 DEMS 171200 CCA0',
+                'FPJM20 MKJP 17200', 'PJM20 MKJP 171200 AAA',
+                'SMIN04 DEMS 171200 CC1', 'SMIN04 dems 171200',
+                'SMIN04 DEMS 171200' + ' ' * 40]:
+        raises(WmoError, split_header, wmo + '\nZFPAFG')
+    for awips in ['ZFPAF', 'FFRES2', 'NPWPSR4', 'ZF AFG', '']:
+        raises(AwipsIdError, split_header, 'SMIN04 DEMS 171200\n' + awips)
+
+def test_unicode():
+    h = split_header(u'WWUS75 KPSR 202352\nNPWPSR\n\nURGENT')
+    assert h == ('WWUS75', 'KPSR', '202352', None, 'NPW', 'PSR')
+    assert isinstance(h[0], unicode)
+    raises(WmoError, split_header, u'WWUS7\xe9 KPSR 202352\nNPWPSR')
+    raises(AwipsIdError, split_header, u'WWUS75 KPSR 202352\nNPW\xe9SR')
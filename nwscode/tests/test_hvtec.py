@@ -33,6 +33,16 @@ def test_code():
     assert hv.code.floodcrest == '030510T0300Z'
     assert hv.code.floodend == '030510T0900Z'
     assert hv.code.recordstatus == 'NO'
+    # times as minutes since the epoch
+    assert hv.minutes.floodcrest - hv.minutes.floodbegin == 6 * 60
+    assert hv.minutes.floodend - hv.minutes.floodbegin == 12 * 60
+
+def test_minutes():
+    hv = Hvtec("/00000.0.ER.000000T0000Z.000000T0000Z.000000T0000Z.OO/")
+    assert hv.minutes.floodbegin is None
+    assert hv.floodbegin is None
+    assert hv.floodcrest is None
+    assert hv.floodend is None
 
 def test_good():
     h = Hvtec("/BRKS2.2.ER.041216T1600Z.041218T1600Z.041219T1200Z.NO/")
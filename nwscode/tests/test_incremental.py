@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for ``IncrementalParser`` in ``nwscode.incremental``.
+
+Created by Alexander Ross on 2006-08-29.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+import time
+import random
+from py.test import raises
+from nwscode.incremental import IncrementalParser, HeaderReceived, \
+                                SegmentReceived, ProductReceived
+from nwscode.product import Product, ProductError
+from nwscode.feed import frame
+from nwscode.nwscode import ErrorLog
+from nwscode.synthetic import CorpusGenerator
+from nwscode.tests.samples import NAMES, sample
+
+def kinds(events):
+    return [event.__class__.__name__ for event in events]
+
+def test_chunks():
+    texts = [sample(name) for name in NAMES]
+    texts.extend(CorpusGenerator(seed=4).products(50))
+    data = "garbage" + "".join([frame(t, i) for i, t in enumerate(texts)])
+    r = random.Random(1)
+    for size in [1, 10, 1000, len(data)]:
+        parser = IncrementalParser()
+        events = []
+        i = 0
+        while i < len(data):
+            n = r.randint(1, size)
+            events.extend(parser.feed(data[i:i + n]))
+            i += n
+        products = [e.product for e in events
+                    if isinstance(e, ProductReceived)]
+        assert len(products) == len(texts)
+        for product, text in zip(products, texts):
+            assert product._state() == Product(text)._state()
+
+def test_early_events():
+    text = sample(NAMES[0])
+    parser = IncrementalParser(framed=False)
+    ugc = text.index("\n", text.index("AZZ022"))
+    # the UGC code isn't complete before its line is.
+    assert parser.feed(text[:ugc]) == []
+    events = parser.feed(text[ugc:ugc + 1])
+    assert kinds(events) == ["HeaderReceived"]
+    assert events[0].header.awipsid.code.category == "NPW"
+    first = text.index("\n$$") + 3
+    events = parser.feed(text[ugc + 1:first])
+    assert events == []
+    events = parser.feed(text[first:first + 1])
+    assert kinds(events) == ["SegmentReceived"]
+    assert len(events[0].segment.events) == 3
+    assert kinds(parser.feed(text[first + 1:])) == ["SegmentReceived"]
+    events = parser.end()
+    assert kinds(events) == ["ProductReceived"]
+    assert events[0].product._state() == Product(text)._state()
+    assert parser.end() == []
+
+def test_errors():
+    good = frame(sample(NAMES[1]))
+    data = frame("NOT A PRODUCT") + frame("XXXX9 KREV 210005\nFFAREV\n\n"
+                                          "CAZ073-210115-\n$$\n") + good
+    errors = ErrorLog()
+    events = IncrementalParser(errors=errors).feed(data)
+    assert kinds(events) == ["HeaderReceived"] + ["SegmentReceived"] * 2 + \
+                            ["ProductReceived"]
+    assert [r.raw for r in errors] == ["NOT A PRODUCT", "XXXX9 KREV 210005"]
+    # without a log the first error is raised, the rest is kept.
+    parser = IncrementalParser()
+    raises(ProductError, parser.feed, data)
+    assert kinds(parser.feed("")) == ["HeaderReceived"] + \
+                                ["SegmentReceived"] * 2 + ["ProductReceived"]
+
+def test_small_chunks_timing():
+    # a long product fed in small pieces takes time in proportion to its
+    # length: sixteen times the text takes about sixteen times as long,
+    # where copying all of it for each piece takes hundreds of times.
+    head = "WWUS75 KPSR 202352\nNPWPSR\n\nAZZ022-210300-\n"
+    line = "." * 20 + "A" * 50 + "\n"
+    timings = []
+    for n in (1 << 16, 1 << 20):
+        text = head + line * (n // len(line)) + "$$\n"
+        best = None
+        for i in range(3):
+            parser = IncrementalParser(framed=False)
+            start = time.time()
+            for j in xrange(0, len(text), 16):
+                parser.feed(text[j:j + 16])
+            events = parser.end()
+            elapsed = time.time() - start
+            best = min(best or elapsed, elapsed)
+        assert kinds(events) == ["ProductReceived"]
+        assert events[0].product.text == text.strip()
+        timings.append(best)
+    assert timings[1] < 40 * timings[0] + 0.05
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for ``nwscode.instrument``.
+
+Created by Alexander Ross on 2006-08-24.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+import pickle
+import threading
+from py.test import raises
+from nwscode import instrument, misc, product, feed
+from nwscode.instrument import Registry, BUCKETS
+from nwscode.pvtec import Pvtec
+from nwscode.tests.samples import sample
+
+def test_registry():
+    r = Registry()
+    r.observe("header", 0.000001)
+    r.observe("header", 0.003)
+    r.observe("header", 100.0)
+    r.increment("products", 2)
+    stats = r.snapshot()["stages"]["header"]
+    assert stats.count == 3
+    assert abs(stats.seconds - 100.003001) < 1e-9
+    assert stats.histogram[0] == 1
+    assert stats.histogram[list(BUCKETS).index(0.005)] == 1
+    assert stats.histogram[-1] == 1
+    assert r.snapshot()["counters"] == {"products": 2}
+    r.reset()
+    assert r.snapshot() == {"stages": {}, "counters": {}}
+
+def test_merge():
+    a, b = Registry(), Registry()
+    a.observe("segment", 0.5)
+    b.observe("segment", 0.25)
+    b.increment("products")
+    a.merge(pickle.loads(pickle.dumps(b.snapshot())))
+    stats = a.snapshot()["stages"]["segment"]
+    assert stats.count == 2 and stats.seconds == 0.75
+    raises(ValueError, Registry([1.0]).merge, a.snapshot())
+
+def test_prometheus():
+    r = Registry([0.1, 1.0])
+    r.observe("Pvtec", 0.05)
+    r.observe("Pvtec", 0.5)
+    r.increment("decode errors")
+    text = r.prometheus()
+    assert '\nnwscode_stage_seconds_bucket{stage="Pvtec",le="0.1"} 1\n' in text
+    assert '\nnwscode_stage_seconds_bucket{stage="Pvtec",le="1"} 2\n' in text
+    assert '\nnwscode_stage_seconds_bucket{stage="Pvtec",le="+Inf"} 2\n' \
+                                                                    in text
+    assert '\nnwscode_stage_seconds_count{stage="Pvtec"} 2\n' in text
+    assert '\nnwscode_decode_errors_total 1\n' in text
+
+def test_enable():
+    originals = (feed.unframe, product.Header.__dict__["__init__"],
+                 misc.vtecminutes, Pvtec.__dict__["_process_matches"])
+    r = Registry()
+    instrument.enable(r)
+    try:
+        assert instrument.enabled()
+        text = sample('WWUS75_KPSR_202352.text')
+        for text in feed.iterframes([feed.frame(text)]):
+            product.Product(text)
+    finally:
+        instrument.disable()
+    assert not instrument.enabled()
+    stages = r.snapshot()["stages"]
+    for name in ["framing", "header", "ugc", "WmoHeader", "AwipsId"]:
+        assert stages[name].count == 1
+    # two segments with a UGC and two P-VTEC codes each.
+    assert stages["segment"].count == stages["Ugc"].count == 2
+    assert stages["Pvtec"].count == 4
+    assert stages["vtecminutes"].count == 8
+    # everything is back the way it was.
+    assert originals == (feed.unframe, product.Header.__dict__["__init__"],
+                         misc.vtecminutes,
+                         Pvtec.__dict__["_process_matches"])
+    product.Product(sample('WWUS75_KPSR_202352.text'))
+    assert r.snapshot()["stages"]["header"].count == 1
+
+def test_timing():
+    r, outer = Registry(), Registry()
+    text = sample('WWUS75_KPSR_202352.text')
+    try:
+        with instrument.timing(r):
+            product.Product(text)
+            raise ValueError
+    except ValueError:
+        pass
+    assert not instrument.enabled()
+    assert r.snapshot()["stages"]["header"].count == 1
+    # nested, the outer timing is back after the inner one.
+    with instrument.timing(outer):
+        with instrument.timing(r):
+            product.Product(text)
+        product.Product(text)
+        # another thread can't turn timing off meanwhile.
+        thread = threading.Thread(target=instrument.disable)
+        thread.start()
+        thread.join(0.2)
+        assert thread.isAlive()
+        assert instrument.enabled()
+    thread.join()
+    assert not instrument.enabled()
+    assert r.snapshot()["stages"]["header"].count == 2
+    assert outer.snapshot()["stages"]["header"].count == 1
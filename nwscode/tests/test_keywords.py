@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for ``KeywordMatcher`` in ``nwscode.keywords`` and the hazard
+keywords of ``Segment``.
+
+Created by Alexander Ross on 2006-09-07.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+import re
+import random
+from nwscode.keywords import KeywordMatcher, Hit
+from nwscode.product import Product, set_hazard_keywords, HAZARD_KEYWORDS
+from nwscode.synthetic import CorpusGenerator, WORDS
+from nwscode.tests.samples import sample
+
+def brute(keywords, text):
+    # every keyword, looked for in turn.
+    text = text.upper()
+    hits = []
+    for keyword in keywords:
+        pattern = r"\s+".join([re.escape(part) for part in keyword.split()])
+        pattern = r"(?<![A-Z0-9])(?=(%s)(?![A-Z0-9]))" % pattern
+        for m in re.finditer(pattern, text):
+            hits.append(Hit(keyword, m.start(1), m.end(1)))
+    hits.sort(key=lambda h: (h.start, -h.end))
+    return hits
+
+def test_find():
+    m = KeywordMatcher(["heat", "Excessive  Heat", "he", "HEAT", ""])
+    assert m.keywords == ["HEAT", "EXCESSIVE HEAT", "HE"]
+    assert m.find("EXCESSIVE\nHEAT... HEATH HE") == [
+            Hit("EXCESSIVE HEAT", 0, 14), Hit("HEAT", 10, 14),
+            Hit("HE", 24, 26)]
+    # any white space between the words.
+    m = KeywordMatcher(["flash flood", "excessive heat", "a - b"])
+    assert m.find("FLASH \nFLOOD") == [Hit("FLASH FLOOD", 0, 12)]
+    assert m.find("FLASH\n   FLOOD") == [Hit("FLASH FLOOD", 0, 14)]
+    assert m.find("Excessive  Heat") == [Hit("EXCESSIVE HEAT", 0, 15)]
+    assert m.find("A -\n B") == [Hit("A - B", 0, 6)]
+    assert m.find("A-B") == []
+    assert m.find(u"Flash\n  Flood \xe9") == [Hit("FLASH FLOOD", 0, 13)]
+    assert m.find("") == []
+    assert KeywordMatcher([]).find("TEXT") == []
+
+def test_random():
+    r = random.Random(5)
+    alphabet = "AB -.\n\n  "
+    keywords = ["".join([r.choice("AB -") for i in range(r.randint(1, 6))])
+                for n in range(60)]
+    m = KeywordMatcher(keywords)
+    for n in range(200):
+        text = "".join([r.choice(alphabet) for i in range(r.randint(0, 60))])
+        assert m.find(text) == brute(m.keywords, text)
+
+def test_segments():
+    set_hazard_keywords()
+    p = Product(sample('WWUS75_KPSR_202352.text'))
+    assert [h.start for h in p.segments[0].hazard_keywords
+            if h.keyword == "EXCESSIVE HEAT"] == [654, 731, 894, 1412, 2142]
+    for seg in p.segments:
+        for hit in seg.hazard_keywords:
+            assert " ".join(seg.text[hit.start:hit.end].upper()
+                                                .split()) == hit.keyword
+    # hundreds of keywords.
+    words = sorted(set(WORDS))
+    keywords = [" ".join(words[i:i + 2]) for i in range(len(words) - 1)]
+    set_hazard_keywords(keywords + list(HAZARD_KEYWORDS))
+    try:
+        for text in CorpusGenerator(seed=14).products(20):
+            for seg in Product(text).segments:
+                assert seg.hazard_keywords == \
+                       brute(_keywords(), seg.text)
+    finally:
+        set_hazard_keywords()
+
+def _keywords():
+    from nwscode import product
+    return product._hazard_matcher.keywords
+
+def test_cached():
+    set_hazard_keywords()
+    seg = Product(sample('WWUS75_KPSR_202352.text')).segments[0]
+    hits = seg.hazard_keywords
+    matcher = seg._hazards[0]
+    assert seg.hazard_keywords == hits
+    assert seg._hazards[0] is matcher
+    # new keywords are found again.
+    set_hazard_keywords(["PHOENIX"])
+    try:
+        assert [h for h in seg.hazard_keywords if h.keyword == "PHOENIX"]
+    finally:
+        set_hazard_keywords()
+    assert seg.hazard_keywords == hits
+    seg = Product(sample('WWUS75_KPSR_202352.text').decode('ascii')) \
+                                                            .segments[0]
+    assert seg.hazard_keywords == hits
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for the time utilities in ``nwscode.misc``.
+
+Created by Alexander Ross on 2006-08-15.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+try:
+    from datetime import datetime
+except ImportError:
+    from nwscode.pydatetime import datetime
+
+import os
+import time
+import py
+from py.test import raises
+from nwscode.misc import RelativeTime, resolve_relative, parsevtectime, \
+                         vtecminutes, toepochminutes, fromepochminutes
+
+def test_offsetfrom():
+    rt = RelativeTime(14, 20, 30)
+    # same month, no rollover.
+    assert rt.offsetfrom(datetime(2006, 7, 14, 18, 0)) == \
+                                                datetime(2006, 7, 14, 20, 30)
+    assert rt.offsetfrom(datetime(2006, 7, 10)) == datetime(2006, 7, 14, 20, 30)
+    # expiration in the next month.
+    rt = RelativeTime(1, 3, 0)
+    assert rt.offsetfrom(datetime(2006, 7, 31, 22, 0)) == \
+                                                datetime(2006, 8, 1, 3, 0)
+    # and the next year.
+    assert rt.offsetfrom(datetime(2006, 12, 31, 22, 0)) == \
+                                                datetime(2007, 1, 1, 3, 0)
+    # issuance in the previous month and year.
+    rt = RelativeTime(31, 23, 52)
+    assert rt.offsetfrom(datetime(2007, 1, 1, 0, 5)) == \
+                                                datetime(2006, 12, 31, 23, 52)
+    # day 31 does not exist in June, so it has to be May or July.
+    assert rt.offsetfrom(datetime(2006, 6, 30, 12, 0)) == \
+                                                datetime(2006, 5, 31, 23, 52)
+    assert rt.offsetfrom(datetime(2006, 7, 1, 12, 0)) == \
+                                                datetime(2006, 7, 31, 23, 52)
+    # leap day.
+    rt = RelativeTime(29, 6, 0)
+    assert rt.offsetfrom(datetime(2008, 3, 1)) == datetime(2008, 2, 29, 6, 0)
+    raises(ValueError, RelativeTime(32, 0, 0).offsetfrom, datetime(2006, 7, 1))
+
+def test_resolve_relative():
+    numpy = py.test.importorskip("numpy")
+    roots = [datetime(2006, 7, 14, 18, 0), datetime(2006, 7, 31, 22, 0),
+             datetime(2006, 12, 31, 22, 0), datetime(2007, 1, 1, 0, 5),
+             datetime(2006, 6, 30, 12, 0), datetime(2008, 3, 1)]
+    times = [RelativeTime(14, 20, 30), RelativeTime(1, 3, 0),
+             RelativeTime(1, 3, 0), RelativeTime(31, 23, 52),
+             RelativeTime(31, 23, 52), RelativeTime(29, 6, 0)]
+    result = resolve_relative([t.day for t in times],
+                              [t.hour for t in times],
+                              [t.minute for t in times], roots)
+    assert result.dtype == numpy.dtype('datetime64[m]')
+    expected = [t.offsetfrom(r) for t, r in zip(times, roots)]
+    assert result.tolist() == expected
+    # scalars broadcast against arrays.
+    result = resolve_relative(1, 3, 0, numpy.array(roots[1:3],
+                                                   dtype='datetime64[m]'))
+    assert result.tolist() == expected[1:3]
+    # impossible days come back as NaT.
+    result = resolve_relative([32, 1], 0, 0, datetime(2006, 7, 1))
+    assert numpy.isnat(result[0])
+    assert result[1] == numpy.datetime64('2006-07-01T00:00')
+
+def test_parsevtectime():
+    assert parsevtectime('000000T0000Z') is None
+    assert parsevtectime('041226T1800Z') == datetime(2004, 12, 26, 18, 0)
+    assert parsevtectime('991231T2359Z') == datetime(1999, 12, 31, 23, 59)
+    raises(ValueError, parsevtectime, '040230T0000Z')
+
+def test_epochminutes():
+    assert vtecminutes('000000T0000Z') is None
+    assert vtecminutes('700101T0001Z') == 1
+    assert vtecminutes('040229T2359Z') == \
+                            toepochminutes(datetime(2004, 2, 29, 23, 59))
+    for code in ['041326T1800Z', '040230T0000Z', '040101T2400Z',
+                 '040101T0060Z', '040100T0000Z']:
+        raises(ValueError, vtecminutes, code)
+    for when in [datetime(1969, 12, 31, 23, 59), datetime(2000, 2, 29),
+                 datetime(2006, 7, 20, 23, 52), datetime(2100, 3, 1, 1, 1)]:
+        assert fromepochminutes(toepochminutes(when)) == when
+    assert fromepochminutes(None) is None
+    rt = RelativeTime(1, 3, 0)
+    root = toepochminutes(datetime(2006, 12, 31, 22, 0))
+    assert rt.offsetminutes(root) == toepochminutes(datetime(2007, 1, 1, 3))
+
+def test_process_timezone():
+    # decoding must not depend on the process time zone.
+    saved = os.environ.get("TZ")
+    os.environ["TZ"] = "America/Chicago"
+    time.tzset()
+    try:
+        assert parsevtectime('060402T0830Z') == datetime(2006, 4, 2, 8, 30)
+    finally:
+        if saved is None:
+            del os.environ["TZ"]
+        else:
+            os.environ["TZ"] = saved
+        time.tzset()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for the ``fields`` specification of ``NwsCode`` in ``nwscode.nwscode``.
+
+Created by Alexander Ross on 2006-08-18.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+try:
+    from datetime import datetime
+except ImportError:
+    from nwscode.pydatetime import datetime
+
+import re
+import pickle
+from py.test import raises
+from nwscode.nwscode import NwsCode, NwsCodeError, Field, TimeField, \
+                            ErrorLog
+
+class ExampleError(NwsCodeError):
+    pass
+
+class Example(NwsCode):
+    pattern = re.compile(r"^([A-Z]{2})\.([0-9]{4})\.([0-9]{6}T[0-9]{4}Z)"
+                         r"\.[A-Z]{3}$")
+    error = ExampleError
+    interpreted = {"kind": {"AB": "Alpha Bravo", "CD": "Charlie Delta"}}
+    fields = (Field("kind", 0, table="kind"),
+              Field("number", 1, convert=int),
+              TimeField("time", 2),
+              Field("tail", offset=21, width=3))
+
+def test_fields():
+    e = Example("AB.0042.060720T2352Z.XYZ")
+    assert e.kind == "Alpha Bravo"
+    assert e.number == 42
+    assert e.tail == "XYZ"
+    assert e.time == datetime(2006, 7, 20, 23, 52)
+    assert e.minutes.time == 13349 * 1440 + 23 * 60 + 52
+    assert e.code == {"kind": "AB", "number": "0042",
+                      "time": "060720T2352Z", "tail": "XYZ"}
+    assert e.code.number == "0042"
+
+def test_lazy():
+    e = Example("CD.0001.000000T0000Z.XYZ")
+    assert "code" not in e.__dict__
+    assert "time" not in e.__dict__
+    assert e.time is None
+    assert e.code is e.code
+
+def test_bad():
+    raises(ExampleError, Example, "AB.0042.060720T2352Z.XY")
+    try:
+        Example("EF.0042.060720T2352Z.XYZ")
+    except ExampleError, err:
+        assert str(err) == "Invalid code 'EF' for `kind`."
+    else:
+        assert False, "bad kind was accepted"
+
+def test_field():
+    raises(ValueError, Field, "nothing")
+    raises(ValueError, Field, "both", 0, offset=1)
+
+def test_valid():
+    assert Example.valid("AB.0042.060720T2352Z.XYZ")
+    assert not Example.valid("AB.0042.060720T2352Z.XY")
+
+def test_validate_many():
+    mask, reasons = Example.validate_many(["AB.0042.060720T2352Z.XYZ",
+                                           "AB.0042.060720T2352Z.XY",
+                                           "EF.0042.060720T2352Z.XYZ",
+                                           "CD.0042.061320T2352Z.XYZ"])
+    assert mask == [True, False, False, False]
+    assert reasons[0] is None
+    assert reasons[1] == "Invalid code: AB.0042.060720T2352Z.XY"
+    assert reasons[2] == "Invalid code 'EF' for `kind`."
+    assert reasons[3] == "Invalid VTEC month: 13"
+    # the reasons match what decoding raises.
+    for code, reason in zip(["EF.0042.060720T2352Z.XYZ",
+                             "CD.0042.061320T2352Z.XYZ"], reasons[2:]):
+        try:
+            Example(code)
+        except (ExampleError, ValueError), err:
+            assert str(err) == reason
+        else:
+            assert False, "bad code was accepted"
+    assert Example.validate_many([]) == ([], [])
+    # anything but a string, and converters failing in other ways.
+    assert Example.validate_many([None, 42]) == \
+           ([False, False], ["Invalid code: None", "Invalid code: 42"])
+    mask, reasons = Picky.validate_many(["AB.0042.060720T2352Z.XYZ",
+                                         "AB.0043.060720T2352Z.XYZ"])
+    assert mask == [True, False]
+    assert reasons[1] == "list index out of range"
+
+def odd(number):
+    return [number][int(number) % 2]
+
+class Picky(Example):
+    fields = (Field("kind", 0, table="kind"),
+              Field("number", 1, convert=odd),
+              TimeField("time", 2))
+
+def test_decode():
+    errors = ErrorLog()
+    assert Example.decode("AB.0042.060720T2352Z.XYZ", errors).number == 42
+    assert Example.decode("AB.0042.060720T2352Z.XY", errors) is None
+    assert Example.decode("EF.0042.060720T2352Z.XYZ", errors) is None
+    assert Example.decode("CD.0042.061320T2352Z.XYZ", errors) is None
+    assert Example.decode(None, errors) is None
+    assert Picky.decode("AB.0043.060720T2352Z.XYZ", errors) is None
+    assert len(errors) == 5
+    assert errors.counts == {"Example": 4, "Picky": 1}
+    assert [r.reason for r in errors] == \
+                            ["Invalid code: AB.0042.060720T2352Z.XY",
+                             "Invalid code 'EF' for `kind`.",
+                             "Invalid VTEC month: 13",
+                             "Invalid code: None",
+                             "list index out of range"]
+
+def test_pickle():
+    e = Example("AB.0042.060720T2352Z.XYZ")
+    e.code
+    data = pickle.dumps(e, 2)
+    # only the raw string goes in, not the decoded attributes.
+    assert "Alpha Bravo" not in data
+    f = pickle.loads(data)
+    assert f.raw == e.raw
+    assert f.kind == e.kind
+    assert f.time == e.time
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for ``Pipeline`` in ``nwscode.pipeline``.
+
+Created by Alexander Ross on 2006-09-01.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+import time
+from py.test import raises
+from nwscode.pipeline import Pipeline, Stage
+from nwscode.product import Product, ProductError, triage
+from nwscode.feed import Framer, frame
+from nwscode.synthetic import CorpusGenerator
+
+def read(data, size=4096):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+def triaged(text):
+    # the alert-worthy products go on to be decoded fully.
+    try:
+        t = triage(text)
+    except ProductError:
+        return None
+    if [seg for seg in t.segments if seg]:
+        return [text]
+
+def decode(text):
+    return [Product(text)]
+
+def test_stages():
+    texts = list(CorpusGenerator(seed=7).products(200))
+    data = "".join([frame(t, i) for i, t in enumerate(texts)] +
+                   [frame("GARBAGE")])
+    index = {}
+    sink = []
+    def indexer(product):
+        index[product.header.awipsid.raw] = \
+                        index.get(product.header.awipsid.raw, 0) + 1
+        return [product]
+    def store(product):
+        # a slow sink holds up everything before it.
+        time.sleep(0.001)
+        sink.append(product)
+    pipeline = Pipeline(read(data), [Stage("framer", Framer().feed),
+                                     Stage("triage", triaged, workers=2),
+                                     Stage("decode", decode, processes=2),
+                                     Stage("index", indexer),
+                                     Stage("sink", store, maxsize=5)])
+    pipeline.run()
+    expected = [t for t in texts if [s for s in Product(t).segments
+                                     if s.events]]
+    assert sorted([p.text for p in sink]) == \
+                                    sorted([t.strip() for t in expected])
+    assert sum(index.values()) == len(expected)
+    stats = pipeline.stats()
+    assert stats["framer"].emitted == len(texts) + 1
+    assert stats["triage"].received == len(texts) + 1
+    assert stats["decode"].received == stats["decode"].emitted == \
+                                                        len(expected)
+    assert stats["sink"].emitted == 0
+    assert 0 < stats["sink"].maxdepth <= 5
+    assert stats["sink"].depth == 0
+    assert stats["sink"].throughput > 0
+    out = pipeline.prometheus()
+    assert 'nwscode_pipeline_received_total{stage="decode"} %d' \
+           % len(expected) in out
+    assert 'nwscode_pipeline_stage_seconds_count{stage="sink"} %d' \
+           % len(expected) in out
+
+def test_error():
+    def fail(n):
+        if n == 50:
+            raise ValueError("bad item")
+        return [n]
+    sink = []
+    pipeline = Pipeline(iter(range(10000)), [Stage("fail", fail),
+                                             Stage("sink", sink.append,
+                                                   workers=3)])
+    raises(ValueError, pipeline.run)
+    assert len(sink) < 10000
+    raises(ValueError, Pipeline, [], [])
+    raises(ValueError, Pipeline, [], [Stage("a", list), Stage("a", list)])
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for ``DecodeQueue`` in ``nwscode.priority``.
+
+Created by Alexander Ross on 2006-08-31.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+import time
+from Queue import Full
+from py.test import raises
+from nwscode.priority import DecodeQueue, CLASSES, classify
+from nwscode.server import FeedServer, replay
+from nwscode.tests.samples import sample
+
+def text(category, n=0):
+    return "WFUS53 KDMX 2023%02d\n%sDMX\n\nIAZ001-202400-\n$$\n" \
+           % (n, category)
+
+def test_classify():
+    assert CLASSES[classify(text("TOR"))] == "short-fuse"
+    assert CLASSES[classify(sample('WWUS75_KPSR_202352.text'))] == "hazard"
+    assert CLASSES[classify(sample('FPAK53_PAFG_192345.text'))] == "routine"
+    assert CLASSES[classify("GARBAGE")] == "routine"
+    assert classify(text("ZFP"), {"ZFP": 0}) == 0
+
+def test_order():
+    queue = DecodeQueue()
+    texts = [text(c, i) for i, c in enumerate(["ZFP", "AFD", "NPW", "SVR",
+                                               "RWR", "TOR", "WSW"])]
+    for t in texts:
+        queue.put(t)
+    assert queue.depths() == {"short-fuse": 2, "hazard": 2, "routine": 3}
+    order = [queue.get_nowait() for t in texts]
+    assert order == [texts[i] for i in [3, 5, 2, 6, 0, 1, 4]]
+    assert queue.depths() == {"short-fuse": 0, "hazard": 0, "routine": 0}
+    stages = queue.waits.snapshot()["stages"]
+    assert [stages[c].count for c in CLASSES] == [2, 2, 3]
+    out = queue.prometheus()
+    assert 'nwscode_queue_wait_seconds_count{class="routine"} 3' in out
+    assert 'nwscode_queue_depth{class="hazard"} 0' in out
+
+def test_maxsize():
+    queue = DecodeQueue(1)
+    queue.put(text("ZFP"))
+    raises(Full, queue.put_nowait, text("TOR"))
+
+def test_server_backlog():
+    # the decoding thread is held up by a blocking subscriber, so the
+    # products queue up; the warning overtakes the forecasts.
+    server = FeedServer(("127.0.0.1", 0), processes=0, pending=20)
+    sub = server.subscribe(maxsize=1, block=True)
+    server.start()
+    try:
+        texts = [text("ZFP", i) for i in range(5)] + [text("TOR")]
+        replay(server.address, texts)
+        for i in range(100):
+            if server.received == len(texts):
+                break
+            time.sleep(0.05)
+        ids = [sub.get(timeout=10).header.awipsid.code.category
+               for t in texts]
+    finally:
+        server.shutdown()
+    # at most two forecasts are taken before the warning arrives: one for
+    # the subscriber and one waiting for it.
+    assert ids.index("TOR") <= 2
+    assert server.queue.waits.snapshot()["stages"]["short-fuse"].count == 1
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for ``Product`` and ``Segment`` in ``nwscode.product``.
+
+Created by Alexander Ross on 2006-08-21.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+import re
+import time
+import pickle
+import random
+from py.test import raises
+try:
+    from datetime import datetime
+except ImportError:
+    from nwscode.pydatetime import datetime
+from nwscode.nwscode import ErrorLog
+from nwscode.pvtec import PvtecError
+from nwscode.product import Product, ProductError, Segment, SegmentError, \
+                            decode_products, dump_products, load_products, \
+                            triage
+from nwscode.synthetic import CorpusGenerator
+from nwscode.misc import fromepochminutes
+from nwscode.tests.samples import sample
+
+def test_product():
+    p = Product(sample('WWUS75_KPSR_202352.text'))
+    assert p.header.wmo.designator == 'WWUS75'
+    assert p.header.awipsid.code.category == 'NPW'
+    assert len(p.segments) == 2
+    assert [e.pvtec.code.phenomena for e in p.segments[0].events] == \
+                                                            ['HT', 'EH', 'EH']
+    assert p.segments[1].ugc.areas[-1] == 'CAZ033'
+    p = Product(sample('WGUS65_KREV_210005.text'))
+    assert p.segments[0].events[0].hvtec.siteid == '00000'
+
+def test_issuance():
+    p = Product(sample('WWUS75_KPSR_202352.text'))
+    assert fromepochminutes(p.issuanceminutes()) == \
+           datetime(2006, 7, 20, 23, 52)
+    assert Product(sample('FPAK53_PAFG_192345.text')).issuanceminutes() \
+           is None
+
+def test_unicode():
+    for name in ['WWUS75_KPSR_202352.text', 'WGUS65_KREV_210005.text',
+                 'FPAK53_PAFG_192345.text']:
+        text = sample(name)
+        p = Product(text.decode('ascii'))
+        assert str(p) == str(Product(text))
+        assert p.header.wmo.designator == name[:6]
+
+def test_bad():
+    raises(ProductError, Product, 'WWUS75 KPSR 202352\nNPWPSR\n\nNO UGC\n')
+    raises(ProductError, Product, 'WWUS75 KPSR 2023\nNPWPSR\n\n' \
+                                  'AZZ022-210300-\nTEXT\n$$\n')
+    raises(SegmentError, Segment, 'AZZ022-210300-\n'
+           '/00000.0.ER.000000T0000Z.000000T0000Z.000000T0000Z.OO/\n')
+
+BROKEN = """WWUS75 KPSR 202352
+NPWPSR
+
+AZZ022-023-210300-
+/O.CAN.KPSR.HT.Y.0007.000000T0000Z-060721T0300Z/
+/O.CON.KPSR.XX.W.0007.060721T1700Z-060722T0300Z/
+/O.CON.KPSR.EH.W.0008.060722T1700Z-060723T0300Z/
+TEXT
+
+$$
+
+NO UGC IN THIS SEGMENT
+
+$$
+"""
+
+def test_lenient():
+    raises(PvtecError, Product, BROKEN)
+    errors = ErrorLog()
+    p = Product(BROKEN, errors)
+    assert len(p.segments) == 1
+    assert [e.pvtec.code.etn for e in p.segments[0].events] == \
+                                                            ['0007', '0008']
+    assert errors.counts == {'Pvtec': 1, 'Segment': 1}
+    record = errors.records[0]
+    assert record.kind == 'Pvtec'
+    assert record.raw == '/O.CON.KPSR.XX.W.0007.060721T1700Z-060722T0300Z/'
+    assert record.reason == "Invalid code 'XX' for `phenomena`."
+    assert errors.records[1].reason == "Segment does not have a UGC code."
+
+def test_decode_products():
+    errors = ErrorLog(limit=2)
+    texts = [sample('WWUS75_KPSR_202352.text'), 'GARBAGE\n', BROKEN,
+             'MORE GARBAGE\n']
+    products = list(decode_products(texts, errors))
+    assert len(products) == 2
+    assert errors.counts == {'Product': 2, 'Pvtec': 1, 'Segment': 1}
+    assert len(errors) == 4
+    assert [r.kind for r in errors] == ['Product', 'Pvtec']
+    assert errors.records[0].raw == 'GARBAGE'
+
+def codes(segments):
+    return [[(str(u), str(p), h and str(h)) for u, p, h in seg]
+            for seg in segments]
+
+def test_triage():
+    texts = [sample(name) for name in ['WWUS75_KPSR_202352.text',
+                                       'WGUS65_KREV_210005.text',
+                                       'FPAK53_PAFG_192345.text']]
+    texts.extend(CorpusGenerator(seed=3).products(100))
+    for text in texts:
+        p = Product(text)
+        t = triage(text)
+        assert t.wmo.raw == p.header.wmo.raw
+        assert t.awipsid.code.category == p.header.awipsid.code.category
+        assert codes(t.segments) == \
+                codes([[(s.ugc, e.pvtec, e.hvtec) for e in s.events]
+                       for s in p.segments])
+    t = triage(texts[0])
+    assert t.segments[0][0][0].areas == ['AZZ022', 'AZZ023', 'AZZ027', 'AZZ028']
+    assert triage(texts[2]).segments[0] == []
+    raises(ProductError, triage, 'WWUS75 KPSR 202352\nNPWPSR\n\nNO UGC\n')
+    raises(PvtecError, triage, BROKEN)
+    errors = ErrorLog()
+    assert len(triage(BROKEN, errors).segments) == 1
+    assert errors.counts == {'Pvtec': 1, 'Segment': 1}
+
+def same(p, q):
+    assert p.text == q.text
+    assert str(p.header) == str(q.header)
+    assert p.header.wmo.issuance.day == q.header.wmo.issuance.day
+    assert str(p.footer) == str(q.footer)
+    assert len(p.segments) == len(q.segments)
+    for s, t in zip(p.segments, q.segments):
+        assert s.text == t.text
+        assert s.ugc.areas == t.ugc.areas
+        assert s.forecasts == t.forecasts
+        assert s.headlines == t.headlines
+        assert [str(e) for e in s.events] == [str(e) for e in t.events]
+        assert [e.minutes for e in s.events] == [e.minutes for e in t.events]
+
+def test_pickle():
+    for name in ['WWUS75_KPSR_202352.text', 'WGUS65_KREV_210005.text',
+                 'FPAK53_PAFG_192345.text']:
+        p = Product(sample(name))
+        for protocol in range(3):
+            same(p, pickle.loads(pickle.dumps(p, protocol)))
+        seg = pickle.loads(pickle.dumps(p.segments[0], 2))
+        assert seg.text == p.segments[0].text
+        for event in seg.events:
+            assert event.ugc is seg.ugc
+
+def test_dump_products():
+    products = [Product(sample(name)) for name in
+                ['WWUS75_KPSR_202352.text', 'WGUS65_KREV_210005.text',
+                 'FPAK53_PAFG_192345.text']]
+    loaded = load_products(dump_products(products))
+    assert len(loaded) == 3
+    for p, q in zip(products, loaded):
+        same(p, q)
+    assert load_products(dump_products([])) == []
+
+# the regular expressions `Segment` used to find forecasts and headlines;
+# the line scanner that replaced them must find exactly the same.
+FORECAST = re.compile(r"(?m)^\.[A-Z ]+?[\.]{3}.*(?:\n(?:[A-Z0-9].*)*)*")
+HEADLINE = re.compile(r"(?ms)^[\.]{3}[A-Z0-9 \n]*[\.]{3}$")
+
+def golden(text):
+    return ([m.group(0).replace("\n", " ").strip()
+             for m in FORECAST.finditer(text)],
+            [m.group(0).replace("\n", " ").strip()
+             for m in HEADLINE.finditer(text)])
+
+def extract(text):
+    seg = Segment("AZZ022-210300-\n" + text)
+    return seg.forecasts, seg.headlines
+
+def test_forecasts_headlines():
+    p = Product(sample('FPAK53_PAFG_192345.text'))
+    seg = p.segments[0]
+    assert len(seg.forecasts) == 14
+    assert seg.forecasts[0].startswith('.TONIGHT...')
+    texts = [seg.text for name in ['WWUS75_KPSR_202352.text',
+                                   'WGUS65_KREV_210005.text',
+                                   'FPAK53_PAFG_192345.text']
+             for seg in Product(sample(name)).segments]
+    for text in CorpusGenerator(seed=8).products(50):
+        texts.extend([seg.text for seg in Product(text).segments])
+    for text in texts:
+        seg = Segment(text)
+        assert (seg.forecasts, seg.headlines[:len(golden(text)[1])]) == \
+                                                                golden(text)
+    # edge cases from a small alphabet.
+    r = random.Random(0)
+    for i in xrange(5000):
+        text = "".join([r.choice("....AB 1\n\n*a\r-")
+                        for j in xrange(r.randint(0, 30))])
+        assert extract(text) == golden(text)
+
+def test_worst_case_timing():
+    # 1 MB segments shaped to make a backtracking matcher work hard; the
+    # scanner must stay linear: a quarter of the text takes about a
+    # quarter of the time.
+    size = 1 << 20
+    shapes = [".TONIGHT...MOSTLY CLEAR.\n" + "A" * 70 + "\n",
+              "...HEAT ADVISORY REMAINS IN EFFECT\n",
+              "..." + "A" * 60 + ".\n",
+              ".\n\n", "." + "A " * 40 + "..\n"]
+    for shape in shapes:
+        timings = []
+        for n in (size // 4, size):
+            text = "AZZ022-210300-\n" + shape * (n // len(shape))
+            best = None
+            for i in range(3):
+                start = time.time()
+                Segment(text)
+                elapsed = time.time() - start
+                best = min(best or elapsed, elapsed)
+            timings.append(best)
+        assert timings[1] < 10 * timings[0] + 0.01
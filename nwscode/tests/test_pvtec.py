@@ -35,6 +35,22 @@ def test_code():
     assert pv.code.etn == '0098'
     assert pv.code.eventbegin == '041226T1800Z'
     assert pv.code.eventend == '041227T0000Z'
+    # times as minutes since the epoch
+    assert pv.minutes.eventbegin == 12778 * 1440 + 18 * 60
+    assert pv.minutes.eventend == 12779 * 1440
+
+def test_minutes():
+    pv = Pvtec('/O.CAN.KOUN.IS.W.0003.000000T0000Z-040129T0000Z/')
+    assert pv.minutes.eventbegin is None
+    assert pv.eventbegin is None
+    # the datetime is built on first access and kept.
+    assert 'eventend' not in pv.__dict__
+    assert pv.eventend == datetime(2004, 1, 29, 0, 0)
+    assert pv.__dict__['eventend'] is pv.eventend
+    codes = [Pvtec('/O.NEW.KBMX.FL.W.0098.041226T1800Z-041227T0000Z/'),
+             Pvtec('/O.NEW.KOUN.WS.W.0006.040128T0530Z-040129T0000Z/'), pv]
+    codes.sort(key=lambda p: p.minutes.eventend)
+    assert [p.etn for p in codes] == [6, 3, 98]
 
 def test_good():
     # strings that should parse
@@ -53,3 +69,12 @@ def test_bad():
     raises(NwsCodeError, Pvtec, '/O.NEW.KOUN.WS.C.0006.040128T0530Z-040129T0000Z/')
     raises(NwsCodeError, Pvtec, '/ONEW.KOUN.WS.C.0006.040128T0530Z-040129T0000Z/')
     raises(NwsCodeError, Pvtec, '/O.NEW.KOUN.WP.C.0006.040128T0530Z-040129T0000Z/')
+
+def test_validate_many():
+    codes = ['/O.NEW.KBMX.FL.W.0097.041224T0300Z-041227T0300Z/',
+             '/O.ROT.KBMX.HY.S.000.000000T0000Z-000000T0000Z/',
+             '/O.NEW.KOUN.WP.W.0006.040128T0530Z-040129T0000Z/',
+             '/O.CAN.KOUN.IS.W.0003.000000T0000Z-040129T0000Z/']
+    mask, reasons = Pvtec.validate_many(codes)
+    assert mask == [True, False, False, True]
+    assert reasons[2] == "Invalid code 'WP' for `phenomena`."
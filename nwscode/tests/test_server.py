@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for ``FeedServer`` in ``nwscode.server``.
+
+Created by Alexander Ross on 2006-08-23.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+import time
+import socket
+import threading
+from Queue import Empty
+from py.test import raises
+from nwscode import server
+from nwscode.server import FeedServer, replay
+from nwscode.product import decode_products
+from nwscode.tests.samples import NAMES, sample
+
+TEXTS = [sample(name) for name in NAMES]
+
+def run(server):
+    sub = server.subscribe()
+    server.start()
+    try:
+        replay(server.address, TEXTS + ['GARBAGE'])
+        products = [sub.get(timeout=10) for text in TEXTS]
+        raises(Empty, sub.get, timeout=0.2)
+    finally:
+        server.shutdown()
+    ids = sorted([p.header.awipsid.raw for p in products])
+    assert ids == ['FFAREV', 'NPWPSR', 'ZFPAFG']
+    assert server.received == 4
+    assert server.decoded == 3
+    assert server.errors.counts == {'Product': 1}
+
+def test_inline():
+    run(FeedServer(("127.0.0.1", 0), processes=0))
+
+def test_pool():
+    run(FeedServer(("127.0.0.1", 0), processes=2, pending=2))
+
+def test_unix(tmpdir):
+    run(FeedServer(str(tmpdir.join("feed.sock")), processes=0))
+
+def test_drop():
+    server = FeedServer(("127.0.0.1", 0), processes=0)
+    sub = server.subscribe(maxsize=1, block=False)
+    server.start()
+    try:
+        replay(server.address, TEXTS)
+        for i in range(100):
+            if server.decoded == 3:
+                break
+            time.sleep(0.1)
+    finally:
+        server.shutdown()
+    assert sub.dropped == 2
+    sub.get(timeout=0)
+    raises(Empty, sub.get, timeout=0)
+
+def broken(texts, errors):
+    # raises for one product, and yields what doesn't pickle for another.
+    for text in texts:
+        if text.startswith("RAISE"):
+            raise RuntimeError("broken decoder")
+        if text.startswith("LAMBDA"):
+            yield lambda: None
+        else:
+            for p in decode_products([text], errors):
+                yield p
+
+def test_failures(monkeypatch):
+    monkeypatch.setattr(server, "decode_products", broken)
+    for processes, unpicklable in [(0, 0), (1, 3)]:
+        feed = FeedServer(("127.0.0.1", 0), processes=processes)
+        sub = feed.subscribe()
+        feed.start()
+        try:
+            # more failures than the pool has slots.
+            replay(feed.address, ["RAISE\n"] * 5 +
+                                 ["LAMBDA\n"] * unpicklable + TEXTS)
+            products = [sub.get(timeout=10) for text in TEXTS]
+        finally:
+            feed.shutdown()
+        assert sorted([p.header.awipsid.raw for p in products]) == \
+               ['FFAREV', 'NPWPSR', 'ZFPAFG']
+        assert feed.errors.counts == {'Product': 5 + unpicklable}
+        assert feed.errors.records[0] == ("Product", "RAISE",
+                                          "RuntimeError: broken decoder")
+
+def test_bind():
+    feed = FeedServer(("127.0.0.1", 0), processes=0)
+    threads = threading.active_count()
+    try:
+        raises(socket.error, FeedServer, feed.address, processes=2)
+        assert threading.active_count() == threads
+    finally:
+        feed.shutdown()
+
+def test_abandoned():
+    # a blocking subscriber that stopped reading holds up decoding only
+    # for its timeout; the others still get everything.
+    server = FeedServer(("127.0.0.1", 0), processes=0)
+    stuck = server.subscribe(maxsize=1, block=True, timeout=0.1)
+    sub = server.subscribe()
+    server.start()
+    try:
+        replay(server.address, TEXTS)
+        products = [sub.get(timeout=10) for text in TEXTS]
+    finally:
+        server.shutdown()
+    assert len(products) == 3
+    assert stuck.dropped == 2
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for ``EventStore`` in ``nwscode.store``.
+
+Created by Alexander Ross on 2006-09-02.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+import sqlite3
+try:
+    from datetime import datetime
+except ImportError:
+    from nwscode.pydatetime import datetime
+from py.test import raises
+from nwscode.store import EventStore
+from nwscode.export import COLUMNS, records
+from nwscode.product import Product
+from nwscode.synthetic import CorpusGenerator
+from nwscode.tests.samples import NAMES, sample
+
+def test_store(tmpdir):
+    path = str(tmpdir.join("events.db"))
+    store = EventStore(path, buffersize=2)
+    products = [Product(sample(name)) for name in NAMES]
+    store.writeall(products)
+    # two were inserted, the third is buffered.
+    conn = store.connection
+    assert conn.execute("SELECT count(*) FROM products").fetchone()[0] == 2
+    store.flush()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("SELECT count(*) FROM events").fetchone()[0] == \
+           sum([len(s.events) for p in products for s in p.segments])
+    assert conn.execute("SELECT count(*) FROM zones").fetchone()[0] == \
+           sum([len(s.ugc.areas) for p in products for s in p.segments])
+    row = conn.execute("SELECT * FROM products WHERE id = 3").fetchone()
+    assert row["awips_category"] == "ZFP"
+    assert row["text"] == products[2].text
+    # the same columns as the export.
+    columns = [c for c in COLUMNS if c.startswith(("pvtec_", "hvtec_"))]
+    rows = conn.execute("SELECT %s FROM events ORDER BY id"
+                        % ", ".join(columns)).fetchall()
+    expected = [r[COLUMNS.index(columns[0]):] for p in products
+                for r in records(p)]
+    assert [tuple(r) for r in rows] == expected
+    plan = " ".join([str(tuple(r)) for r in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM events WHERE pvtec_officeid = "
+            "'KPSR' AND pvtec_phenomena = 'EH' AND pvtec_significance = 'W' "
+            "AND pvtec_etn = '0008'")])
+    assert "events_key" in plan
+    store.close()
+    # reopened, new rows are numbered after the old ones.
+    store = EventStore(path)
+    store.write(products[0])
+    store.flush()
+    assert [r[0] for r in store.connection.execute(
+                "SELECT id FROM products ORDER BY id")] == [1, 2, 3, 4]
+    store.close()
+
+def test_zone_events():
+    store = EventStore(":memory:")
+    store.write(Product(sample(NAMES[0])))
+    store.flush()
+    rows = store.zone_events("AZZ023")
+    assert [(r["pvtec_phenomena"], r["pvtec_etn"]) for r in rows] == \
+                            [("HT", "0007"), ("EH", "0007"), ("EH", "0008")]
+    assert rows[0]["product"] == 1
+    assert store.connection.execute("SELECT ugc_expiration FROM segments "
+                        "WHERE id = 1").fetchone()[0] == "2006-07-21T03:00Z"
+    # the advisory began before the start and ended at 03Z on the 21st.
+    rows = store.zone_events("AZZ023", start=datetime(2006, 7, 21, 3, 0))
+    assert [r["pvtec_etn"] for r in rows] == ["0007", "0008"]
+    rows = store.zone_events("AZZ023", end=datetime(2006, 7, 21, 17, 0))
+    assert [r["pvtec_phenomena"] for r in rows] == ["HT"]
+    assert store.zone_events("XXZ999") == []
+
+def test_bulk():
+    store = EventStore(":memory:", buffersize=100)
+    texts = list(CorpusGenerator(seed=9).products(500))
+    store.writeall([Product(t) for t in texts])
+    store.flush()
+    assert store.count == 500
+    n = store.connection.execute("SELECT count(*) FROM events").fetchone()[0]
+    assert n == sum([len(list(records(Product(t)))) for t in texts])
+
+class Flaky(object):
+    # a connection whose inserts fail `failures` times.
+    def __init__(self, connection, failures):
+        self.connection = connection
+        self.failures = failures
+
+    def executemany(self, sql, rows):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return self.connection.executemany(sql, rows)
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+def test_retry():
+    store = EventStore(":memory:", buffersize=10)
+    conn = store.connection
+    products = [Product(sample(name)) for name in NAMES]
+    store.write(products[0])
+    store.connection = Flaky(conn, 1)
+    raises(sqlite3.OperationalError, store.flush)
+    # nothing was lost; the next flush inserts it all, without gaps.
+    store.write(products[1])
+    store.flush()
+    assert [r[0] for r in conn.execute("SELECT id FROM products")] == [1, 2]
+    assert conn.execute("SELECT count(*) FROM events").fetchone()[0] == \
+           sum([len(s.events) for p in products[:2] for s in p.segments])
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for ``CorpusGenerator`` in ``nwscode.synthetic``.
+
+Created by Alexander Ross on 2006-08-28.
+Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
+"""
+
+from StringIO import StringIO
+from py.test import raises
+from nwscode.synthetic import CorpusGenerator
+from nwscode.product import Product
+from nwscode.feed import iterframes
+from nwscode.nwscode import ErrorLog
+
+def test_deterministic():
+    a = list(CorpusGenerator(seed=5).products(20))
+    assert a == list(CorpusGenerator(seed=5).products(20))
+    assert a != list(CorpusGenerator(seed=6).products(20))
+
+def test_decodes():
+    errors = ErrorLog()
+    events = hvtecs = ranges = 0
+    for text in CorpusGenerator(seed=1, segments=(2, 4)).products(200):
+        product = Product(text, errors)
+        assert 2 <= len(product.segments) <= 4
+        for seg in product.segments:
+            ranges += ">" in seg.ugc.raw
+            for event in seg.events:
+                events += 1
+                if event.hvtec is not None:
+                    hvtecs += 1
+                    assert event.pvtec.code.phenomena in ("FF", "FA", "FL")
+    assert len(errors) == 0
+    assert events and hvtecs and ranges
+
+def test_options():
+    g = CorpusGenerator(vtec=0, categories=["NPW"])
+    for text in g.products(10):
+        product = Product(text)
+        assert product.header.awipsid.code.category == "NPW"
+        assert [seg.events for seg in product.segments if seg.events] == []
+    raises(ValueError, CorpusGenerator, categories=[])
+    # TOR has no phenomena other than TO, so every event is one.
+    for text in CorpusGenerator(categories=["TOR"], vtec=1).products(10):
+        for seg in Product(text).segments:
+            assert [e.pvtec.code.phenomena for e in seg.events] == ["TO"]
+
+def test_write():
+    out = StringIO()
+    count = CorpusGenerator(seed=2).write(out, 50000, buffersize=4096)
+    assert len(out.getvalue()) >= 50000
+    texts = list(iterframes([out.getvalue()]))
+    assert len(texts) == count
+    assert texts == [t.strip() for t in CorpusGenerator(seed=2)
+                                                    .products(count)]
@@ -8,8 +8,12 @@ Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
 """
 
 from py.test import raises
+try:
+    from datetime import datetime
+except ImportError:
+    from nwscode.pydatetime import datetime
 from nwscode.ugc import Ugc, UgcError
-from nwscode.misc import RelativeTime
+from nwscode.misc import RelativeTime, toepochminutes, fromepochminutes
 
 def test_ugc():
     u = Ugc('NCZ001>006-018>020-VAZ007-009>020-022>024-032>035-043>047-\n'\
@@ -43,3 +47,10 @@ def test_bad():
     raises(UgcError, Ugc, 'NCZ001>006-018>020-VAZ007-009\n'\
                           '020-022>024-032>035-043>047-\n'\
                           '058-059-WVZ042>045-142030-')
+
+def test_expiration():
+    u = Ugc('MEZ001-003-004-011600-')
+    # the 1st of the month after an issuance at the end of one.
+    issued = toepochminutes(datetime(2006, 7, 31, 22, 0))
+    assert fromepochminutes(u.expirationminutes(issued)) == \
+           datetime(2006, 8, 1, 16, 0)
@@ -11,7 +11,7 @@ __all__ = ["UgcError", "Ugc"]
 
 import re
 from nwscode import NwsCode, NwsCodeError
-from misc import Bunch, RelativeTime
+from misc import parserelativetime
 
 IDENT = r"[A-Z]{3}"
 NUMBER = r"[0-9]{3}"
@@ -53,9 +53,15 @@ class Ugc(NwsCode):
     
     def _process_matches(self, matches):
         self.areas = self._expand_area(matches[0])
-        time_string = matches[1]
-        day, hour, minute = time_string[:2], time_string[2:4], time_string[4:]
-        self.expiration = RelativeTime(day, hour, minute)
+        self.expiration = parserelativetime(matches[1])
+
+    def expirationminutes(self, issuance):
+        """
+        Returns the expiration as integer minutes since 1970-01-01T00:00
+        UTC, the time with its day, hour and minute nearest `issuance`,
+        in minutes since the epoch too.  See `Product.issuanceminutes`.
+        """
+        return self.expiration.offsetminutes(issuance)
     
     def _expand_area(area_string):
         areas = []
@@ -10,8 +10,8 @@ Copyright (c) 2006 NOAA's National Weather Service. All rights reserved.
 __all__ = ["WmoError", "WmoHeader", "WmoFile"]
 
 import re
-from misc import Bunch, RelativeTime
-from nwscode import NwsCode, NwsCodeError
+from misc import parserelativetime
+from nwscode import NwsCode, NwsCodeError, Field
 
 _designator = r"[A-Z]{4}[0-9]{2}"
 _station = r"[A-Z0-9]{4}"
@@ -52,19 +52,11 @@ class WmoHeader(NwsCode):
 
     pattern = re.compile(_wmoheader)
     error = WmoError
-
-    def _process_matches(self, matches):
-        self.code = Bunch(designator=matches[0],
-                          station=matches[1],
-                          expiration=matches[2])
-        # could write a more detailed processor for the designator.
-        self.designator = matches[0]
-        self.station = matches[1]
-        time_string = matches[2]
-        day, hour, minute = time_string[:2], time_string[2:4], time_string[4:]
-        self.issuance = RelativeTime(day, hour, minute)
-        if len(matches) == 4:
-            self.addendum = matches[3]
+    # could write a more detailed processor for the designator.
+    fields = (Field("designator", 0),
+              Field("station", 1),
+              Field("issuance", 2, convert=parserelativetime),
+              Field("addendum", 3))
     
 
 class WmoFile(NwsCode):
@@ -91,11 +83,7 @@ class WmoFile(NwsCode):
 
     pattern = re.compile(_wmofile)
     error = WmoError
-
-    def _process_matches(self, matches):
-        self.code = Bunch(designator=matches[0],
-                          station=matches[1])
-        # could write a more detailed processor for the designator.
-        self.designator = matches[0]
-        self.station = matches[1]
+    # could write a more detailed processor for the designator.
+    fields = (Field("designator", 0),
+              Field("station", 1))
     
@@ -9,4 +9,6 @@ setup(name='nwscode',
       description='Decoders for various codes used in NWS products.',
       author='Alex Ross',
       author_email='alex.j.ross@gmail.com',
-      packages=['nwscode'])
\ No newline at end of file
+      packages=['nwscode'],
+      # setuptools only; with plain distutils use `python -m nwscode.cli`.
+      entry_points={'console_scripts': ['nwscode = nwscode.cli:main']})
\ No newline at end of file